@@ -0,0 +1,79 @@
+"""
+Benchmark of PipelineTransformations.countries_imputation against the original row by row implementation.
+
+Usage: python -m benchmarks.countries_imputation [--sizes 10000 50000 100000] [--max-legacy-rows 200000]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_bookings
+from utils.pipeline_transformations import PipelineTransformations
+
+
+def legacy_countries_imputation(hotel_bookings_df) -> pd.DataFrame:
+    """
+    Original countries imputation, which recomputes the mode of the agent for every missing country.
+
+    Parameters:
+    - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+
+    Returns:
+    - pd.DataFrame: Transformed DataFrame.
+    """
+    missing_country_rows = hotel_bookings_df[
+        (hotel_bookings_df['country'] == 'Unknown') & (~hotel_bookings_df['agent'].isnull())]
+    for index, row in missing_country_rows.iterrows():
+        agent = row['agent']
+        possible_countries = hotel_bookings_df[hotel_bookings_df['agent'] == agent]['country']
+        if not possible_countries.empty:
+            most_common_country = possible_countries.mode().iloc[0]
+            hotel_bookings_df.at[index, 'country'] = most_common_country
+    return hotel_bookings_df
+
+
+def time_imputation(imputation, hotel_bookings_df) -> tuple:
+    """
+    Run an imputation over a copy of the bookings.
+
+    Parameters:
+    - imputation (callable): Countries imputation function.
+    - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+
+    Returns:
+    - tuple: Elapsed seconds and imputed DataFrame.
+    """
+    hotel_bookings_df = hotel_bookings_df.copy()
+    start = time.perf_counter()
+    hotel_bookings_df = imputation(hotel_bookings_df)
+    return time.perf_counter() - start, hotel_bookings_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 50_000, 100_000, 500_000, 1_000_000])
+    parser.add_argument('--max-legacy-rows', type=int, default=200_000,
+                        help='Largest size the legacy implementation is run on.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'missing':>8} {'legacy (s)':>11} {'vectorized (s)':>15} {'speedup':>8} {'equal':>6}")
+    for size in args.sizes:
+        hotel_bookings_df = generate_bookings(size, seed=args.seed)
+        hotel_bookings_df['country'] = hotel_bookings_df['country'].fillna('Unknown')
+        num_missing = int(((hotel_bookings_df['country'] == 'Unknown') & hotel_bookings_df['agent'].notnull()).sum())
+
+        vectorized_time, vectorized_df = time_imputation(PipelineTransformations.countries_imputation,
+                                                         hotel_bookings_df)
+        if size <= args.max_legacy_rows:
+            legacy_time, legacy_df = time_imputation(legacy_countries_imputation, hotel_bookings_df)
+            equal = legacy_df.equals(vectorized_df)
+            print(f"{size:>10} {num_missing:>8} {legacy_time:>11.3f} {vectorized_time:>15.3f} "
+                  f"{legacy_time / vectorized_time:>7.1f}x {str(equal):>6}")
+        else:
+            print(f"{size:>10} {num_missing:>8} {'-':>11} {vectorized_time:>15.3f} {'-':>8} {'-':>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark of the memory footprint of the pipeline DataFrames read with the dtypes inferred by pandas against the
+schemas of utils/schemas.py, at every stage: extracted bookings and users, transformed bookings and loaded facts.
+The time of the drop_duplicates and groupby steps of the transform is also compared.
+
+Usage: python -m benchmarks.memory_footprint [--rows 1000000] [--users 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_bookings, generate_users
+from utils.pipeline_transformations import PipelineTransformations
+from utils.schemas import BOOKINGS_SCHEMA, DWH_TABLES_SCHEMAS, USERS_SCHEMA, add_categories, apply_schema, read_dtypes
+
+FACT_BOOKINGS_COLUMNS = ['agent_id', 'is_canceled', 'lead_time', 'stays_in_weekend_nights', 'stays_in_week_nights',
+                         'adults', 'children', 'country', 'is_repeated_guest', 'previous_cancellations',
+                         'previous_bookings_not_canceled', 'reserved_room_type', 'assigned_room_type',
+                         'reservation_status', 'reservation_status_date']
+
+
+def transform_bookings(hotel_bookings_df: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """
+    Apply the bookings transformations of the pipeline.
+
+    Parameters:
+    - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+    - seed (int): Seed of the agents imputation.
+
+    Returns:
+    - pd.DataFrame: Transformed DataFrame.
+    """
+    np.random.seed(seed)
+    hotel_bookings_df = PipelineTransformations.dates_standardize(hotel_bookings_df)
+    hotel_bookings_df['meal'] = add_categories(hotel_bookings_df['meal'], 'SC').replace({'Undefined': 'SC'})
+    hotel_bookings_df['country'] = add_categories(hotel_bookings_df['country'], 'Unknown').fillna('Unknown')
+    hotel_bookings_df = PipelineTransformations.agents_imputation(hotel_bookings_df)
+    return PipelineTransformations.countries_imputation(hotel_bookings_df)
+
+
+def timed(function, *args) -> tuple:
+    """
+    Run a function.
+
+    Parameters:
+    - function (callable): Function to run.
+    - args: Arguments of the function.
+
+    Returns:
+    - tuple: Elapsed seconds and result of the function.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def mib(df: pd.DataFrame) -> float:
+    """
+    Get the MiB used by a DataFrame, counting the content of object columns.
+
+    Parameters:
+    - df (pd.DataFrame): DataFrame to measure.
+
+    Returns:
+    - float: MiB used by the DataFrame.
+    """
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Number of bookings.')
+    parser.add_argument('--users', type=int, default=100_000, help='Number of users.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bookings_path = os.path.join(tmp_dir, 'hotel_bookings.csv')
+        users_path = os.path.join(tmp_dir, 'users.csv')
+        facts_path = os.path.join(tmp_dir, 'fact_bookings.csv')
+        generate_bookings(args.rows, seed=args.seed).to_csv(bookings_path, index=False)
+        generate_users(args.users, seed=args.seed).to_csv(users_path, index=False)
+
+        results = {}
+        for name, use_schemas in (('inferred', False), ('schema', True)):
+            def read(path: str, schema: dict) -> pd.DataFrame:
+                if not use_schemas:
+                    return pd.read_csv(path)
+                return apply_schema(pd.read_csv(path, dtype=read_dtypes(schema)), schema)
+
+            read_time, bookings_df = timed(read, bookings_path, BOOKINGS_SCHEMA)
+            users_df = read(users_path, USERS_SCHEMA)
+            stage = {'extract bookings': (mib(bookings_df), read_time), 'extract users': (mib(users_df), None)}
+
+            transform_time, bookings_df = timed(transform_bookings, bookings_df, args.seed)
+            stage['transform bookings'] = (mib(bookings_df), transform_time)
+            stage['drop_duplicates'] = (None, timed(bookings_df.drop_duplicates)[0])
+            stage['groupby agent, country'] = (None, timed(PipelineTransformations.agent_country_counts,
+                                                           bookings_df)[0])
+
+            bookings_df.rename(columns={'agent': 'agent_id'})[FACT_BOOKINGS_COLUMNS].to_csv(facts_path, index=False)
+            read_time, facts_df = timed(read, facts_path, DWH_TABLES_SCHEMAS['fact_bookings'])
+            stage['load fact_bookings'] = (mib(facts_df), read_time)
+            results[name] = stage
+
+    print(f"{args.rows} bookings, {args.users} users")
+    print(f"{'stage':>24} {'inferred (MiB)':>15} {'schema (MiB)':>13} {'ratio':>6} {'inferred (s)':>13} "
+          f"{'schema (s)':>11}")
+    for stage in results['schema']:
+        inferred_mib, inferred_time = results['inferred'][stage]
+        schema_mib, schema_time = results['schema'][stage]
+        memory = f"{inferred_mib:>15.1f} {schema_mib:>13.1f} {inferred_mib / schema_mib:>5.1f}x" \
+            if schema_mib is not None else f"{'-':>15} {'-':>13} {'-':>6}"
+        times = f"{inferred_time:>13.3f} {schema_time:>11.3f}" \
+            if schema_time is not None else f"{'-':>13} {'-':>11}"
+        print(f"{stage:>24} {memory} {times}")
+
+
+if __name__ == "__main__":
+    main()
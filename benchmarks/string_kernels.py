@@ -0,0 +1,63 @@
+"""
+Benchmark of the column level string kernels of PipelineTransformations against the scalar functions applied
+row by row.
+
+Usage: python -m benchmarks.string_kernels [--sizes 100000 1000000]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_users
+from utils.pipeline_transformations import PipelineTransformations
+
+# Column: (scalar implementation, column kernel)
+KERNELS = {
+    'phone': (lambda phones: phones.apply(PipelineTransformations.standardize_phone),
+              PipelineTransformations.standardize_phones),
+    'email': (lambda emails: emails.apply(PipelineTransformations.is_valid_email),
+              PipelineTransformations.validate_emails),
+    'website': (lambda websites: websites.apply(
+                    lambda x: 'http://' + x if not x.startswith(('http://', 'https://')) else x),
+                PipelineTransformations.standardize_websites),
+    'name': (lambda names: names.str.replace(r'[^a-zA-Z0-9\s]', '', regex=True),
+             PipelineTransformations.remove_special_characters),
+}
+
+
+def time_kernel(kernel, values: pd.Series) -> tuple:
+    """
+    Run a kernel over a column.
+
+    Parameters:
+    - kernel (callable): Function transforming the column.
+    - values (pd.Series): Column to transform.
+
+    Returns:
+    - tuple: Elapsed seconds and transformed column.
+    """
+    start = time.perf_counter()
+    result = kernel(values)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'column':>8} {'scalar (s)':>11} {'vectorized (s)':>15} {'speedup':>8} {'equal':>6}")
+    for size in args.sizes:
+        users_df = generate_users(size, seed=args.seed)
+        for column, (scalar_kernel, column_kernel) in KERNELS.items():
+            scalar_time, scalar_result = time_kernel(scalar_kernel, users_df[column])
+            vectorized_time, vectorized_result = time_kernel(column_kernel, users_df[column])
+            equal = scalar_result.astype(object).equals(vectorized_result.astype(object))
+            print(f"{size:>10} {column:>8} {scalar_time:>11.3f} {vectorized_time:>15.3f} "
+                  f"{scalar_time / vectorized_time:>7.1f}x {str(equal):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+HOTELS = ['Resort Hotel', 'City Hotel']
+MEALS = ['BB', 'HB', 'SC', 'Undefined', 'FB']
+MEALS_PROBABILITIES = [0.785, 0.109, 0.089, 0.011, 0.006]
+COUNTRIES = ['PRT', 'GBR', 'FRA', 'ESP', 'DEU', 'ITA', 'IRL', 'BEL', 'BRA', 'NLD', 'USA', 'CHE', 'CN', 'AUT',
+             'SWE', 'CHN', 'POL', 'ISR', 'RUS', 'NOR', 'ARG']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+          'November', 'December']
+ROOM_TYPES = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'L', 'P']
+RESERVATION_STATUSES = ['Check-Out', 'Canceled', 'No-Show']
+# Formats found in the users API
+PHONE_FORMATS = ['1-{}-{}-{} x{}', '{}-{}-{} x{}', '1-{}-{}-{}', '({}){}-{}', '{}.{}.{} x{}']
+NAME_PREFIXES = ['', '', '', 'Mrs. ', 'Mr. ', 'Ms. ']
+EMAIL_DOMAINS = ['april.biz', 'melissa.tv', 'yesenia.net', 'kory.org', 'annie.ca', 'jasper.info']
+WEBSITE_PREFIXES = ['', '', 'http://', 'https://']
+DEFAULT_INVALID_EMAIL_RATE = 0.05
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Null and duplicate rates observed in reservasHotel.csv
+DEFAULT_AGENT_NULL_RATE = 0.134
+DEFAULT_COUNTRY_NULL_RATE = 0.005
+DEFAULT_DUPLICATE_RATE = 0.05
+DEFAULT_NUM_AGENTS = 10
+
+
+def generate_bookings(num_rows: int, seed: int = 0, num_agents: int = DEFAULT_NUM_AGENTS,
+                      agent_null_rate: float = DEFAULT_AGENT_NULL_RATE,
+                      country_null_rate: float = DEFAULT_COUNTRY_NULL_RATE,
+                      duplicate_rate: float = DEFAULT_DUPLICATE_RATE) -> pd.DataFrame:
+    """
+    Generate synthetic hotel bookings with the same shape as reservasHotel.csv.
+
+    Parameters:
+    - num_rows (int): Number of bookings to generate.
+    - seed (int): Seed of the random generator. Default is 0.
+    - num_agents (int): Number of different agents, agent ids go from 1 to num_agents. Default is DEFAULT_NUM_AGENTS.
+    - agent_null_rate (float): Fraction of bookings without 'agent'. Default is DEFAULT_AGENT_NULL_RATE.
+    - country_null_rate (float): Fraction of bookings without 'country'. Default is DEFAULT_COUNTRY_NULL_RATE.
+    - duplicate_rate (float): Fraction of bookings that are copies of other bookings. Default is DEFAULT_DUPLICATE_RATE.
+
+    Returns:
+    - pd.DataFrame: Synthetic hotel bookings.
+    """
+    rng = np.random.default_rng(seed)
+    num_unique = max(1, num_rows - int(num_rows * duplicate_rate))
+
+    arrival_dates = pd.Timestamp('2015-07-01') + pd.to_timedelta(rng.integers(0, 790, num_unique), unit='D')
+    lead_time = rng.integers(0, 400, num_unique)
+    status_dates = arrival_dates - pd.to_timedelta(rng.integers(0, 30, num_unique), unit='D')
+
+    # Each agent has its own country preferences so the modal country per agent is meaningful
+    agent = rng.integers(1, num_agents + 1, num_unique).astype(float)
+    country_offset = rng.geometric(0.35, num_unique) - 1
+    country = np.array(COUNTRIES, dtype=object)[(agent.astype(int) + country_offset) % len(COUNTRIES)]
+    agent[rng.random(num_unique) < agent_null_rate] = np.nan
+    country[rng.random(num_unique) < country_null_rate] = np.nan
+
+    bookings_df = pd.DataFrame({
+        'hotel': rng.choice(HOTELS, num_unique, p=[0.33, 0.67]),
+        'is_canceled': (rng.random(num_unique) < 0.36).astype(int),
+        'lead_time': lead_time,
+        'arrival_date_year': arrival_dates.year,
+        'arrival_date_month': np.array(MONTHS, dtype=object)[arrival_dates.month - 1],
+        'arrival_date_day_of_month': arrival_dates.day,
+        'stays_in_weekend_nights': rng.poisson(1, num_unique),
+        'stays_in_week_nights': rng.poisson(2.5, num_unique),
+        'adults': rng.choice([1, 2, 3, 0, 4], num_unique, p=[0.197, 0.743, 0.055, 0.004, 0.001]),
+        'children': rng.choice([0, 1, 2, 3], num_unique, p=[0.927, 0.042, 0.030, 0.001]),
+        'meal': rng.choice(MEALS, num_unique, p=MEALS_PROBABILITIES),
+        'country': country,
+        'is_repeated_guest': (rng.random(num_unique) < 0.03).astype(int),
+        'previous_cancellations': rng.poisson(0.05, num_unique),
+        'previous_bookings_not_canceled': rng.poisson(0.1, num_unique),
+        'reserved_room_type': rng.choice(ROOM_TYPES, num_unique),
+        'assigned_room_type': rng.choice(ROOM_TYPES, num_unique),
+        'agent': agent,
+        'reservation_status': rng.choice(RESERVATION_STATUSES, num_unique, p=[0.63, 0.36, 0.01]),
+        'reservation_status_date': status_dates.strftime('%d/%m/%Y'),
+    })
+
+    if num_rows > num_unique:
+        duplicates_df = bookings_df.iloc[rng.integers(0, num_unique, num_rows - num_unique)]
+        bookings_df = pd.concat([bookings_df, duplicates_df], ignore_index=True)
+        bookings_df = bookings_df.iloc[rng.permutation(num_rows)].reset_index(drop=True)
+    return bookings_df
+
+
+def generate_users(num_rows: int, seed: int = 0, num_companies: int = None,
+                   invalid_email_rate: float = DEFAULT_INVALID_EMAIL_RATE) -> pd.DataFrame:
+    """
+    Generate synthetic users with the same shape as the extracted users file, nested fields flattened into dotted
+    path columns.
+
+    Parameters:
+    - num_rows (int): Number of users to generate.
+    - seed (int): Seed of the random generator. Default is 0.
+    - num_companies (int): Number of different companies. Default is None, which uses one company every 10 users.
+    - invalid_email_rate (float): Fraction of users with an invalid 'email'. Default is DEFAULT_INVALID_EMAIL_RATE.
+
+    Returns:
+    - pd.DataFrame: Synthetic users.
+    """
+    rng = np.random.default_rng(seed)
+    num_companies = num_companies or max(1, num_rows // 10)
+
+    def digits(num_digits: int) -> pd.Series:
+        return pd.Series(rng.integers(0, 10 ** num_digits, num_rows)).astype(str).str.zfill(num_digits)
+
+    ids = pd.Series(np.arange(1, num_rows + 1))
+    first_names = 'Name' + ids.astype(str)
+    last_names = "O'Surname" + pd.Series(rng.integers(0, 1000, num_rows)).astype(str)
+    name = pd.Series(np.array(NAME_PREFIXES, dtype=object)[rng.integers(0, len(NAME_PREFIXES), num_rows)]) \
+        + first_names + ' ' + last_names
+    username = first_names + pd.Series(np.where(rng.random(num_rows) < 0.5, '.', '_')) + last_names.str[2:]
+    email = first_names + '@' + pd.Series(rng.choice(EMAIL_DOMAINS, num_rows))
+    invalid = rng.random(num_rows) < invalid_email_rate
+    email[invalid] = email[invalid].str.replace('@', ' at ', regex=False)
+
+    phone_format = rng.integers(0, len(PHONE_FORMATS), num_rows)
+    area, exchange, line, extension = digits(3), digits(3), digits(4), digits(5)
+    phone = pd.Series(np.select(
+        [phone_format == 0, phone_format == 1, phone_format == 2, phone_format == 3],
+        ['1-' + area + '-' + exchange + '-' + line + ' x' + extension,
+         area + '-' + exchange + '-' + line + ' x' + extension,
+         '1-' + area + '-' + exchange + '-' + line,
+         '(' + area + ')' + exchange + '-' + line],
+        area + '.' + exchange + '.' + line + ' x' + extension.str[:3]))
+    website = pd.Series(rng.choice(WEBSITE_PREFIXES, num_rows)) + last_names.str[2:].str.lower() + '.org'
+    company = 'Company ' + pd.Series(rng.integers(1, num_companies + 1, num_rows)).astype(str)
+
+    return pd.DataFrame({
+        'id': ids,
+        'name': name,
+        'username': username,
+        'email': email,
+        'phone': phone,
+        'website': website,
+        'address.street': 'Street ' + digits(3),
+        'address.suite': 'Apt. ' + digits(3),
+        'address.city': 'City ' + digits(2),
+        'address.zipcode': digits(5) + '-' + digits(4),
+        'address.geo.lat': pd.Series(rng.uniform(-90, 90, num_rows)).round(4).astype(str),
+        'address.geo.lng': pd.Series(rng.uniform(-180, 180, num_rows)).round(4).astype(str),
+        'company.name': company,
+        'company.catchPhrase': company + ' catch phrase',
+        'company.bs': company + ' bs',
+    })
+
+
+def write_bookings_csv(path: str, num_rows: int, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       separator: str = ';', **kwargs) -> int:
+    """
+    Write synthetic hotel bookings into a CSV file shaped like reservasHotel.csv, chunk by chunk so files larger than
+    memory can be generated.
+
+    Every chunk is generated with its own seed, derived from seed, and contains its own duplicates.
+
+    Parameters:
+    - path (str): Path of the CSV file.
+    - num_rows (int): Number of bookings to generate.
+    - seed (int): Seed of the random generator. Default is 0.
+    - chunk_size (int): Number of bookings generated at once. Default is DEFAULT_CHUNK_SIZE.
+    - separator (str): Field separator. Default is ';', the one of reservasHotel.csv.
+    - kwargs: Rates and number of agents, see generate_bookings.
+
+    Returns:
+    - int: Number of bytes of the file.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(max(1, -(-num_rows // chunk_size)))
+    with open(path, 'w', newline='') as f:
+        for chunk_number, start in enumerate(range(0, num_rows, chunk_size)):
+            chunk_seed = int(seeds[chunk_number].generate_state(1)[0])
+            bookings_df = generate_bookings(min(chunk_size, num_rows - start), seed=chunk_seed, **kwargs)
+            bookings_df.to_csv(f, sep=separator, index=False, header=chunk_number == 0)
+        return f.tell()
+
+
+def generate_users_payload(num_rows: int, seed: int = 0, **kwargs) -> list:
+    """
+    Generate synthetic users with the nested JSON shape of the users API.
+
+    Parameters:
+    - num_rows (int): Number of users to generate.
+    - seed (int): Seed of the random generator. Default is 0.
+    - kwargs: Number of companies and invalid email rate, see generate_users.
+
+    Returns:
+    - list: Users records, with 'address', 'address.geo' and 'company' as nested objects.
+    """
+    users_df = generate_users(num_rows, seed=seed, **kwargs)
+    records = []
+    for flat_record in users_df.to_dict('records'):
+        record = {}
+        for path, value in flat_record.items():
+            *parents, field = path.split('.')
+            node = record
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[field] = value.item() if isinstance(value, np.generic) else value
+        records.append(record)
+    return records
+
+
+def write_users_json(path: str, num_rows: int, seed: int = 0, **kwargs) -> int:
+    """
+    Write a synthetic users API payload into a JSON file.
+
+    Parameters:
+    - path (str): Path of the JSON file.
+    - num_rows (int): Number of users to generate.
+    - seed (int): Seed of the random generator. Default is 0.
+    - kwargs: Number of companies and invalid email rate, see generate_users.
+
+    Returns:
+    - int: Number of bytes of the file.
+    """
+    with open(path, 'w') as f:
+        json.dump(generate_users_payload(num_rows, seed=seed, **kwargs), f)
+        return f.tell()
@@ -1,11 +1,27 @@
+import argparse
+
 from utils.data_driven_etl import DataDrivenETL
 from utils.general_functions import get_logger
+from utils.profiling import PipelineProfiler
+from utils.stage_cache import StageCache
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the data-driven ETL pipeline.")
+    parser.add_argument("--cprofile", action="store_true", help="Dump cProfile stats next to the run metrics.")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Processes transforming ranges of the bookings, 0 uses every CPU.")
+    parser.add_argument("--no-cache", action="store_true", help="Run every stage, even if its inputs did not change.")
+    parser.add_argument("--skip-unchanged-load", action="store_true",
+                        help="Skip the load if the same tables were already loaded by a cached run, without checking "
+                             "the database.")
+    args = parser.parse_args()
     logger = get_logger()
 
-    data_driven_etl_instance = DataDrivenETL(logger=logger)
-    data_driven_etl_instance.extract({"hotel_bookings.csv": "reservasHotel.csv"}, {"users.csv": "https://jsonplaceholder.typicode.com/users"})
-    data_driven_etl_instance.transform(data=["hotel_bookings.csv", "users.csv"])
-    data_driven_etl_instance.load()
+    with PipelineProfiler(logger, cprofile=args.cprofile):
+        cache = None if args.no_cache else StageCache(logger)
+        data_driven_etl_instance = DataDrivenETL(logger=logger, cache=cache)
+        data_driven_etl_instance.extract({"hotel_bookings.csv": "reservasHotel.csv"}, {"users.csv": "https://jsonplaceholder.typicode.com/users"})
+        data_driven_etl_instance.transform(data=["hotel_bookings.csv", "users.csv"],
+                                           processes=args.processes or None)
+        data_driven_etl_instance.load(skip_unchanged=args.skip_unchanged_load)
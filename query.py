@@ -0,0 +1,36 @@
+import argparse
+import time
+
+import pandas as pd
+
+from utils.etl import ETL
+from utils.general_functions import get_logger
+from utils.query_engine import ANALYSIS_QUERIES, QueryEngine
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the analysis queries over the transformed data, without the DWH.")
+    parser.add_argument("queries", nargs="*", metavar="query",
+                        help=f"Analysis queries to run, from {list(ANALYSIS_QUERIES)}. Default is every query.")
+    parser.add_argument("--sql", help="SQL query over the transformed tables, requires DuckDB.")
+    parser.add_argument("--engine", choices=QueryEngine.ENGINES, default=None,
+                        help="Query engine. Default is DuckDB if it is installed, pandas otherwise.")
+    parser.add_argument("--transformations-dir", default=ETL.DEFAULT_TRANSFORMATIONS_DIR)
+    parser.add_argument("--storage-format", default=ETL.DEFAULT_STORAGE_FORMAT, choices=["csv", "parquet"])
+    args = parser.parse_args()
+    for query_name in args.queries:
+        if query_name not in ANALYSIS_QUERIES:
+            parser.error(f"unknown query: {query_name}")
+    logger = get_logger()
+
+    engine = QueryEngine(logger, transformations_dir=args.transformations_dir, storage_format=args.storage_format,
+                         engine=args.engine)
+    results = {"sql": lambda: engine.sql(args.sql)} if args.sql else \
+        {query_name: (lambda name=query_name: engine.query(name)) for query_name in args.queries or ANALYSIS_QUERIES}
+    with pd.option_context("display.max_rows", 100, "display.max_columns", None, "display.width", 200):
+        for query_name, run_query in results.items():
+            start = time.perf_counter()
+            result_df = run_query()
+            print(f"---- {query_name} ({engine.engine}, {time.perf_counter() - start:.3f} s)")
+            print(result_df.to_string(index=False))
+            print()
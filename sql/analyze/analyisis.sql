@@ -147,4 +147,15 @@ GROUP BY
         WHEN MONTH(fb.reservation_status_date) IN (6, 7, 8) THEN 'Verano'     -- Junio, Julio, Agosto
         WHEN MONTH(fb.reservation_status_date) IN (9, 10, 11) THEN 'Otoño'    -- Septiembre, Octubre, Noviembre
         ELSE 'Otro'
-    END;
\ No newline at end of file
+    END;
+
+----- Summary tables, refreshed by every pipeline run (same results as the queries above, exact averages)
+SELECT agent_name, num_bookings, avg_stay FROM dbo.agg_bookings_by_agent;
+
+SELECT company_name, num_bookings FROM dbo.agg_bookings_by_company;
+
+SELECT meal, meal_package, num_bookings FROM dbo.agg_bookings_by_meal;
+
+SELECT country, num_cancellations FROM dbo.agg_bookings_by_country WHERE num_cancellations > 0;
+
+SELECT * FROM dbo.agg_bookings_by_season;
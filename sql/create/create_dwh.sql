@@ -120,4 +120,93 @@ REFERENCES [dbo].[dim_users] ([id])
 GO
 
 ALTER TABLE [dbo].[fact_bookings] CHECK CONSTRAINT [FK__fact_book__user___34C8D9D1]
-GO
\ No newline at end of file
+GO
+
+CREATE NONCLUSTERED INDEX [IX_fact_bookings_agent_id] ON [dbo].[fact_bookings] ([agent_id] ASC) ON [PRIMARY]
+GO
+
+CREATE NONCLUSTERED INDEX [IX_fact_bookings_hotel_id] ON [dbo].[fact_bookings] ([hotel_id] ASC) ON [PRIMARY]
+GO
+
+CREATE NONCLUSTERED INDEX [IX_fact_bookings_meal_id] ON [dbo].[fact_bookings] ([meal_id] ASC) ON [PRIMARY]
+GO
+
+CREATE NONCLUSTERED INDEX [IX_fact_bookings_arrival_date_id] ON [dbo].[fact_bookings] ([arrival_date_id] ASC) ON [PRIMARY]
+GO
+
+CREATE NONCLUSTERED INDEX [IX_dim_users_company_id] ON [dbo].[dim_users] ([company_id] ASC) ON [PRIMARY]
+GO
+
+
+CREATE TABLE [dbo].[agg_bookings_by_agent](
+	[agent_name] [varchar](255) NOT NULL,
+	[num_bookings] [int] NOT NULL,
+	[num_cancellations] [int] NOT NULL,
+	[total_stay] [int] NOT NULL,
+	[avg_stay] [float] NULL,
+PRIMARY KEY CLUSTERED
+(
+	[agent_name] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
+
+CREATE TABLE [dbo].[agg_bookings_by_company](
+	[company_name] [varchar](255) NOT NULL,
+	[num_bookings] [int] NOT NULL,
+	[num_cancellations] [int] NOT NULL,
+	[total_stay] [int] NOT NULL,
+	[avg_stay] [float] NULL,
+PRIMARY KEY CLUSTERED
+(
+	[company_name] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
+
+CREATE TABLE [dbo].[agg_bookings_by_country](
+	[country] [varchar](255) NOT NULL,
+	[num_bookings] [int] NOT NULL,
+	[num_cancellations] [int] NOT NULL,
+	[cancelled_percentage] [float] NULL,
+	[total_stay] [int] NOT NULL,
+	[avg_stay] [float] NULL,
+PRIMARY KEY CLUSTERED
+(
+	[country] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
+
+CREATE TABLE [dbo].[agg_bookings_by_meal](
+	[meal] [varchar](255) NOT NULL,
+	[meal_package] [varchar](255) NULL,
+	[num_bookings] [int] NOT NULL,
+	[num_cancellations] [int] NOT NULL,
+	[total_stay] [int] NOT NULL,
+	[avg_stay] [float] NULL,
+PRIMARY KEY CLUSTERED
+(
+	[meal] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
+
+CREATE TABLE [dbo].[agg_bookings_by_season](
+	[season] [varchar](255) NOT NULL,
+	[num_bookings] [int] NOT NULL,
+	[num_cancelled_bookings] [int] NOT NULL,
+	[cancelled_percentage] [float] NULL,
+	[total_stay_in_days] [int] NOT NULL,
+	[avg_stay_in_week] [float] NULL,
+	[avg_stay_total] [float] NULL,
+	[num_undefined_meal] [int] NOT NULL,
+	[num_bed_breakfast] [int] NOT NULL,
+	[num_half_board] [int] NOT NULL,
+	[num_full_board] [int] NOT NULL,
+PRIMARY KEY CLUSTERED
+(
+	[season] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
@@ -0,0 +1,184 @@
+import os
+import logging
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from benchmarks.synthetic_data import generate_bookings, generate_users
+from utils.data_driven_etl import DataDrivenETL
+from utils.general_functions import create_connection
+from utils.incremental_state import IncrementalState
+from utils.stage_cache import StageCache
+from utils.schemas import BOOKINGS_SCHEMA, apply_schema, get_schema
+
+DATA = ["hotel_bookings.csv", "users.csv"]
+# Foreign keys of sql/create/create_dwh.sql
+FOREIGN_KEYS = {
+    "dim_users": [("company_id", "dim_companies", "company_id")],
+    "fact_bookings": [("agent_id", "dim_users", "id"), ("hotel_id", "dim_hotels", "hotel_id"),
+                      ("meal_id", "dim_meals", "meal_id"), ("arrival_date_id", "dim_dates", "date_id")],
+}
+
+
+def extract(tmp_path, storage_format: str, bookings_df: pd.DataFrame) -> tuple:
+    etl = DataDrivenETL(logger=logging.getLogger(__name__), storage_format=storage_format,
+                        connection_url=f"sqlite:///{tmp_path / 'dwh.db'}")
+    extractions_dir, transformations_dir = str(tmp_path / "extract"), str(tmp_path / "transform")
+    (tmp_path / "extract").mkdir()
+    (tmp_path / "transform").mkdir()
+    etl.storage.write(apply_schema(bookings_df, BOOKINGS_SCHEMA), etl.storage.path(extractions_dir, "hotel_bookings"))
+    etl.storage.write(generate_users(10, seed=3), etl.storage.path(extractions_dir, "users"))
+    return etl, extractions_dir, transformations_dir
+
+
+def transformed_tables(etl: DataDrivenETL, extractions_dir: str, transformations_dir: str, **kwargs) -> dict:
+    etl.transform(DATA, extractions_dir=extractions_dir, transformations_dir=transformations_dir, seed=3, **kwargs)
+    return {table_name: etl.storage.read(etl.storage.path(transformations_dir, table_name),
+                                         dtype=get_schema(table_name))
+            for table_name in DataDrivenETL.DWH_TABLES_INFO}
+
+
+@pytest.mark.parametrize("storage_format", ["csv", "parquet"])
+def test_transform_does_not_depend_on_chunks(tmp_path, storage_format):
+    # Many agents with few bookings and many missing countries, so the imputed agents change modal countries
+    bookings_df = generate_bookings(20_000, seed=1, num_agents=100, country_null_rate=0.3)
+    bookings_df = pd.concat([bookings_df, bookings_df.iloc[:200]], ignore_index=True)
+    etl, extractions_dir, transformations_dir = extract(tmp_path, storage_format, bookings_df)
+
+    whole_tables = transformed_tables(etl, extractions_dir, transformations_dir)
+    chunks_tables = transformed_tables(etl, extractions_dir, transformations_dir, chunk_size=5000)
+    for table_name, table_df in whole_tables.items():
+        pd.testing.assert_frame_equal(table_df, chunks_tables[table_name], check_categorical=False, obj=table_name)
+
+    fact_df = whole_tables["fact_bookings"]
+    assert len(fact_df) == len(bookings_df.drop_duplicates())
+    assert fact_df['booking_id'].tolist() == list(range(1, len(fact_df) + 1))
+    assert fact_df['agent_id'].notna().all()
+
+
+@pytest.mark.parametrize("chunk_size", [None, 5000])
+def test_transform_does_not_depend_on_processes(tmp_path, chunk_size):
+    bookings_df = generate_bookings(20_000, seed=2, num_agents=100, country_null_rate=0.3)
+    etl, extractions_dir, transformations_dir = extract(tmp_path, "csv", bookings_df)
+
+    serial_tables = transformed_tables(etl, extractions_dir, transformations_dir)
+    partitioned_tables = transformed_tables(etl, extractions_dir, transformations_dir, chunk_size=chunk_size,
+                                            processes=2)
+    for table_name, table_df in serial_tables.items():
+        pd.testing.assert_frame_equal(table_df, partitioned_tables[table_name], check_categorical=False,
+                                      obj=table_name)
+
+
+def create_dwh_tables(etl: DataDrivenETL, tables: dict):
+    """
+    Create the DWH tables in SQLite with the primary and foreign keys of sql/create/create_dwh.sql.
+    """
+    engine = create_connection(etl.connection_url)
+    with engine.begin() as conn:
+        for table_name, table_df in tables.items():
+            table_df = table_df.rename(columns=DataDrivenETL.DWH_COLUMNS_RENAME.get(table_name, {}))
+            ddl = pd.io.sql.get_schema(table_df, table_name, keys=DataDrivenETL.DWH_PRIMARY_KEYS[table_name],
+                                       con=conn).rstrip()[:-1]
+            for column, parent_table_name, parent_column in FOREIGN_KEYS.get(table_name, []):
+                ddl += f", FOREIGN KEY ({column}) REFERENCES {parent_table_name} ({parent_column})"
+            conn.exec_driver_sql(ddl + ")")
+    return engine
+
+
+@pytest.mark.parametrize("mode", ["bulk", "upsert"])
+def test_load_keeps_foreign_keys(tmp_path, mode):
+    # More agents than users, so most agents have no user
+    bookings_df = generate_bookings(2000, seed=4, num_agents=30)
+    etl, extractions_dir, transformations_dir = extract(tmp_path, "parquet", bookings_df)
+    tables = transformed_tables(etl, extractions_dir, transformations_dir)
+    engine = create_dwh_tables(etl, tables)
+
+    timings = etl.load(transformations_dir, mode=mode, state_dir=str(tmp_path / "state"))
+    assert set(timings) == set(DataDrivenETL.DWH_TABLES_INFO)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+        assert not conn.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+        fact_df = pd.read_sql(text("SELECT booking_id, agent_id FROM fact_bookings ORDER BY booking_id"), conn)
+    agents = tables["fact_bookings"]['agent_id']
+    has_user = agents.isin(tables["dim_users"]['id'])
+    assert len(fact_df) == len(agents) and 0 < has_user.sum() < len(agents)
+    assert fact_df['agent_id'].isna().tolist() == (~has_user).tolist()
+
+
+def test_incremental_state_is_committed_by_the_upsert_load(tmp_path):
+    bookings_df = apply_schema(generate_bookings(3000, seed=7), BOOKINGS_SCHEMA)
+    bookings_df = pd.concat([bookings_df, bookings_df.iloc[:200]], ignore_index=True)
+    etl, extractions_dir, transformations_dir = extract(tmp_path, "csv", bookings_df.iloc[:2000])
+    state_dir = str(tmp_path / "state")
+
+    def transform_and_load(rows: int, load: bool = True) -> int:
+        etl.storage.write(bookings_df.iloc[:rows], etl.storage.path(extractions_dir, "hotel_bookings"))
+        etl.transform(DATA, extractions_dir=extractions_dir, transformations_dir=transformations_dir,
+                      chunk_size=500, incremental=True, state_dir=state_dir, seed=3)
+        new_bookings = len(etl.storage.read(etl.storage.path(transformations_dir, "fact_bookings")))
+        if load:
+            etl.load(transformations_dir, mode="upsert", state_dir=state_dir)
+        return new_bookings
+
+    first_bookings = transform_and_load(2000, load=False)
+    # Not loaded, so the same bookings are new again
+    assert transform_and_load(2000) == first_bookings
+    assert not os.path.exists(os.path.join(state_dir, IncrementalState.PENDING_DIR))
+    second_bookings = transform_and_load(len(bookings_df))
+    assert first_bookings + second_bookings == len(bookings_df.drop_duplicates())
+    assert transform_and_load(len(bookings_df)) == 0
+
+    with create_connection(etl.connection_url).connect() as conn:
+        booking_ids = conn.execute(text("SELECT booking_id FROM fact_bookings ORDER BY booking_id")).scalars()
+        assert list(booking_ids) == list(range(1, len(bookings_df.drop_duplicates()) + 1))
+        num_bookings = conn.execute(text("SELECT SUM(num_bookings) FROM agg_bookings_by_country")).scalar()
+        assert num_bookings == len(bookings_df.drop_duplicates())
+
+
+def test_upsert_load_replaces_the_summary_tables(tmp_path):
+    etl, extractions_dir, transformations_dir = extract(tmp_path, "parquet", generate_bookings(2000, seed=5))
+    state_dir = str(tmp_path / "state")
+    users_df = generate_users(10, seed=3)
+    for company_suffix in ("", " Renamed"):
+        users_df['company.name'] = users_df['company.name'] + company_suffix
+        etl.storage.write(users_df, etl.storage.path(extractions_dir, "users"))
+        etl.transform(DATA, extractions_dir=extractions_dir, transformations_dir=transformations_dir,
+                      incremental=True, state_dir=state_dir, seed=3)
+        etl.load(transformations_dir, mode="upsert", state_dir=state_dir)
+
+    with create_connection(etl.connection_url).connect() as conn:
+        companies = conn.execute(text("SELECT company_name FROM agg_bookings_by_company")).scalars().all()
+        dim_companies = conn.execute(text("SELECT company_name FROM dim_companies")).scalars().all()
+    assert sorted(companies) == sorted(dim_companies) == sorted(users_df['company.name'].unique())
+
+
+def test_failed_load_leaves_the_incremental_state_pending(tmp_path):
+    etl, extractions_dir, transformations_dir = extract(tmp_path, "csv", generate_bookings(2000, seed=5))
+    state_dir = str(tmp_path / "state")
+    etl.transform(DATA, extractions_dir=extractions_dir, transformations_dir=transformations_dir, chunk_size=500,
+                  incremental=True, state_dir=state_dir, seed=3)
+    with create_connection(etl.connection_url).begin() as conn:
+        # The meals cannot be merged into a table without their columns
+        conn.execute(text("CREATE TABLE dim_meals (meal_code INTEGER PRIMARY KEY)"))
+
+    timings = etl.load(transformations_dir, mode="upsert", state_dir=state_dir)
+    assert "fact_bookings" not in timings
+    assert os.path.isdir(os.path.join(state_dir, IncrementalState.PENDING_DIR))
+    assert IncrementalState(state_dir).source_changed("transform:hotel_bookings", "")
+
+
+def test_cached_load_is_only_skipped_on_request(tmp_path):
+    etl, extractions_dir, transformations_dir = extract(tmp_path, "parquet", generate_bookings(1000, seed=6))
+    etl.cache = StageCache(etl.logger, cache_dir=str(tmp_path / "cache"))
+    etl.transform(DATA, extractions_dir=extractions_dir, transformations_dir=transformations_dir, seed=3)
+    assert set(etl.load(transformations_dir)) == set(DataDrivenETL.DWH_TABLES_INFO)
+
+    engine = create_connection(etl.connection_url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE fact_bookings"))
+    # The database changed since the cached load, which is run again by default
+    assert set(etl.load(transformations_dir)) == set(DataDrivenETL.DWH_TABLES_INFO)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM fact_bookings")).scalar() > 0
+    assert etl.load(transformations_dir, skip_unchanged=True) == {}
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.incremental_state import IncrementalState
+from utils.surrogate_keys import SurrogateKeyGenerator
+
+
+def bookings_state(state_dir: str) -> IncrementalState:
+    state = IncrementalState(state_dir)
+    state.load_bookings_state({"hotel_id": SurrogateKeyGenerator(['hotel'])})
+    return state
+
+
+def test_pending_state_is_only_used_once_committed(tmp_path):
+    state_dir = str(tmp_path / "state")
+    state = bookings_state(state_dir)
+    state.keys["hotel_id"].assign(pd.DataFrame({'hotel': ['City Hotel', 'Resort Hotel']}))
+    state.seen_bookings = np.array([3, 1, 2], dtype='uint64')
+    state.update_source("transform:hotel_bookings", "abc", size=10)
+    state.save(pending=True)
+
+    uncommitted = bookings_state(state_dir)
+    assert uncommitted.source_changed("transform:hotel_bookings", "abc")
+    assert len(uncommitted.seen_bookings) == 0
+    assert len(uncommitted.keys["hotel_id"].keys) == 0
+
+    assert IncrementalState(state_dir).commit()
+    assert not IncrementalState(state_dir).commit()
+    committed = bookings_state(state_dir)
+    assert not committed.source_changed("transform:hotel_bookings", "abc")
+    assert committed.seen_bookings.tolist() == [3, 1, 2]
+    assert committed.keys["hotel_id"].assign(pd.DataFrame({'hotel': ['Resort Hotel']})).tolist() == [2]
+
+
+def test_commit_keeps_sources_updated_by_other_steps(tmp_path):
+    state_dir = str(tmp_path / "state")
+    transform_state = IncrementalState(state_dir)
+    transform_state.update_source("transform:users", "users")
+    transform_state.save(pending=True)
+
+    extract_state = IncrementalState(state_dir)
+    extract_state.update_source("extract:hotel_bookings", "bookings")
+    extract_state.save()
+
+    IncrementalState(state_dir).commit()
+    state = IncrementalState(state_dir)
+    assert not state.source_changed("transform:users", "users")
+    assert not state.source_changed("extract:hotel_bookings", "bookings")
+
+
+@pytest.mark.parametrize("appended, expected_offset", [(b"c;4\n", 8), (b"", 8)])
+def test_appended_fingerprint_of_appended_lines(tmp_path, appended, expected_offset):
+    path = tmp_path / "bookings.csv"
+    path.write_bytes(b"a;1\nb;2\n")
+    state = IncrementalState(str(tmp_path / "state"))
+    fingerprint, offset = state.appended_fingerprint("bookings", str(path))
+    assert offset == 0
+    assert fingerprint == IncrementalState.file_fingerprint(str(path))
+    state.update_source("bookings", fingerprint, size=path.stat().st_size)
+
+    path.write_bytes(b"a;1\nb;2\n" + appended)
+    fingerprint, offset = state.appended_fingerprint("bookings", str(path))
+    assert offset == expected_offset
+    assert fingerprint == IncrementalState.file_fingerprint(str(path))
+
+
+@pytest.mark.parametrize("content", [b"a;1\nX;2\nc;4\n", b"a;1\n", b"a;1\nb;2c;4\n"])
+def test_appended_fingerprint_of_edited_file(tmp_path, content):
+    path = tmp_path / "bookings.csv"
+    path.write_bytes(b"a;1\nb;2\n")
+    state = IncrementalState(str(tmp_path / "state"))
+    state.update_source("bookings", IncrementalState.file_fingerprint(str(path)), size=path.stat().st_size)
+
+    path.write_bytes(content)
+    fingerprint, offset = state.appended_fingerprint("bookings", str(path))
+    assert offset == 0
+    assert fingerprint == IncrementalState.file_fingerprint(str(path))
@@ -0,0 +1,53 @@
+import os
+import logging
+import threading
+
+import pytest
+
+from utils.data_driven_etl import DataDrivenETL
+from utils.load_scheduler import DWH_DDL_FILE, LoadScheduler, tables_dependencies
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGGER = logging.getLogger(__name__)
+
+
+def test_dependencies_from_ddl():
+    dependencies = tables_dependencies(list(DataDrivenETL.DWH_TABLES_INFO), os.path.join(REPO_DIR, DWH_DDL_FILE))
+    assert dependencies["dim_companies"] == set()
+    assert dependencies["dim_users"] == {"dim_companies"}
+    assert {"dim_hotels", "dim_meals", "dim_dates", "dim_users"} <= dependencies["fact_bookings"]
+
+
+def test_dependencies_without_ddl(tmp_path):
+    dependencies = tables_dependencies(["a", "b", "c"], str(tmp_path / "missing.sql"))
+    assert dependencies == {"a": set(), "b": {"a"}, "c": {"a", "b"}}
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_tables_start_after_their_parents(max_workers):
+    dependencies = {"a": set(), "b": set(), "c": {"a", "b"}, "d": {"c"}, "e": set()}
+    lock = threading.Lock()
+    loaded = []
+
+    def load_table(table_name: str) -> bool:
+        with lock:
+            assert dependencies[table_name] <= set(loaded)
+            loaded.append(table_name)
+        return True
+
+    timings = LoadScheduler(dependencies, LOGGER, max_workers=max_workers).run(load_table)
+    assert sorted(loaded) == sorted(dependencies)
+    assert set(timings) == set(dependencies)
+
+
+def test_children_of_failed_tables_are_skipped():
+    dependencies = {"a": set(), "b": {"a"}, "c": {"b"}, "d": set()}
+    loaded = []
+
+    def load_table(table_name: str) -> bool:
+        loaded.append(table_name)
+        return table_name != "a"
+
+    timings = LoadScheduler(dependencies, LOGGER).run(load_table)
+    assert loaded == ["a", "d"]
+    assert set(timings) == {"d"}
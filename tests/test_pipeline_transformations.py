@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.countries_imputation import legacy_countries_imputation
+from benchmarks.synthetic_data import generate_bookings, generate_users
+from utils.agent_distribution import AgentDistribution
+from utils.pipeline_transformations import PipelineTransformations
+
+
+def missing_countries_bookings(num_rows: int, seed: int) -> pd.DataFrame:
+    hotel_bookings_df = generate_bookings(num_rows, seed=seed, country_null_rate=0.2)
+    hotel_bookings_df['country'] = hotel_bookings_df['country'].fillna('Unknown')
+    return hotel_bookings_df
+
+
+def test_countries_imputation_matches_legacy():
+    hotel_bookings_df = missing_countries_bookings(5000, seed=1)
+    legacy_df = legacy_countries_imputation(hotel_bookings_df.copy())
+    vectorized_df = PipelineTransformations.countries_imputation(hotel_bookings_df.copy())
+    pd.testing.assert_frame_equal(legacy_df, vectorized_df)
+
+
+def test_countries_imputation_breaks_ties_as_mode():
+    hotel_bookings_df = pd.DataFrame({'agent': [1.0, 1.0, 1.0, 2.0, 2.0, None],
+                                      'country': ['GBR', 'ESP', 'Unknown', 'PRT', 'Unknown', 'Unknown']})
+    legacy_df = legacy_countries_imputation(hotel_bookings_df.copy())
+    vectorized_df = PipelineTransformations.countries_imputation(hotel_bookings_df.copy())
+    pd.testing.assert_frame_equal(legacy_df, vectorized_df)
+    assert vectorized_df['country'].tolist() == ['GBR', 'ESP', 'ESP', 'PRT', 'PRT', 'Unknown']
+
+
+def test_modal_countries_of_every_agent():
+    hotel_bookings_df = missing_countries_bookings(2000, seed=2)
+    modal_countries = PipelineTransformations.modal_countries(
+        PipelineTransformations.agent_country_counts(hotel_bookings_df))
+    for agent, agent_bookings_df in hotel_bookings_df.dropna(subset=['agent']).groupby('agent'):
+        assert modal_countries[agent] == agent_bookings_df['country'].mode().iloc[0]
+
+
+def test_string_kernels_match_scalar_functions():
+    users_df = generate_users(2000, seed=4)
+    phones = users_df['phone']
+    pd.testing.assert_series_equal(phones.apply(PipelineTransformations.standardize_phone).astype(object),
+                                   PipelineTransformations.standardize_phones(phones).astype(object))
+    emails = pd.concat([users_df['email'], pd.Series(['user@example.com\n', 'user@example.com\n\n', 'a@b.co',
+                                                      'no-at.com'])], ignore_index=True)
+    for dtype in ('str', 'object'):
+        emails = emails.astype(dtype)
+        pd.testing.assert_series_equal(emails.apply(PipelineTransformations.is_valid_email).astype(bool),
+                                       PipelineTransformations.validate_emails(emails))
+
+
+def test_email_with_one_trailing_newline_is_valid():
+    assert PipelineTransformations.is_valid_email('user@example.com\n')
+    assert not PipelineTransformations.is_valid_email('user@example.com\n\n')
+    emails = pd.Series(['user@example.com\n', 'user@example.com\n\n', None])
+    assert PipelineTransformations.validate_emails(emails).tolist() == [True, False, False]
+
+
+def test_agents_imputation_with_seed_does_not_depend_on_chunks():
+    hotel_bookings_df = generate_bookings(3000, seed=5)
+    agent_distribution = AgentDistribution.from_agents(hotel_bookings_df['agent'])
+    whole_df = PipelineTransformations.agents_imputation(hotel_bookings_df.copy(),
+                                                         agent_distribution=agent_distribution, seed=11)
+    chunks_df = pd.concat([PipelineTransformations.agents_imputation(chunk_df.copy(),
+                                                                     agent_distribution=agent_distribution, seed=11)
+                           for chunk_df in (hotel_bookings_df.iloc[start:start + 700]
+                                            for start in range(0, len(hotel_bookings_df), 700))])
+    assert whole_df['agent'].notna().all()
+    pd.testing.assert_series_equal(whole_df['agent'], chunks_df['agent'])
+    # Shuffled bookings are imputed the same agents
+    shuffled_df = PipelineTransformations.agents_imputation(hotel_bookings_df.sample(frac=1, random_state=0),
+                                                            agent_distribution=agent_distribution, seed=11)
+    pd.testing.assert_series_equal(whole_df['agent'], shuffled_df['agent'].sort_index())
+
+
+def test_agents_sampled_by_fingerprint_follow_the_distribution():
+    agent_distribution = AgentDistribution([1, 2, 3], [1, 2, 7])
+    fingerprints = np.arange(100_000, dtype='uint64')
+    agents = agent_distribution.sample_by_fingerprint(fingerprints, seed=1)
+    np.testing.assert_array_equal(agents, agent_distribution.sample_by_fingerprint(fingerprints, seed=1))
+    assert (agents != agent_distribution.sample_by_fingerprint(fingerprints, seed=2)).any()
+    frequencies = pd.Series(agents).value_counts(normalize=True).sort_index()
+    np.testing.assert_allclose(frequencies.to_numpy(), agent_distribution.probabilities().to_numpy(), atol=0.01)
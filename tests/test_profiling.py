@@ -0,0 +1,28 @@
+import json
+import time
+import logging
+
+import numpy as np
+import pytest
+
+from utils.profiling import PipelineProfiler, current_rss, stage
+
+pytestmark = pytest.mark.skipif(current_rss() is None, reason="RSS not available on this platform")
+
+
+def test_stage_peak_rss_is_sampled_while_the_stage_runs(tmp_path):
+    with PipelineProfiler(logging.getLogger(__name__), metrics_dir=str(tmp_path)) as profiler:
+        with stage("allocate"):
+            # Freed before the stage ends, so only the sampler sees it
+            allocated = np.ones(200 * 2 ** 20 // 8)
+            time.sleep(0.1)
+            del allocated
+        with stage("small"):
+            time.sleep(0.05)
+
+    allocate, small = profiler.stages["allocate"], profiler.stages["small"]
+    assert allocate.peak_rss_increase > 150
+    assert small.peak_rss < allocate.peak_rss - 150
+    assert small.peak_rss_increase < 50
+    metrics = json.loads(next(tmp_path.iterdir()).read_text())
+    assert metrics["stages"][0]["peak_rss_increase_mib"] == round(allocate.peak_rss_increase, 1)
@@ -0,0 +1,49 @@
+import logging
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate_bookings, generate_users
+from utils.data_driven_etl import DataDrivenETL
+from utils.query_engine import ANALYSIS_QUERIES, QueryEngine
+from utils.schemas import BOOKINGS_SCHEMA, apply_schema
+
+pytest.importorskip("duckdb")
+
+LOGGER = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="module", params=["csv", "parquet"])
+def query_engines(request, tmp_path_factory) -> tuple:
+    tmp_path = tmp_path_factory.mktemp(request.param)
+    etl = DataDrivenETL(logger=LOGGER, storage_format=request.param)
+    extractions_dir, transformations_dir = str(tmp_path / "extract"), str(tmp_path / "transform")
+    (tmp_path / "extract").mkdir()
+    (tmp_path / "transform").mkdir()
+    etl.storage.write(apply_schema(generate_bookings(3000, seed=1), BOOKINGS_SCHEMA),
+                      etl.storage.path(extractions_dir, "hotel_bookings"))
+    etl.storage.write(generate_users(10, seed=3), etl.storage.path(extractions_dir, "users"))
+    etl.transform(["hotel_bookings.csv", "users.csv"], extractions_dir=extractions_dir,
+                  transformations_dir=transformations_dir, seed=3)
+    return tuple(QueryEngine(LOGGER, transformations_dir=transformations_dir, storage_format=request.param,
+                             engine=engine, chunk_size=700)
+                 for engine in QueryEngine.ENGINES)
+
+
+@pytest.mark.parametrize("query_name", list(ANALYSIS_QUERIES))
+def test_duckdb_and_pandas_results_are_equal(query_engines, query_name):
+    duckdb_engine, pandas_engine = query_engines
+    duckdb_df = duckdb_engine.query(query_name)
+    pandas_df = pandas_engine.query(query_name)
+    assert len(duckdb_df) > 0
+    pd.testing.assert_frame_equal(duckdb_df.reset_index(drop=True), pandas_df.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_table_filters_are_equal(query_engines):
+    duckdb_engine, pandas_engine = query_engines
+    filters = [("num_bookings", ">", 10), ("country", "not in", ["PRT", "ESP"])]
+    duckdb_df = duckdb_engine.table("agg_bookings_by_country", columns=["country", "num_bookings"], filters=filters)
+    pandas_df = pandas_engine.table("agg_bookings_by_country", columns=["country", "num_bookings"], filters=filters)
+    assert len(duckdb_df) > 0
+    pd.testing.assert_frame_equal(duckdb_df, pandas_df, check_dtype=False, check_categorical=False)
@@ -0,0 +1,60 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_bookings
+from utils.row_deduplicator import RowDeduplicator
+
+LOGGER = logging.getLogger(__name__)
+
+
+def bookings_with_duplicates() -> pd.DataFrame:
+    bookings_df = generate_bookings(3000, seed=7)
+    return pd.concat([bookings_df, bookings_df.iloc[:200]], ignore_index=True)
+
+
+def deduplicate_in_chunks(deduplicator: RowDeduplicator, df: pd.DataFrame, chunk_size: int) -> pd.DataFrame:
+    return pd.concat([deduplicator.drop_duplicates(df.iloc[start:start + chunk_size], "bookings")
+                      for start in range(0, len(df), chunk_size)])
+
+
+def test_spilled_deduplication_matches_memory_and_pandas(tmp_path):
+    bookings_df = bookings_with_duplicates()
+    expected_df = bookings_df[~bookings_df.duplicated()]
+    with RowDeduplicator(LOGGER) as deduplicator:
+        memory_df = deduplicate_in_chunks(deduplicator, bookings_df, 300)
+    with RowDeduplicator(LOGGER, spill_dir=str(tmp_path), max_fingerprints=500) as deduplicator:
+        spilled_df = deduplicate_in_chunks(deduplicator, bookings_df, 300)
+        assert deduplicator.run_paths
+        assert deduplicator.duplicates["bookings"] == len(bookings_df) - len(expected_df)
+        np.testing.assert_array_equal(deduplicator.fingerprints(),
+                                      np.sort(RowDeduplicator.fingerprint(expected_df)))
+    assert not list(tmp_path.iterdir())
+
+    pd.testing.assert_frame_equal(memory_df, expected_df)
+    pd.testing.assert_frame_equal(spilled_df, expected_df)
+
+
+def test_buffers_merged_into_geometric_sizes():
+    rng = np.random.default_rng(0)
+    fingerprints = rng.integers(0, 2 ** 63, size=50_000, dtype='uint64')
+    fingerprints = np.concatenate([fingerprints, fingerprints[::7]])
+    deduplicator = RowDeduplicator(LOGGER)
+    is_new = np.concatenate([deduplicator.first_seen(fingerprints[start:start + 100], "fingerprints")
+                             for start in range(0, len(fingerprints), 100)])
+
+    np.testing.assert_array_equal(is_new, ~pd.Series(fingerprints).duplicated().to_numpy())
+    sizes = [len(buffer) for buffer in deduplicator.buffers]
+    assert len(sizes) <= np.log(len(fingerprints)) / np.log(RowDeduplicator.MERGE_FACTOR) + 1
+    assert all(size > RowDeduplicator.MERGE_FACTOR * next_size for size, next_size in zip(sizes, sizes[1:]))
+    assert all((buffer[1:] > buffer[:-1]).all() for buffer in deduplicator.buffers)
+
+
+def test_rows_seen_by_previous_runs_are_dropped():
+    bookings_df = bookings_with_duplicates()
+    deduplicator = RowDeduplicator(LOGGER, seen=RowDeduplicator.fingerprint(bookings_df.iloc[:1000]))
+    new_df = deduplicator.drop_duplicates(bookings_df.iloc[500:1500], "bookings")
+    is_first = ~bookings_df.iloc[:1500].duplicated()
+    is_first.iloc[:1000] = False
+    pd.testing.assert_frame_equal(new_df, bookings_df.iloc[:1500][is_first])
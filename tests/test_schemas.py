@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate_bookings
+from utils.schemas import BOOKINGS_SCHEMA, apply_schema, get_schema
+from utils.storage import get_storage
+
+
+def test_apply_schema_narrows_bookings():
+    bookings_df = apply_schema(generate_bookings(1000, seed=3), BOOKINGS_SCHEMA)
+    for column, dtype in BOOKINGS_SCHEMA.items():
+        if column in bookings_df.columns:
+            assert bookings_df[column].dtype == dtype
+    assert get_schema("data/extract/hotel_bookings.csv") is BOOKINGS_SCHEMA
+
+
+def test_integers_out_of_range_are_not_wrapped(tmp_path):
+    storage = get_storage("csv")
+    path = storage.path(str(tmp_path), "hotel_bookings")
+    bookings_df = generate_bookings(1000, seed=3).astype({'is_canceled': 'int64'})
+    bookings_df.loc[5, 'is_canceled'] = 300
+    storage.write(bookings_df, path)
+    with pytest.raises(ValueError, match="is_canceled"):
+        storage.read(path, dtype=BOOKINGS_SCHEMA)
+    with pytest.raises(ValueError, match="is_canceled"):
+        list(storage.read_chunks(path, 400, dtype=BOOKINGS_SCHEMA))
+
+
+def test_missing_values_keep_nullable_integers():
+    df = pd.DataFrame({'agent': [1.0, None, 300.0]})
+    assert apply_schema(df, BOOKINGS_SCHEMA)['agent'].tolist()[::2] == [1, 300]
@@ -0,0 +1,33 @@
+import logging
+
+import pandas as pd
+
+from utils.row_deduplicator import RowDeduplicator
+from utils.sequential_keys import SequentialKeyGenerator
+
+LOGGER = logging.getLogger(__name__)
+
+
+def test_new_rows_continue_the_numbering(tmp_path):
+    df = pd.DataFrame({'booking': [10, 11, 10, 12, 13, 11]})
+    generator = SequentialKeyGenerator(['booking'], LOGGER)
+    first_df = generator.new_rows(df.iloc[:4], 'booking_id', 'fact')
+    assert first_df['booking'].tolist() == [10, 11, 12]
+    assert first_df['booking_id'].tolist() == [1, 2, 3]
+
+    path = str(tmp_path / ("keys" + SequentialKeyGenerator.EXTENSION))
+    generator.save(path)
+    loaded = SequentialKeyGenerator.load(path, ['booking'], LOGGER)
+    second_df = loaded.new_rows(df.iloc[4:], 'booking_id', 'fact')
+    assert second_df['booking'].tolist() == [13]
+    assert second_df['booking_id'].tolist() == [4]
+    assert 'booking_id' not in df.columns
+
+
+def test_rows_identified_by_given_fingerprints():
+    source_df = pd.DataFrame({'booking': [10, 10, 10], 'source_column': ['a', 'b', 'a']})
+    generator = SequentialKeyGenerator(['booking'], LOGGER)
+    new_df = generator.new_rows(source_df[['booking']], 'booking_id', 'fact',
+                                fingerprints=RowDeduplicator.fingerprint(source_df))
+    assert new_df.index.tolist() == [0, 1]
+    assert new_df['booking_id'].tolist() == [1, 2]
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate_bookings
+from utils.schemas import BOOKINGS_SCHEMA, apply_schema
+from utils.storage import get_storage
+
+
+def bookings(num_rows: int = 3000) -> pd.DataFrame:
+    return apply_schema(generate_bookings(num_rows, seed=2), BOOKINGS_SCHEMA)
+
+
+@pytest.mark.parametrize("storage_format", ["csv", "parquet"])
+def test_round_trip(tmp_path, storage_format):
+    storage = get_storage(storage_format)
+    bookings_df = bookings()
+    path = storage.path(str(tmp_path), "hotel_bookings.csv")
+    storage.write(bookings_df, path)
+
+    pd.testing.assert_frame_equal(storage.read(path, dtype=BOOKINGS_SCHEMA), bookings_df)
+    chunks_df = pd.concat(storage.read_chunks(path, 1000, dtype=BOOKINGS_SCHEMA), ignore_index=True)
+    # Chunks may have different categories
+    pd.testing.assert_frame_equal(apply_schema(chunks_df, BOOKINGS_SCHEMA), bookings_df, check_categorical=False)
+
+
+@pytest.mark.parametrize("storage_format", ["csv", "parquet"])
+def test_writer_appends_chunks(tmp_path, storage_format):
+    storage = get_storage(storage_format)
+    bookings_df = bookings()
+    path = storage.path(str(tmp_path), "hotel_bookings")
+    with storage.writer(path) as writer:
+        for start in range(0, len(bookings_df), 1000):
+            writer.write(bookings_df.iloc[start:start + 1000])
+    assert writer.rows == len(bookings_df)
+    pd.testing.assert_frame_equal(storage.read(path, dtype=BOOKINGS_SCHEMA), bookings_df)
+
+
+def test_csv_read_from_offset(tmp_path):
+    storage = get_storage("csv")
+    bookings_df = bookings()
+    path = storage.path(str(tmp_path), "hotel_bookings")
+    storage.write(bookings_df.iloc[:1000], path)
+    offset = (tmp_path / "hotel_bookings.csv").stat().st_size
+    storage.write(bookings_df, path)
+
+    appended_df = pd.concat(storage.read_chunks(path, 400, dtype=BOOKINGS_SCHEMA, offset=offset), ignore_index=True)
+    pd.testing.assert_frame_equal(apply_schema(appended_df, BOOKINGS_SCHEMA),
+                                  bookings_df.iloc[1000:].reset_index(drop=True), check_categorical=False)
+
+
+def test_parquet_cannot_be_read_from_offset(tmp_path):
+    storage = get_storage("parquet")
+    path = storage.path(str(tmp_path), "hotel_bookings")
+    storage.write(bookings(), path)
+    with pytest.raises(ValueError):
+        next(storage.read_chunks(path, 1000, offset=10))
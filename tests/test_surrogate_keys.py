@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_bookings
+from utils.surrogate_keys import SurrogateKeyGenerator
+
+
+def test_keys_do_not_depend_on_chunks():
+    hotel_bookings_df = generate_bookings(3000, seed=7)
+    whole_keys = SurrogateKeyGenerator(['hotel', 'meal']).assign(hotel_bookings_df)
+    generator = SurrogateKeyGenerator(['hotel', 'meal'])
+    chunk_keys = pd.concat([generator.assign(hotel_bookings_df.iloc[start:start + 500])
+                            for start in range(0, len(hotel_bookings_df), 500)])
+    pd.testing.assert_series_equal(whole_keys, chunk_keys)
+    num_combinations = len(hotel_bookings_df[['hotel', 'meal']].drop_duplicates())
+    assert sorted(whole_keys.unique()) == list(range(1, num_combinations + 1))
+
+
+def test_keys_are_assigned_in_first_seen_order():
+    df = pd.DataFrame({'a': ['x', 'x', 'y', None, None, 'x'], 'b': [1.0, 2.0, 1.0, np.nan, 1.0, 1.0]})
+    keys = SurrogateKeyGenerator(['a', 'b'], start=10).assign(df)
+    assert keys.tolist() == [10, 11, 12, 13, 14, 10]
+    assert keys.index.equals(df.index)
+
+
+def test_distinct_values_never_share_a_key():
+    # Every distinct value gets its own key, whatever their hashes
+    values = pd.DataFrame({'value': np.arange(100_000)})
+    keys = SurrogateKeyGenerator(['value']).assign(values)
+    assert keys.nunique() == len(values)
+
+
+def test_keys_ignore_categories():
+    generator = SurrogateKeyGenerator(['meal'])
+    first = generator.assign(pd.DataFrame({'meal': pd.Categorical(['BB', 'HB'])}))
+    second = generator.assign(pd.DataFrame({'meal': pd.Categorical(['HB', 'FB'], categories=['FB', 'HB', 'SC'])}))
+    assert first.tolist() == [1, 2]
+    assert second.tolist() == [2, 3]
+
+
+def test_saved_keys_are_reused(tmp_path):
+    path = str(tmp_path / ("keys" + SurrogateKeyGenerator.EXTENSION))
+    generator = SurrogateKeyGenerator(['a', 'b'])
+    generator.assign(pd.DataFrame({'a': ['x', None], 'b': [1, 2]}))
+    generator.save(path)
+
+    loaded = SurrogateKeyGenerator.load(path, ['a', 'b'])
+    keys = loaded.assign(pd.DataFrame({'a': ['z', None, 'x'], 'b': [1, 2, 1]}))
+    assert keys.tolist() == [3, 2, 1]
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+
+class AgentDistribution:
+    """
+    Distribution of the booking agents, sampled to impute the missing ones.
+
+    Bookings are counted by agent, sorted by agent, so the distribution only depends on the bookings counted and not
+    on their order, and new bookings are added without counting the previous ones again. Samples are drawn in a
+    single vectorized call, searching uniform numbers in the cumulative counts, so a seeded generator gives the same
+    agents whatever the chunks or partitions the distribution was built from. Uniform numbers can also be derived from
+    the fingerprint of every booking, so a booking draws the same agent whatever the rows sampled with it.
+    """
+    # Constants of the splitmix64 finalizer, mixing fingerprints and seeds into uniform 64-bit numbers
+    MIX_MULTIPLIERS = (np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+    MIX_INCREMENT = np.uint64(0x9E3779B97F4A7C15)
+
+    def __init__(self, agents=None, counts=None):
+        """
+        Constructor for AgentDistribution.
+
+        Parameters:
+        - agents (array-like): Unique agents. Default is None, which creates an empty distribution.
+        - counts (array-like): Number of bookings of every agent. Default is None.
+        """
+        agents = np.asarray(agents if agents is not None else [], dtype='int64')
+        counts = np.asarray(counts if counts is not None else [], dtype='int64')
+        order = np.argsort(agents, kind='stable')
+        self.agents = agents[order]
+        self.counts = counts[order]
+        self.cumulative_counts = np.cumsum(self.counts)
+
+    @classmethod
+    def from_agents(cls, agents: pd.Series):
+        """
+        Count the bookings of every agent.
+
+        Parameters:
+        - agents (pd.Series): 'agent' column of the bookings, missing agents are ignored.
+
+        Returns:
+        - AgentDistribution: Distribution of the agents.
+        """
+        agent_counts = agents.value_counts()
+        return cls(agent_counts.index.to_numpy(dtype='int64'), agent_counts.to_numpy())
+
+    def update(self, agents: pd.Series):
+        """
+        Add the bookings of new agents to the counts.
+
+        Parameters:
+        - agents (pd.Series): 'agent' column of the new bookings, missing agents are ignored.
+        """
+        new = AgentDistribution.from_agents(agents)
+        merged_agents = np.union1d(self.agents, new.agents)
+        merged_counts = np.zeros(len(merged_agents), dtype='int64')
+        merged_counts[np.searchsorted(merged_agents, self.agents)] += self.counts
+        merged_counts[np.searchsorted(merged_agents, new.agents)] += new.counts
+        self.agents = merged_agents
+        self.counts = merged_counts
+        self.cumulative_counts = np.cumsum(self.counts)
+
+    def probabilities(self) -> pd.Series:
+        """
+        Get the probability of every agent.
+
+        Returns:
+        - pd.Series: Probability of every agent, indexed by agent.
+        """
+        return pd.Series(self.counts / max(self.counts.sum(), 1), index=pd.Index(self.agents, name='agent'))
+
+    def sample(self, size: int, random_state: np.random.Generator = None) -> np.ndarray:
+        """
+        Draw random agents with the probabilities of the distribution.
+
+        Parameters:
+        - size (int): Number of agents to draw.
+        - random_state (np.random.Generator): Generator of the samples. Default is None, which uses the global numpy
+          random state.
+
+        Returns:
+        - np.ndarray: Drawn agents.
+
+        Raises:
+        - ValueError: If agents are drawn from an empty distribution.
+        """
+        return self.__draw((random_state or np.random).random(size))
+
+    def sample_by_fingerprint(self, fingerprints: np.ndarray, seed: int) -> np.ndarray:
+        """
+        Draw a random agent for every fingerprint, with the probabilities of the distribution.
+
+        The uniform number of every draw is a hash of the fingerprint and the seed, so the agent drawn for a booking
+        does not depend on the bookings sampled in the same call, e.g. its chunk or partition, and equal bookings draw
+        the same agent.
+
+        Parameters:
+        - fingerprints (np.ndarray): uint64 fingerprint of every booking, see RowDeduplicator.fingerprint.
+        - seed (int): Seed of the draws.
+
+        Returns:
+        - np.ndarray: Drawn agents.
+
+        Raises:
+        - ValueError: If agents are drawn from an empty distribution.
+        """
+        seed_mix = self.__mix(np.array([seed % 2 ** 64], dtype='uint64') + self.MIX_INCREMENT)
+        mixed = self.__mix(np.asarray(fingerprints, dtype='uint64') ^ seed_mix)
+        # 53 random bits, the precision of a float64 in [0, 1)
+        return self.__draw((mixed >> np.uint64(11)) * 2.0 ** -53)
+
+    @classmethod
+    def __mix(cls, values: np.ndarray) -> np.ndarray:
+        # Integer arrays wrap around on overflow, as the finalizer expects
+        values = (values ^ (values >> np.uint64(30))) * cls.MIX_MULTIPLIERS[0]
+        values = (values ^ (values >> np.uint64(27))) * cls.MIX_MULTIPLIERS[1]
+        return values ^ (values >> np.uint64(31))
+
+    def __draw(self, uniforms: np.ndarray) -> np.ndarray:
+        """
+        Map uniform numbers in [0, 1) to agents, searching them in the cumulative counts.
+
+        Parameters:
+        - uniforms (np.ndarray): Uniform numbers in [0, 1).
+
+        Returns:
+        - np.ndarray: Drawn agents.
+
+        Raises:
+        - ValueError: If agents are drawn from an empty distribution.
+        """
+        if not len(uniforms):
+            return self.agents[:0]
+        if not len(self.cumulative_counts) or self.cumulative_counts[-1] == 0:
+            raise ValueError("Cannot sample agents from an empty distribution")
+        return self.agents[np.searchsorted(self.cumulative_counts, uniforms * self.cumulative_counts[-1], side='right')]
+
+    def to_list(self) -> list:
+        """
+        Get the counts as a JSON serializable list.
+
+        Returns:
+        - list: [agent, count] pairs, sorted by agent.
+        """
+        return [[int(agent), int(count)] for agent, count in zip(self.agents, self.counts)]
+
+    @classmethod
+    def from_list(cls, agent_counts: list):
+        """
+        Create a distribution from the counts returned by AgentDistribution.to_list.
+
+        Parameters:
+        - agent_counts (list): [agent, count] pairs.
+
+        Returns:
+        - AgentDistribution: Distribution of the agents.
+        """
+        if not agent_counts:
+            return cls()
+        agents, counts = zip(*agent_counts)
+        return cls(agents, counts)
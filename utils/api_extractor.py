@@ -0,0 +1,130 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class ApiExtractor:
+    """
+    Fetch JSON records from many API endpoints concurrently.
+
+    Requests share a session with a connection pool per host, have a timeout and are retried with exponential
+    backoff on connection errors and on retryable status codes. Paginated endpoints are followed through their
+    'Link: <...>; rel="next"' header or, when a page size is set, by requesting pages until a short one is returned.
+
+    The ETag of every single page response is kept in ApiExtractor.etags, so it can be sent back to ask whether the
+    endpoint changed.
+    """
+    DEFAULT_MAX_WORKERS = 8
+    DEFAULT_TIMEOUT = 30
+    DEFAULT_RETRIES = 3
+    DEFAULT_BACKOFF_FACTOR = 0.5
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    PAGE_PARAM = "_page"
+    PAGE_SIZE_PARAM = "_limit"
+
+    def __init__(self, logger: logging.Logger, max_workers: int = DEFAULT_MAX_WORKERS, timeout: float = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+                 page_size: int = None):
+        """
+        Constructor for ApiExtractor.
+
+        Parameters:
+        - logger (logging.Logger): Logger instance for logging messages.
+        - max_workers (int): Maximum number of concurrent requests. Default is ApiExtractor.DEFAULT_MAX_WORKERS.
+        - timeout (float): Seconds to wait for the server to connect and respond. Default is ApiExtractor.DEFAULT_TIMEOUT.
+        - retries (int): Retries of every request. Default is ApiExtractor.DEFAULT_RETRIES.
+        - backoff_factor (float): Retry n waits backoff_factor * 2 ** (n - 1) seconds. Default is
+          ApiExtractor.DEFAULT_BACKOFF_FACTOR.
+        - page_size (int): Records requested per page with the ApiExtractor.PAGE_PARAM and
+          ApiExtractor.PAGE_SIZE_PARAM query parameters. Default is None, which requests the URL as it is.
+        """
+        self.logger = logger
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.page_size = page_size
+        self.etags = {}
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=self.RETRY_STATUSES,
+                      allowed_methods=["GET", "HEAD"], raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url: str, etag: str = None) -> list:
+        """
+        Fetch every record of an endpoint, following its pages.
+
+        Parameters:
+        - url (str): URL of the endpoint.
+        - etag (str): ETag of a previous response of the endpoint, sent in an If-None-Match header. Default is None.
+
+        Returns:
+        - list: Records of the endpoint, or None if the server answered that they did not change since etag.
+
+        Raises:
+        - requests.HTTPError: If a page is answered with an error status after the retries.
+        """
+        records = []
+        page = 1
+        params = {self.PAGE_PARAM: page, self.PAGE_SIZE_PARAM: self.page_size} if self.page_size else None
+        next_url = url
+        previous_page = None
+        pages = 0
+        headers = {"If-None-Match": etag} if etag else None
+        while next_url is not None:
+            response = self.session.get(next_url, params=params, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+            if pages == 0:
+                first_page_etag = response.headers.get("ETag")
+            headers = None
+            data = response.json()
+            page_records = data if isinstance(data, list) else [data]
+            if page_records == previous_page:
+                # The endpoint ignores the pagination parameters
+                break
+            records.extend(page_records)
+            previous_page = page_records
+            pages += 1
+
+            next_url, params = response.links.get("next", {}).get("url"), None
+            if next_url is None and self.page_size and len(page_records) == self.page_size:
+                page += 1
+                next_url, params = url, {self.PAGE_PARAM: page, self.PAGE_SIZE_PARAM: self.page_size}
+
+        # The ETag of the first page does not tell whether the next ones changed
+        if pages == 1 and first_page_etag:
+            self.etags[url] = first_page_etag
+        else:
+            self.etags.pop(url, None)
+        return records
+
+    def fetch_all(self, urls: dict, etags: dict = None) -> dict:
+        """
+        Fetch several endpoints concurrently.
+
+        Parameters:
+        - urls (dict): Dictionary mapping names to endpoint URLs.
+        - etags (dict): Dictionary mapping names to the ETag of a previous response of their endpoint, see
+          ApiExtractor.fetch. Default is None.
+
+        Returns:
+        - dict: Dictionary mapping names to the records of their endpoint, None if they did not change since their
+          ETag, or the exception raised fetching it.
+        """
+        etags = etags or {}
+
+        def safe_fetch(url: str, etag: str):
+            try:
+                return self.fetch(url, etag=etag)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {name: executor.submit(safe_fetch, url, etags.get(name)) for name, url in urls.items()}
+            return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+
+class BookingsAggregates:
+    """
+    Summary tables of the bookings, materialized for the queries of sql/analyze/analyisis.sql and the dashboard.
+
+    The bookings are summed into a small cube of counts by agent, meal, country and season, which is updated with
+    every chunk (or incremental run) of new bookings. The summary tables are derived from the cube joined with the
+    users and companies, as the analysis queries do, without scanning the fact table again.
+    """
+    CUBE_KEYS = ['agent_id', 'meal', 'country', 'season']
+    CUBE_MEASURES = ['num_bookings', 'num_cancellations', 'stays_in_week_nights', 'stays_in_weekend_nights']
+    # Seasons of the reservation status month, as in the analysis queries
+    SEASONS = {12: 'Invierno', 1: 'Invierno', 2: 'Invierno', 3: 'Primavera', 4: 'Primavera', 5: 'Primavera',
+               6: 'Verano', 7: 'Verano', 8: 'Verano', 9: 'Otoño', 10: 'Otoño', 11: 'Otoño'}
+    OTHER_SEASON = 'Otro'
+    MEAL_PACKAGES = {'Undefined': 'No meal package', 'SC': 'No meal package', 'BB': 'Bed & Breakfast',
+                     'HB': 'Half board', 'FB': 'Full board'}
+    OTHER_MEAL_PACKAGE = 'Other'
+    TABLES_INFO = {
+        "agg_bookings_by_agent": ['agent_name', 'num_bookings', 'num_cancellations', 'total_stay', 'avg_stay'],
+        "agg_bookings_by_company": ['company_name', 'num_bookings', 'num_cancellations', 'total_stay', 'avg_stay'],
+        "agg_bookings_by_country": ['country', 'num_bookings', 'num_cancellations', 'cancelled_percentage',
+                                    'total_stay', 'avg_stay'],
+        "agg_bookings_by_meal": ['meal', 'meal_package', 'num_bookings', 'num_cancellations', 'total_stay',
+                                 'avg_stay'],
+        "agg_bookings_by_season": ['season', 'num_bookings', 'num_cancelled_bookings', 'cancelled_percentage',
+                                   'total_stay_in_days', 'avg_stay_in_week', 'avg_stay_total', 'num_undefined_meal',
+                                   'num_bed_breakfast', 'num_half_board', 'num_full_board']
+    }
+    PRIMARY_KEYS = {
+        "agg_bookings_by_agent": "agent_name",
+        "agg_bookings_by_company": "company_name",
+        "agg_bookings_by_country": "country",
+        "agg_bookings_by_meal": "meal",
+        "agg_bookings_by_season": "season"
+    }
+
+    def __init__(self):
+        """
+        Constructor for BookingsAggregates.
+        """
+        self.cube = self.__empty_cube()
+
+    def __empty_cube(self) -> pd.DataFrame:
+        return pd.DataFrame(columns=self.CUBE_KEYS + self.CUBE_MEASURES).astype(
+            {'agent_id': 'Int64', **{measure: 'int64' for measure in self.CUBE_MEASURES}})
+
+    def update(self, hotel_bookings_df: pd.DataFrame):
+        """
+        Add new bookings to the cube.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): Transformed bookings, one row per new fact booking, with the 'agent_id',
+          'meal', 'country', 'is_canceled', 'stays_in_week_nights', 'stays_in_weekend_nights' and
+          'reservation_status_date' columns.
+        """
+        if hotel_bookings_df.empty:
+            return
+        seasons = hotel_bookings_df['reservation_status_date'].dt.month.map(self.SEASONS).fillna(self.OTHER_SEASON)
+        bookings_df = pd.DataFrame({
+            'agent_id': hotel_bookings_df['agent_id'],
+            'meal': hotel_bookings_df['meal'],
+            'country': hotel_bookings_df['country'],
+            'season': seasons,
+            'num_bookings': 1,
+            'num_cancellations': hotel_bookings_df['is_canceled'].astype('int64'),
+            'stays_in_week_nights': hotel_bookings_df['stays_in_week_nights'].astype('int64'),
+            'stays_in_weekend_nights': hotel_bookings_df['stays_in_weekend_nights'].astype('int64'),
+        })
+        cube = bookings_df.groupby(self.CUBE_KEYS, dropna=False, observed=True, sort=False).sum().reset_index()
+        # Categories of the chunks may differ, the cube stores the values
+        cube = cube.astype({'agent_id': 'Int64', 'meal': str, 'country': str, 'season': str})
+        self.cube = self.__sum(pd.concat([self.cube, cube], ignore_index=True)) if len(self.cube) else cube
+
+    def __sum(self, cube: pd.DataFrame) -> pd.DataFrame:
+        return cube.groupby(self.CUBE_KEYS, dropna=False, sort=False).sum().reset_index()
+
+    @staticmethod
+    def __stays(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the total and average stay nights of grouped cube rows.
+
+        Parameters:
+        - df (pd.DataFrame): Summed measures of the cube.
+
+        Returns:
+        - pd.DataFrame: df with the 'total_stay' and 'avg_stay' columns.
+        """
+        df['total_stay'] = df['stays_in_week_nights'] + df['stays_in_weekend_nights']
+        df['avg_stay'] = df['total_stay'] / df['num_bookings'].replace(0, np.nan)
+        return df
+
+    def __users_bookings(self, users_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Join the users with the cube rows of their bookings, keeping the users without bookings.
+
+        Parameters:
+        - users_df (pd.DataFrame): Users DWH table, with the 'id', 'username' and 'company_id' columns.
+
+        Returns:
+        - pd.DataFrame: Cube rows of every user, with zero measures for the users without bookings.
+        """
+        users_df = users_df[['id', 'username', 'company_id']].astype({'id': 'Int64'})
+        users_bookings_df = users_df.merge(self.cube, how='left', left_on='id', right_on='agent_id')
+        users_bookings_df[self.CUBE_MEASURES] = users_bookings_df[self.CUBE_MEASURES].fillna(0).astype('int64')
+        return users_bookings_df
+
+    def tables(self, users_df: pd.DataFrame, companies_df: pd.DataFrame) -> dict:
+        """
+        Create the summary tables.
+
+        Averages are exact, not truncated like the averages of integer columns in SQL Server.
+
+        Parameters:
+        - users_df (pd.DataFrame): Users DWH table, with the 'id', 'username' and 'company_id' columns.
+        - companies_df (pd.DataFrame): Companies DWH table, with the 'company_id' and 'company_name' columns.
+
+        Returns:
+        - dict: Dictionary mapping table names to their DataFrames.
+        """
+        users_bookings_df = self.__users_bookings(users_df)
+
+        # Bookings by agent: users left joined with their bookings
+        agents_df = users_bookings_df.groupby('username', sort=True)[self.CUBE_MEASURES].sum()
+        agents_df = self.__stays(agents_df).reset_index().rename(columns={'username': 'agent_name'})
+
+        # Bookings by company: companies left joined with their users and their bookings
+        companies_bookings_df = companies_df[['company_id', 'company_name']].merge(users_bookings_df, how='left',
+                                                                                   on='company_id')
+        companies_bookings_df[self.CUBE_MEASURES] = companies_bookings_df[self.CUBE_MEASURES].fillna(0)
+        companies_df = companies_bookings_df.groupby('company_name', sort=True)[self.CUBE_MEASURES].sum()
+        companies_df = self.__stays(companies_df.astype('int64')).reset_index()
+
+        # Bookings and cancellations by country, of every booking
+        countries_df = self.__stays(self.cube.groupby('country', sort=True)[self.CUBE_MEASURES].sum())
+        countries_df['cancelled_percentage'] = (countries_df['num_cancellations'] /
+                                                countries_df['num_bookings'] * 100).round(2)
+        countries_df = countries_df.reset_index()
+
+        # Bookings by meal and meal package, of every booking
+        meals_df = self.__stays(self.cube.groupby('meal', sort=True)[self.CUBE_MEASURES].sum()).reset_index()
+        meals_df['meal_package'] = meals_df['meal'].map(self.MEAL_PACKAGES).fillna(self.OTHER_MEAL_PACKAGE)
+
+        # Bookings by season: users left joined with their bookings, users without bookings fall in OTHER_SEASON
+        users_bookings_df['season'] = users_bookings_df['season'].fillna(self.OTHER_SEASON)
+        for meal, column in (('Undefined', 'num_undefined_meal'), ('BB', 'num_bed_breakfast'),
+                             ('HB', 'num_half_board'), ('FB', 'num_full_board')):
+            users_bookings_df[column] = users_bookings_df['num_bookings'].where(users_bookings_df['meal'] == meal, 0)
+        seasons_df = users_bookings_df.groupby('season', sort=True)[
+            self.CUBE_MEASURES + ['num_undefined_meal', 'num_bed_breakfast', 'num_half_board', 'num_full_board']
+        ].sum()
+        seasons_df = self.__stays(seasons_df).reset_index().rename(columns={
+            'num_cancellations': 'num_cancelled_bookings', 'total_stay': 'total_stay_in_days',
+            'avg_stay': 'avg_stay_total'})
+        num_bookings = seasons_df['num_bookings'].replace(0, np.nan)
+        seasons_df['cancelled_percentage'] = (seasons_df['num_cancelled_bookings'] / num_bookings * 100).round(2)
+        seasons_df['avg_stay_in_week'] = seasons_df['stays_in_week_nights'] / num_bookings
+
+        tables = {"agg_bookings_by_agent": agents_df, "agg_bookings_by_company": companies_df,
+                  "agg_bookings_by_country": countries_df, "agg_bookings_by_meal": meals_df,
+                  "agg_bookings_by_season": seasons_df}
+        return {table_name: table_df[self.TABLES_INFO[table_name]] for table_name, table_df in tables.items()}
+
+    def save(self, path: str):
+        """
+        Save the cube into a CSV file, so later incremental runs only add their new bookings.
+
+        Parameters:
+        - path (str): Path of the CSV file.
+        """
+        self.cube.to_csv(path, index=False)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load a cube saved with BookingsAggregates.save.
+
+        Parameters:
+        - path (str): Path of the CSV file.
+
+        Returns:
+        - BookingsAggregates: Aggregates with the saved cube.
+        """
+        aggregates = cls()
+        cube = pd.read_csv(path, keep_default_na=False, na_values={'agent_id': ['']})
+        if len(cube):
+            aggregates.cube = cube.astype({'agent_id': 'Int64', 'meal': str, 'country': str, 'season': str,
+                                           **{measure: 'int64' for measure in cls.CUBE_MEASURES}})
+        return aggregates
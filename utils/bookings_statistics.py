@@ -0,0 +1,118 @@
+import json
+
+import pandas as pd
+
+from utils.agent_distribution import AgentDistribution
+from utils.pipeline_transformations import PipelineTransformations
+
+
+class BookingsStatistics:
+    """
+    Statistics of the hotel bookings needed by the imputations, accumulated over several DataFrames.
+
+    It allows imputing chunks of bookings with the agent distribution and modal countries of the whole file.
+    """
+
+    def __init__(self):
+        """
+        Constructor for BookingsStatistics.
+        """
+        self.agents = AgentDistribution()
+        self.agent_country_counts = pd.Series(dtype='int64')
+
+    def update(self, hotel_bookings_df: pd.DataFrame):
+        """
+        Add the bookings of a DataFrame to the statistics.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): DataFrame containing at least the 'agent' and 'country' columns, with
+          missing countries already filled as 'Unknown'.
+        """
+        agent_country_counts = PipelineTransformations.agent_country_counts(hotel_bookings_df)
+        self.agents.update(hotel_bookings_df['agent'])
+        self.agent_country_counts = self.__add_counts(self.agent_country_counts, agent_country_counts)
+
+    def update_imputed(self, hotel_bookings_df: pd.DataFrame):
+        """
+        Add the countries of bookings whose agent was imputed, without adding them to the agent distribution.
+
+        Modal countries are computed once agents are imputed, so these bookings count for the country of the agent
+        drawn for them, as they do when the whole file is transformed at once.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): DataFrame containing the imputed 'agent' and the 'country' columns, with
+          missing countries already filled as 'Unknown'.
+        """
+        agent_country_counts = PipelineTransformations.agent_country_counts(hotel_bookings_df)
+        self.agent_country_counts = self.__add_counts(self.agent_country_counts, agent_country_counts)
+
+    @staticmethod
+    def __add_counts(counts: pd.Series, new_counts: pd.Series) -> pd.Series:
+        """
+        Add two Series of counts aligned by their index.
+
+        Parameters:
+        - counts (pd.Series): Accumulated counts.
+        - new_counts (pd.Series): Counts to add.
+
+        Returns:
+        - pd.Series: Sum of both counts.
+        """
+        if counts.empty:
+            return new_counts.astype('int64')
+        return counts.add(new_counts, fill_value=0).astype('int64')
+
+    def agent_distribution(self) -> AgentDistribution:
+        """
+        Get the distribution of the 'agent' values (excluding NaN).
+
+        Returns:
+        - AgentDistribution: Distribution of the agents.
+        """
+        return self.agents
+
+    def modal_countries(self) -> pd.Series:
+        """
+        Get the most common 'country' for each 'agent'.
+
+        Returns:
+        - pd.Series: Most common 'country' indexed by 'agent'.
+        """
+        return PipelineTransformations.modal_countries(self.agent_country_counts)
+
+    def save(self, path: str):
+        """
+        Save the statistics into a JSON file.
+
+        Parameters:
+        - path (str): Path of the JSON file.
+        """
+        statistics = {
+            "agent_counts": self.agents.to_list(),
+            "agent_country_counts": [[agent, country, int(count)]
+                                     for (agent, country), count in self.agent_country_counts.items()]
+        }
+        with open(path, "w") as f:
+            # Numpy scalars are converted into Python numbers
+            json.dump(statistics, f, default=lambda value: value.item())
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load statistics saved with BookingsStatistics.save.
+
+        Parameters:
+        - path (str): Path of the JSON file.
+
+        Returns:
+        - BookingsStatistics: Loaded statistics.
+        """
+        with open(path) as f:
+            statistics = json.load(f)
+        bookings_statistics = cls()
+        bookings_statistics.agents = AgentDistribution.from_list(statistics["agent_counts"])
+        if statistics["agent_country_counts"]:
+            agents, countries, counts = zip(*statistics["agent_country_counts"])
+            index = pd.MultiIndex.from_arrays([agents, countries], names=['agent', 'country'])
+            bookings_statistics.agent_country_counts = pd.Series(counts, index=index, dtype='int64')
+        return bookings_statistics
@@ -0,0 +1,275 @@
+import io
+import logging
+
+import pandas as pd
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+
+
+class BulkLoader:
+    """
+    Load DataFrames into existing DWH tables in large batches, keeping their DDL (primary and foreign keys).
+
+    Tables are emptied instead of dropped. Rows are sent with the COPY protocol on PostgreSQL and with batched
+    executemany calls on the other databases (fast_executemany on SQL Server, see create_connection).
+    """
+    DEFAULT_BATCH_SIZE = 50_000
+
+    def __init__(self, engine: Engine, logger: logging.Logger, schema_name: str = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Constructor for BulkLoader.
+
+        Parameters:
+        - engine (sqlalchemy.engine.Engine): Engine of the DWH database.
+        - logger (logging.Logger): Logger instance for logging messages.
+        - schema_name (str): Schema of the tables, ignored on SQLite. Default is None.
+        - batch_size (int): Number of rows sent per batch. Default is BulkLoader.DEFAULT_BATCH_SIZE.
+        """
+        self.engine = engine
+        self.logger = logger
+        self.schema_name = None if engine.dialect.name == "sqlite" else schema_name
+        self.batch_size = batch_size
+
+    def qualified_name(self, table_name: str) -> str:
+        """
+        Get the quoted name of a table, prefixed by its schema.
+
+        Parameters:
+        - table_name (str): Name of the table.
+
+        Returns:
+        - str: Qualified table name.
+        """
+        quote = self.engine.dialect.identifier_preparer.quote
+        if self.schema_name:
+            return f"{quote(self.schema_name)}.{quote(table_name)}"
+        return quote(table_name)
+
+    def truncate(self, table_names: list):
+        """
+        Delete the rows of existing tables. Tables are emptied in reverse order, so children tables must come after
+        their parents to respect foreign keys.
+
+        Parameters:
+        - table_names (list): Names of the tables, parents first.
+        """
+        existing_tables = set(inspect(self.engine).get_table_names(schema=self.schema_name))
+        with self.engine.begin() as conn:
+            for table_name in reversed(table_names):
+                if table_name not in existing_tables:
+                    continue
+                conn.exec_driver_sql(f"DELETE FROM {self.qualified_name(table_name)}")
+                self.logger.info(f"Table truncated: {table_name}")
+
+    def create_table(self, conn: Connection, df: pd.DataFrame, table_name: str, primary_key: str = None):
+        """
+        Create a table from the columns of a DataFrame if it does not exist yet.
+
+        Used with local databases (SQLite, PostgreSQL) that were not created with sql/create/create_dwh.sql.
+
+        Parameters:
+        - conn (sqlalchemy.engine.Connection): Connection to the DWH database.
+        - df (pd.DataFrame): Table data.
+        - table_name (str): Name of the table.
+        - primary_key (str): Primary key column. Default is None.
+        """
+        if inspect(conn).has_table(table_name, schema=self.schema_name):
+            return
+        ddl = pd.io.sql.get_schema(df, table_name, keys=primary_key, con=conn, schema=self.schema_name)
+        conn.exec_driver_sql(ddl)
+        self.logger.warning(f"Table {table_name} did not exist, created from the data columns")
+
+    def null_missing_references(self, df: pd.DataFrame, column: str, parent_table_name: str, parent_column: str,
+                                conn: Connection = None) -> pd.DataFrame:
+        """
+        Set to NULL the values of a foreign key column without a row in the table it references.
+
+        Parameters:
+        - df (pd.DataFrame): Table data.
+        - column (str): Foreign key column of df.
+        - parent_table_name (str): Name of the referenced table, already loaded.
+        - parent_column (str): Referenced column.
+        - conn (sqlalchemy.engine.Connection): Connection used to read the referenced keys. Default is None, which
+          opens a connection on the engine.
+
+        Returns:
+        - pd.DataFrame: df, with the values of column missing from the referenced table set to NULL. Unchanged if
+          the referenced table does not exist.
+        """
+        if conn is None:
+            with self.engine.connect() as conn:
+                return self.null_missing_references(df, column, parent_table_name, parent_column, conn=conn)
+
+        if not inspect(conn).has_table(parent_table_name, schema=self.schema_name):
+            return df
+        quote = self.engine.dialect.identifier_preparer.quote
+        parent_keys = conn.exec_driver_sql(
+            f"SELECT DISTINCT {quote(parent_column)} FROM {self.qualified_name(parent_table_name)}").scalars().all()
+        missing = df[column].notna() & ~df[column].isin(parent_keys)
+        if missing.any():
+            df = df.assign(**{column: df[column].mask(missing)})
+            self.logger.warning(f"{int(missing.sum())} values of {column} without row in {parent_table_name} "
+                                f"loaded as NULL")
+        return df
+
+    def load(self, df: pd.DataFrame, table_name: str, primary_key: str = None, conn: Connection = None):
+        """
+        Insert a DataFrame into a table in batches.
+
+        Parameters:
+        - df (pd.DataFrame): Table data.
+        - table_name (str): Name of the table.
+        - primary_key (str): Primary key column, used if the table has to be created. Default is None.
+        - conn (sqlalchemy.engine.Connection): Connection used to insert the rows. Default is None, which opens a
+          transaction on the engine.
+        """
+        if conn is None:
+            with self.engine.begin() as conn:
+                return self.load(df, table_name, primary_key=primary_key, conn=conn)
+
+        self.create_table(conn, df, table_name, primary_key=primary_key)
+        self.__insert(conn, df, table_name)
+
+    def replace(self, df: pd.DataFrame, table_name: str, primary_key: str = None, conn: Connection = None):
+        """
+        Replace every row of a table by the rows of a DataFrame, in a single transaction.
+
+        Parameters:
+        - df (pd.DataFrame): Table data.
+        - table_name (str): Name of the table.
+        - primary_key (str): Primary key column, used if the table has to be created. Default is None.
+        - conn (sqlalchemy.engine.Connection): Connection used to replace the rows. Default is None, which opens a
+          transaction on the engine.
+        """
+        if conn is None:
+            with self.engine.begin() as conn:
+                return self.replace(df, table_name, primary_key=primary_key, conn=conn)
+
+        self.create_table(conn, df, table_name, primary_key=primary_key)
+        deleted = conn.exec_driver_sql(f"DELETE FROM {self.qualified_name(table_name)}").rowcount
+        self.__insert(conn, df, table_name)
+        self.logger.info(f"{deleted} rows replaced by {len(df)} rows in: {table_name}")
+
+    def delete_unreferenced(self, table_name: str, column: str, child_table_name: str, child_column: str,
+                            conn: Connection = None) -> int:
+        """
+        Delete the rows of a table whose key is not referenced by any row of another table.
+
+        Parameters:
+        - table_name (str): Name of the table whose rows are deleted.
+        - column (str): Key column of the table.
+        - child_table_name (str): Name of the table referencing the keys.
+        - child_column (str): Column of the child table referencing the keys.
+        - conn (sqlalchemy.engine.Connection): Connection used to delete the rows. Default is None, which opens a
+          transaction on the engine.
+
+        Returns:
+        - int: Number of rows deleted.
+        """
+        if conn is None:
+            with self.engine.begin() as conn:
+                return self.delete_unreferenced(table_name, column, child_table_name, child_column, conn=conn)
+
+        quote = self.engine.dialect.identifier_preparer.quote
+        deleted = conn.exec_driver_sql(
+            f"DELETE FROM {self.qualified_name(table_name)} WHERE {quote(column)} NOT IN "
+            f"(SELECT {quote(child_column)} FROM {self.qualified_name(child_table_name)} "
+            f"WHERE {quote(child_column)} IS NOT NULL)").rowcount
+        if deleted:
+            self.logger.info(f"{deleted} rows not referenced by {child_table_name} deleted from: {table_name}")
+        return deleted
+
+    def upsert(self, df: pd.DataFrame, table_name: str, primary_key: str, conn: Connection = None):
+        """
+        Insert or update the rows of a DataFrame into a table, matching them by primary key.
+
+        Rows are bulk inserted into a staging table and merged with MERGE on SQL Server and with
+        INSERT ... ON CONFLICT on PostgreSQL and SQLite.
+
+        Parameters:
+        - df (pd.DataFrame): Table data.
+        - table_name (str): Name of the table.
+        - primary_key (str): Primary key column.
+        - conn (sqlalchemy.engine.Connection): Connection used to merge the rows. Default is None, which opens a
+          transaction on the engine.
+        """
+        if conn is None:
+            with self.engine.begin() as conn:
+                return self.upsert(df, table_name, primary_key, conn=conn)
+
+        self.create_table(conn, df, table_name, primary_key=primary_key)
+        if df.empty:
+            return
+        staging_table_name = f"staging_{table_name}"
+        df.head(0).to_sql(name=staging_table_name, con=conn, schema=self.schema_name, if_exists="replace",
+                          index=False)
+        self.__insert(conn, df, staging_table_name)
+
+        quote = self.engine.dialect.identifier_preparer.quote
+        target, staging = self.qualified_name(table_name), self.qualified_name(staging_table_name)
+        key = quote(primary_key)
+        columns = [quote(column) for column in df.columns]
+        update_columns = [column for column in columns if column != key]
+        if self.engine.dialect.name == "mssql":
+            matched = ""
+            if update_columns:
+                matched = "WHEN MATCHED THEN UPDATE SET " + ", ".join(
+                    f"target.{column} = source.{column}" for column in update_columns) + " "
+            merge_sql = (f"MERGE INTO {target} AS target USING {staging} AS source "
+                         f"ON target.{key} = source.{key} {matched}"
+                         f"WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) "
+                         f"VALUES ({', '.join('source.' + column for column in columns)});")
+        else:
+            conflict = "DO NOTHING"
+            if update_columns:
+                conflict = "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in update_columns)
+            # WHERE clause needed by SQLite to parse ON CONFLICT after a SELECT
+            merge_sql = (f"INSERT INTO {target} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM {staging} "
+                         f"WHERE 1 = 1 ON CONFLICT ({key}) {conflict}")
+        conn.exec_driver_sql(merge_sql)
+        conn.exec_driver_sql(f"DROP TABLE {staging}")
+        self.logger.info(f"{len(df)} rows merged into: {table_name}")
+
+    def __insert(self, conn: Connection, df: pd.DataFrame, table_name: str):
+        """
+        Insert a DataFrame into an existing table in batches.
+
+        Parameters:
+        - conn (sqlalchemy.engine.Connection): Connection to the DWH database.
+        - df (pd.DataFrame): Table data.
+        - table_name (str): Name of the table.
+        """
+        if self.engine.dialect.name == "postgresql":
+            self.__copy(conn, df, table_name)
+        else:
+            df.to_sql(name=table_name, con=conn, schema=self.schema_name, if_exists="append", index=False,
+                      chunksize=self.batch_size)
+
+    def __copy(self, conn: Connection, df: pd.DataFrame, table_name: str):
+        """
+        Insert a DataFrame into a PostgreSQL table with COPY FROM STDIN, one CSV buffer per batch.
+
+        Parameters:
+        - conn (sqlalchemy.engine.Connection): Connection to the DWH database.
+        - df (pd.DataFrame): Table data.
+        - table_name (str): Name of the table.
+        """
+        quote = self.engine.dialect.identifier_preparer.quote
+        columns = ", ".join(quote(column) for column in df.columns)
+        copy_sql = f"COPY {self.qualified_name(table_name)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        cursor = conn.connection.cursor()
+        try:
+            for start in range(0, len(df), self.batch_size):
+                buffer = io.StringIO()
+                df.iloc[start:start + self.batch_size].to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                if hasattr(cursor, "copy_expert"):
+                    # psycopg2
+                    cursor.copy_expert(copy_sql, buffer)
+                else:
+                    # psycopg 3
+                    with cursor.copy(copy_sql) as copy:
+                        copy.write(buffer.getvalue())
+        finally:
+            cursor.close()
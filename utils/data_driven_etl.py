@@ -1,12 +1,32 @@
 import os
+import json
+import hashlib
 import logging
-import requests
-
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, nullcontext
+
+from utils.api_extractor import ApiExtractor
+from utils.bookings_aggregates import BookingsAggregates
+from utils.bookings_statistics import BookingsStatistics
+from utils.bulk_loader import BulkLoader
 from utils.etl import ETL
-from utils.general_functions import create_connection
+from utils.general_functions import CONFIG_FILE, create_connection
+from utils.incremental_state import IncrementalState
+from utils.load_scheduler import LoadScheduler, tables_dependencies
+from utils.partitioned_transform import PartitionedTransform
 from utils.pipeline_transformations import PipelineTransformations
+from utils.profiling import current_stage, profile_step, record_io, stage
+from utils.row_deduplicator import RowDeduplicator
+from utils.schemas import (BOOKINGS_SCHEMA, USERS_SCHEMA, add_categories, apply_schema, get_schema, memory_usage,
+                           read_dtypes)
+from utils.sequential_keys import SequentialKeyGenerator
+from utils.stage_cache import StageCache
+from utils.storage import Storage, get_storage
+from utils.surrogate_keys import SurrogateKeyGenerator
 
 
+import numpy as np
 import pandas as pd
 
 
@@ -20,61 +40,191 @@ class DataDrivenETL(ETL):
         "dim_meals": ["meal_id", "meal"],
         "dim_dates": ["arrival_date_id", "arrival_date"],
         "dim_users": ['id', 'name', 'username', 'email', 'phone', 'website', 'street', 'suite', 'city', 'zipcode', 'geo_lat', 'geo_lng', 'company_id'],
-        "fact_bookings": ['hotel_id', 'agent_id', 'meal_id', 'is_canceled', 'lead_time', 'stays_in_weekend_nights', 'stays_in_week_nights', 'adults', 'children', 'country', 'is_repeated_guest', 'previous_cancellations', 'previous_bookings_not_canceled', 'reserved_room_type', 'assigned_room_type', 'reservation_status', 'reservation_status_date', 'arrival_date_id']
+        "fact_bookings": ['hotel_id', 'agent_id', 'meal_id', 'is_canceled', 'lead_time', 'stays_in_weekend_nights', 'stays_in_week_nights', 'adults', 'children', 'country', 'is_repeated_guest', 'previous_cancellations', 'previous_bookings_not_canceled', 'reserved_room_type', 'assigned_room_type', 'reservation_status', 'reservation_status_date', 'arrival_date_id'],
+        # Summary tables of the analysis queries
+        **BookingsAggregates.TABLES_INFO
+    }
+    # Users columns extracted from the nested 'address' and 'company' fields of the users API
+    USERS_NESTED_COLUMNS = {
+        "street": "address.street",
+        "suite": "address.suite",
+        "city": "address.city",
+        "zipcode": "address.zipcode",
+        "geo_lat": "address.geo.lat",
+        "geo_lng": "address.geo.lng",
+        "company_name": "company.name",
+        "company_catchPhrase": "company.catchPhrase",
+        "company_bs": "company.bs"
+    }
+    # Primary keys of the DWH tables, with the column names of sql/create/create_dwh.sql
+    DWH_PRIMARY_KEYS = {
+        "dim_companies": "company_id",
+        "dim_hotels": "hotel_id",
+        "dim_meals": "meal_id",
+        "dim_dates": "date_id",
+        "dim_users": "id",
+        "fact_bookings": "booking_id",
+        **BookingsAggregates.PRIMARY_KEYS
+    }
+    # Columns named differently in the transformed data and in sql/create/create_dwh.sql
+    DWH_COLUMNS_RENAME = {"dim_dates": {"arrival_date_id": "date_id"}}
+    # Foreign keys of sql/create/create_dwh.sql whose values may have no parent row. Booking agents are not all
+    # users, so "bulk" and "upsert" loads, which keep the foreign keys, load the agents without user as NULL
+    NULLABLE_FOREIGN_KEYS = {"fact_bookings": {"agent_id": ("dim_users", "id")}}
+    # Dimension keys only referenced by another dimension: companies only exist through their users, so the
+    # companies left without users by an upsert load are deleted
+    REFERENCED_KEYS = {"dim_companies": ("company_id", "dim_users", "company_id")}
+    LOAD_MODES = ("replace", "bulk", "upsert")
+    # Modules whose code the outputs of every stage depend on, part of their cache keys
+    CACHE_CODE_MODULES = {
+        "extract": ["utils.data_driven_etl", "utils.schemas", "utils.storage"],
+        "transform": ["utils.data_driven_etl", "utils.pipeline_transformations", "utils.schemas", "utils.storage",
+                      "utils.surrogate_keys", "utils.sequential_keys", "utils.row_deduplicator",
+                      "utils.bookings_statistics", "utils.partitioned_transform", "utils.agent_distribution",
+                      "utils.bookings_aggregates"],
+        "load": ["utils.data_driven_etl", "utils.bulk_loader", "utils.schemas", "utils.storage"]
     }
+    DEFAULT_INCREMENTAL_CHUNK_SIZE = 1_000_000
+    # Fingerprints of a chunk of bookings, kept on disk between both passes of a chunked transform
+    CHUNK_FINGERPRINTS_FILE = "bookings_{}.npy"
 
-    def __init__(self, logger: logging.Logger, files_separator: str = ETL.DEFAULT_SEPARATOR):
+    def __init__(self, logger: logging.Logger, files_separator: str = ETL.DEFAULT_SEPARATOR,
+                 storage_format: str = ETL.DEFAULT_STORAGE_FORMAT, connection_url: str = None,
+                 api_extractor: ApiExtractor = None, cache: StageCache = None):
         """
         Constructor for DataDrivenETL.
 
         Parameters:
         - logger (logging.Logger): Logger instance for logging messages.
         - files_separator (str): Separator used in files. Default is ETL.DEFAULT_SEPARATOR.
+        - storage_format (str): Format of the extract and transform intermediate files, "csv" or "parquet".
+          Default is ETL.DEFAULT_STORAGE_FORMAT.
+        - connection_url (str): SQLAlchemy URL of the DWH database. Default is None, which uses utils/config.json.
+        - api_extractor (ApiExtractor): Extractor of the API sources. Default is None, which uses an ApiExtractor with
+          its default settings.
+        - cache (StageCache): Cache of the extract, transform and load outputs, so the extract and transform stages
+          whose inputs, code and parameters did not change since a cached run are skipped, and the load too with
+          load(skip_unchanged=True). Default is None, which runs every stage.
         """
         super().__init__()
         self.logger = logger
         self.files_separator = files_separator
+        self.storage = get_storage(storage_format)
+        self.connection_url = connection_url
+        self.api_extractor = api_extractor or ApiExtractor(logger)
+        self.cache = cache
 
-    def __get_data_from_files(self, files_to_extract: dict,  extractions_dir: str = ETL.DEFAULT_EXTRACTIONS_DIR):
+    def __cache_key(self, stage_name: str, **inputs) -> str:
+        """
+        Get the cache key of a stage run, including the version of its code and the storage format.
+
+        Parameters:
+        - stage_name (str): Name of the stage, a key of DataDrivenETL.CACHE_CODE_MODULES.
+        - inputs: Fingerprints and parameters the stage outputs depend on.
+
+        Returns:
+        - str: Key of the stage run.
+        """
+        return self.cache.key(stage_name, code=self.cache.code_version(self.CACHE_CODE_MODULES[stage_name]),
+                              storage_format=self.storage.EXTENSION, **inputs)
+
+    def __get_data_from_files(self, files_to_extract: dict,  extractions_dir: str = ETL.DEFAULT_EXTRACTIONS_DIR,
+                              state: IncrementalState = None):
         """
         Extract data from files.
 
         Parameters:
         - files_to_extract (dict): Dictionary mapping save file names to extract file names.
         - extractions_dir (str): Directory path for extraction. Default is ETL.DEFAULT_EXTRACTIONS_DIR.
+        - state (IncrementalState): State of incremental runs, files not changed since their last extraction are
+          skipped. Default is None, which extracts every file.
         """
         for save_file_name, extract_file_name in files_to_extract.items():
+            save_path = self.storage.path(extractions_dir, save_file_name)
+            if state is not None:
+                fingerprint = IncrementalState.file_fingerprint(extract_file_name)
+                if not state.source_changed(f"extract:{save_file_name}", fingerprint) and os.path.exists(save_path):
+                    self.logger.info(f"{extract_file_name} not changed since its last extraction")
+                    continue
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.__cache_key("extract", source=self.cache.fingerprint(extract_file_name),
+                                             file_name=save_file_name, separator=self.files_separator)
+                if self.cache.restore(cache_key, {os.path.basename(save_path): save_path}):
+                    if state is not None:
+                        state.update_source(f"extract:{save_file_name}", fingerprint)
+                    self.logger.info(f"{extract_file_name} restored from the cache into {save_path}")
+                    continue
             self.logger.info(f"Started extraction: {extract_file_name}")
-            df = pd.read_csv(extract_file_name, sep=self.files_separator)
-            save_path = os.path.join(extractions_dir, save_file_name).replace("\\", "/")
-            df.to_csv(save_path, index=False)
+            schema = get_schema(save_file_name)
+            df = apply_schema(pd.read_csv(extract_file_name, sep=self.files_separator, dtype=read_dtypes(schema)),
+                              schema)
+            record_io(rows_read=len(df), bytes_read=os.path.getsize(extract_file_name))
+            self.logger.info(f"{extract_file_name} read: {memory_usage(df)}")
+            self.storage.write(df, save_path)
+            if cache_key is not None:
+                self.cache.store(cache_key, {os.path.basename(save_path): save_path})
+            if state is not None:
+                state.update_source(f"extract:{save_file_name}", fingerprint)
             self.logger.info(f"{save_file_name} extracted properly into {save_path}")
 
     def __get_data_from_apis(self, urls_to_extract: dict, extractions_dir: str = ETL.DEFAULT_EXTRACTIONS_DIR):
         """
         Extract data from APIs.
 
+        With a cache, the ETag of the cached response of every URL is sent along the request, and the cached
+        extraction is restored if the server answers that the data did not change. Responses without ETag are
+        identified by the hash of their content.
+
         Parameters:
         - urls_to_extract (dict): Dictionary mapping save file names to API URLs.
         - extractions_dir (str): Directory path for extraction. Default is ETL.DEFAULT_EXTRACTIONS_DIR.
         """
+        self.logger.info(f"Started extraction: {list(urls_to_extract.values())}")
+        etags = {save_file_name: self.cache.etag(extract_url) for save_file_name, extract_url in
+                 urls_to_extract.items()} if self.cache is not None else None
+        responses = self.api_extractor.fetch_all(urls_to_extract, etags=etags)
         for save_file_name, extract_url in urls_to_extract.items():
-            self.logger.info(f"Started extraction: {extract_url}")
-            response = requests.get(extract_url)
-
-            # Check if the request was successful (status code 200)
-            if response.status_code == 200:
-                # Load JSON data into a Pandas DataFrame
-                data = response.json()
-                df = pd.DataFrame(data)
-                save_path = os.path.join(extractions_dir, save_file_name).replace("\\", "/")
-                df.to_csv(save_path, index=False)
-                self.logger.info(f"{extract_url} extracted properly into {save_path}")
-            else:
-                self.logger.info(f"Error: {response.status_code} in {extract_url}")
-
+            data = responses[save_file_name]
+            save_path = self.storage.path(extractions_dir, save_file_name)
+            cache_files = {os.path.basename(save_path): save_path}
+            if data is None:
+                # Not modified since the cached response
+                cache_key = self.__cache_key("extract", url=extract_url, response=etags[save_file_name],
+                                             file_name=save_file_name)
+                if self.cache.restore(cache_key, cache_files):
+                    self.logger.info(f"{extract_url} not modified, restored from the cache into {save_path}")
+                    continue
+                try:
+                    data = self.api_extractor.fetch(extract_url)
+                except Exception as e:
+                    data = e
+            if isinstance(data, Exception):
+                self.logger.info(f"Error: {data} in {extract_url}")
+                continue
+
+            cache_key = None
+            if self.cache is not None:
+                etag = self.api_extractor.etags.get(extract_url)
+                response = etag or hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+                cache_key = self.__cache_key("extract", url=extract_url, response=response, file_name=save_file_name)
+                if etag is not None:
+                    self.cache.set_etag(extract_url, etag)
+                if self.cache.restore(cache_key, cache_files):
+                    self.logger.info(f"{extract_url} not changed, restored from the cache into {save_path}")
+                    continue
+            # Flatten nested JSON objects into dotted path columns, e.g. 'address.geo.lat'
+            df = apply_schema(pd.json_normalize(data), get_schema(save_file_name))
+            record_io(rows_read=len(df))
+            self.storage.write(df, save_path)
+            if cache_key is not None:
+                self.cache.store(cache_key, cache_files)
+            self.logger.info(f"{extract_url} extracted properly into {save_path}")
+
+    @profile_step
     def extract(self, files_to_extract: dict, urls_to_extract: dict,
-                extractions_dir: str = ETL.DEFAULT_EXTRACTIONS_DIR):
+                extractions_dir: str = ETL.DEFAULT_EXTRACTIONS_DIR, incremental: bool = False,
+                state_dir: str = ETL.DEFAULT_STATE_DIR):
         """
         Extract data from files and APIs.
 
@@ -82,30 +232,66 @@ class DataDrivenETL(ETL):
         - files_to_extract (dict): Dictionary mapping save file names to extract file names.
         - urls_to_extract (dict): Dictionary mapping save file names to API URLs.
         - extractions_dir (str): Directory path for extraction. Default is ETL.DEFAULT_EXTRACTIONS_DIR.
+        - incremental (bool): Skip the files not changed since the previous incremental run. Default is False.
+        - state_dir (str): Directory of the incremental state files. Default is ETL.DEFAULT_STATE_DIR.
         """
-        self.__get_data_from_files(files_to_extract, extractions_dir=extractions_dir)
-        self.__get_data_from_apis(urls_to_extract, extractions_dir=extractions_dir)
-
-    def __bookings_transformations(self, hotel_bookings_df) -> pd.DataFrame:
+        state = IncrementalState(state_dir) if incremental else None
+        parent_stage = current_stage()
+
+        def extract_files():
+            with stage("files", parent=parent_stage):
+                self.__get_data_from_files(files_to_extract, extractions_dir=extractions_dir, state=state)
+
+        def extract_apis():
+            with stage("apis", parent=parent_stage):
+                self.__get_data_from_apis(urls_to_extract, extractions_dir=extractions_dir)
+
+        # Files and APIs are extracted concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            files_extraction = executor.submit(extract_files)
+            apis_extraction = executor.submit(extract_apis)
+            files_extraction.result()
+            apis_extraction.result()
+        if state is not None:
+            state.save()
+
+    @profile_step
+    def __bookings_transformations(self, hotel_bookings_df, statistics: BookingsStatistics = None, seed: int = None,
+                                   partitioned_transform: PartitionedTransform = None,
+                                   fingerprints: np.ndarray = None) -> pd.DataFrame:
         """
         Apply transformations specific to hotel bookings data.
 
         Parameters:
         - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+        - statistics (BookingsStatistics): Statistics used by the imputations. Default is None, which computes them
+          from hotel_bookings_df.
+        - seed (int): Seed of the imputed agents, drawn from the fingerprint of every booking so they do not depend on
+          its chunk or partition. Default is None, which draws them from the global numpy random state.
+        - partitioned_transform (PartitionedTransform): Process pool transforming ranges of the bookings, with the
+          same result. Default is None, which transforms them in the current process.
+        - fingerprints (np.ndarray): uint64 fingerprint of every source booking, see RowDeduplicator.fingerprint.
+          Default is None, which hashes the bookings.
 
         Returns:
         - pd.DataFrame: Transformed DataFrame.
         """
-        # Dates standarize
-        hotel_bookings_df = PipelineTransformations.dates_standardize(hotel_bookings_df=hotel_bookings_df)
-        # Data Cleansing
-        hotel_bookings_df['meal'].replace({'Undefined': 'SC'}, inplace=True)
-        hotel_bookings_df['country'].fillna('Unknown', inplace=True)
+        agent_distribution = statistics.agent_distribution() if statistics is not None else None
+        modal_countries = statistics.modal_countries() if statistics is not None else None
+        if partitioned_transform is not None:
+            return partitioned_transform.run(hotel_bookings_df, agent_distribution=agent_distribution,
+                                             modal_countries=modal_countries, seed=seed, fingerprints=fingerprints)
+
+        hotel_bookings_df = PipelineTransformations.bookings_cleansing(hotel_bookings_df=hotel_bookings_df)
         # Data imputation
-        hotel_bookings_df = PipelineTransformations.agents_imputation(hotel_bookings_df=hotel_bookings_df)
-        hotel_bookings_df = PipelineTransformations.countries_imputation(hotel_bookings_df=hotel_bookings_df)
+        hotel_bookings_df = PipelineTransformations.agents_imputation(hotel_bookings_df=hotel_bookings_df,
+                                                                      agent_distribution=agent_distribution,
+                                                                      seed=seed, fingerprints=fingerprints)
+        hotel_bookings_df = PipelineTransformations.countries_imputation(hotel_bookings_df=hotel_bookings_df,
+                                                                         modal_countries=modal_countries)
         return hotel_bookings_df
 
+    @profile_step
     def __users_transformations(self, users_df) -> pd.DataFrame:
         """
         Apply transformations specific to users data.
@@ -116,128 +302,610 @@ class DataDrivenETL(ETL):
         Returns:
         - pd.DataFrame: Transformed DataFrame.
         """
-        users_df = PipelineTransformations.get_address_subfields(users_df=users_df)
-        users_df = PipelineTransformations.get_company_subfields(users_df=users_df)
-        users_df.drop(['address', 'company'], axis=1, inplace=True)
-        users_df['phone'] = users_df['phone'].apply(PipelineTransformations.standardize_phone)
-        users_df['email_valid'] = users_df['email'].apply(PipelineTransformations.is_valid_email)
-        users_df['website'] = users_df['website'].apply(
-            lambda x: 'http://' + x if not x.startswith(('http://', 'https://')) else x)
-        users_df['name'] = users_df['name'].str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
-        users_df['username'] = users_df['username'].str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
+        users_df = PipelineTransformations.flatten_columns(users_df, self.USERS_NESTED_COLUMNS)
+        users_df['phone'] = PipelineTransformations.standardize_phones(users_df['phone'])
+        users_df['email_valid'] = PipelineTransformations.validate_emails(users_df['email'])
+        users_df['website'] = PipelineTransformations.standardize_websites(users_df['website'])
+        users_df['name'] = PipelineTransformations.remove_special_characters(users_df['name'])
+        users_df['username'] = PipelineTransformations.remove_special_characters(users_df['username'])
         users_df[['geo_lat', 'geo_lng']] = users_df[['geo_lat', 'geo_lng']].apply(pd.to_numeric, errors='coerce')
         return users_df
 
-    def __save_transformations_data(self, hotel_bookings_df: pd.DataFrame,
-                                    users_df: pd.DataFrame, transformations_dir: str):
+    @profile_step
+    def __users_tables(self, users_df: pd.DataFrame, company_keys: SurrogateKeyGenerator = None) -> dict:
         """
-        Save transformed data into CSV files.
+        Create the users related DWH tables.
 
         Parameters:
-        - hotel_bookings_df (pd.DataFrame): Transformed DataFrame for hotel bookings.
         - users_df (pd.DataFrame): Transformed DataFrame for users.
-        - transformations_dir (str): Directory path for storing transformations.
+        - company_keys (SurrogateKeyGenerator): Generator of the company ids. Default is None, which numbers the
+          companies from 1.
+
+        Returns:
+        - dict: Dictionary mapping table names to their DataFrames.
         """
         # Dim companies
-        unique_companies = users_df[self.DWH_TABLES_INFO["dim_companies"]].drop_duplicates()
-        # Create a mapping between unique companies and company IDs
-        company_mapping = {tuple(row): idx + 1 for idx, row in enumerate(unique_companies.itertuples(index=False))}
-        # Assign company IDs to the DataFrame
-        users_df['company_id'] = users_df[self.DWH_TABLES_INFO["dim_companies"]].apply(
-            lambda row: company_mapping[tuple(row)], axis=1)
-        companies_df = users_df[["company_id"] + self.DWH_TABLES_INFO["dim_companies"]].copy()
+        if company_keys is None:
+            company_keys = SurrogateKeyGenerator(self.DWH_TABLES_INFO["dim_companies"])
+        users_df['company_id'] = company_keys.assign(users_df)
+        # Several users may work at the same company
+        companies_df = users_df[["company_id"] + self.DWH_TABLES_INFO["dim_companies"]].drop_duplicates(
+            subset="company_id")
         self.logger.info("Dim companies created properly")
 
+        return {"dim_companies": companies_df, "dim_users": users_df[self.DWH_TABLES_INFO["dim_users"]]}
+
+    def __bookings_keys(self, spill_dir: str = None) -> dict:
+        """
+        Create the surrogate key generators of the bookings related DWH tables.
+
+        Parameters:
+        - spill_dir (str): Existing directory the fingerprints of the bookings are spilled into, see
+          SequentialKeyGenerator. Default is None, which keeps them in memory.
+
+        Returns:
+        - dict: Dictionary mapping key columns to their generator, a SurrogateKeyGenerator for the dimensions and a
+          SequentialKeyGenerator for the bookings.
+        """
+        return {
+            "hotel_id": SurrogateKeyGenerator(['hotel']),
+            "meal_id": SurrogateKeyGenerator(['meal']),
+            "booking_id": SequentialKeyGenerator(self.DWH_TABLES_INFO["fact_bookings"], self.logger,
+                                                 spill_dir=spill_dir)
+        }
+
+    @profile_step
+    def __bookings_tables(self, hotel_bookings_df: pd.DataFrame, bookings_keys: dict, dates_ids: set,
+                          aggregates: BookingsAggregates = None, fingerprints: np.ndarray = None) -> dict:
+        """
+        Create the bookings related DWH tables.
+
+        Only the rows with keys not seen in previous calls are returned, so the generators in bookings_keys and
+        dates_ids can be shared between the chunks of a file. Duplicated bookings, in the call or with previous
+        calls, are dropped: bookings are identified by the fingerprint of their source row.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): Transformed DataFrame for hotel bookings.
+        - bookings_keys (dict): Dictionary mapping key columns to their generator, see DataDrivenETL.__bookings_keys.
+        - dates_ids (set): Ids of the dates already created, updated with the new ones.
+        - aggregates (BookingsAggregates): Summary of the bookings, updated with the new fact bookings. Default is
+          None.
+        - fingerprints (np.ndarray): uint64 fingerprint of the source row of every booking, computed once when the
+          bookings are read (see RowDeduplicator.fingerprint). Default is None, which hashes the fact columns.
 
+        Returns:
+        - dict: Dictionary mapping table names to their DataFrames.
+        """
         # Dim hotel
-        hotel_columns = ['hotel']
-        unique_hotels = hotel_bookings_df[hotel_columns].drop_duplicates()
-        # Create a mapping between unique companies and company IDs
-        hotel_mapping = {tuple(row): idx + 1 for idx, row in enumerate(unique_hotels.itertuples(index=False))}
-        hotel_bookings_df['hotel_id'] = hotel_bookings_df[hotel_columns].apply(lambda row: hotel_mapping[tuple(row)],
-                                                                               axis=1)
-        hotels_df = hotel_bookings_df[self.DWH_TABLES_INFO["dim_hotels"]].drop_duplicates().copy()
+        first_new_key = bookings_keys["hotel_id"].next_key
+        hotel_bookings_df['hotel_id'] = bookings_keys["hotel_id"].assign(hotel_bookings_df)
+        # Keys identify the values of the dimension columns, so rows are deduplicated by key
+        hotels_df = hotel_bookings_df.loc[hotel_bookings_df['hotel_id'] >= first_new_key,
+                                          self.DWH_TABLES_INFO["dim_hotels"]]
+        hotels_df = hotels_df[~hotels_df['hotel_id'].duplicated()]
         self.logger.info("Dim hotels created properly")
 
         # Dim meals
-        meal_columns = ['meal']
-        unique_meal = hotel_bookings_df[meal_columns].drop_duplicates()
-        # Create a mapping between unique companies and company IDs
-        meal_mapping = {tuple(row): idx + 1 for idx, row in enumerate(unique_meal.itertuples(index=False))}
-        hotel_bookings_df['meal_id'] = hotel_bookings_df[meal_columns].apply(lambda row: meal_mapping[tuple(row)],
-                                                                             axis=1)
-        meals_df = hotel_bookings_df[self.DWH_TABLES_INFO["dim_meals"]].drop_duplicates().copy()
+        first_new_key = bookings_keys["meal_id"].next_key
+        hotel_bookings_df['meal_id'] = bookings_keys["meal_id"].assign(hotel_bookings_df)
+        meals_df = hotel_bookings_df.loc[hotel_bookings_df['meal_id'] >= first_new_key,
+                                         self.DWH_TABLES_INFO["dim_meals"]]
+        meals_df = meals_df[~meals_df['meal_id'].duplicated()]
         self.logger.info("Dim meals created properly")
 
         # Dim dates
-        hotel_bookings_df['arrival_date_id'] = hotel_bookings_df['arrival_date'].dt.strftime('%Y%m%d').astype(int)
-        dates_df = hotel_bookings_df[self.DWH_TABLES_INFO["dim_dates"]].drop_duplicates().copy()
+        # Same ids as strftime('%Y%m%d'), without formatting a string per booking
+        arrival_date = hotel_bookings_df['arrival_date'].dt
+        hotel_bookings_df['arrival_date_id'] = (arrival_date.year * 10000 + arrival_date.month * 100 +
+                                                arrival_date.day).astype(int)
+        dates_df = hotel_bookings_df[self.DWH_TABLES_INFO["dim_dates"]]
+        dates_df = dates_df[~dates_df['arrival_date_id'].duplicated()]
+        dates_df = dates_df[~dates_df['arrival_date_id'].isin(dates_ids)]
+        dates_ids.update(dates_df['arrival_date_id'])
         hotel_bookings_df.rename(columns={"agent": "agent_id"}, inplace=True)
         self.logger.info("Dim dates created properly")
 
         # Fact bookings
-        unique_hotels = hotel_bookings_df[self.DWH_TABLES_INFO["fact_bookings"]].drop_duplicates()
-        # Create a mapping between unique companies and company IDs
-        hotel_mapping = {tuple(row): idx + 1 for idx, row in enumerate(unique_hotels.itertuples(index=False))}
-        hotel_bookings_df['booking_id'] = hotel_bookings_df[self.DWH_TABLES_INFO["fact_bookings"]].apply(lambda row: hotel_mapping[tuple(row)], axis=1)
-        fact_bookings_df = hotel_bookings_df[["booking_id"] + self.DWH_TABLES_INFO["fact_bookings"]].drop_duplicates()
+        new_bookings_df = bookings_keys["booking_id"].new_rows(hotel_bookings_df, "booking_id", "fact_bookings",
+                                                               fingerprints=fingerprints)
+        fact_bookings_df = new_bookings_df[["booking_id"] + self.DWH_TABLES_INFO["fact_bookings"]]
+        if aggregates is not None:
+            aggregates.update(new_bookings_df)
         self.logger.info("Fact bookings created properly")
 
+        return {"dim_hotels": hotels_df, "dim_meals": meals_df, "dim_dates": dates_df,
+                "fact_bookings": fact_bookings_df}
+
+    @profile_step
+    def __aggregate_tables(self, aggregates: BookingsAggregates, users_tables: dict) -> dict:
+        """
+        Create the summary tables of the bookings.
+
+        Parameters:
+        - aggregates (BookingsAggregates): Summary of the bookings.
+        - users_tables (dict): Dictionary mapping table names to DataFrames, with the 'dim_users' and
+          'dim_companies' tables.
+
+        Returns:
+        - dict: Dictionary mapping table names to their DataFrames.
+        """
+        tables = aggregates.tables(users_tables["dim_users"], users_tables["dim_companies"])
+        self.logger.info("Summary tables created properly")
+        return tables
+
+    def __save_transformations_data(self, hotel_bookings_df: pd.DataFrame,
+                                    users_df: pd.DataFrame, transformations_dir: str,
+                                    fingerprints: np.ndarray = None):
+        """
+        Save transformed data into intermediate files.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): Transformed DataFrame for hotel bookings.
+        - users_df (pd.DataFrame): Transformed DataFrame for users.
+        - transformations_dir (str): Directory path for storing transformations.
+        - fingerprints (np.ndarray): uint64 fingerprint of the source row of every booking. Default is None.
+        """
+        aggregates = BookingsAggregates()
+        tables = self.__users_tables(users_df)
+        tables.update(self.__bookings_tables(hotel_bookings_df, self.__bookings_keys(), set(), aggregates=aggregates,
+                                             fingerprints=fingerprints))
+        tables.update(self.__aggregate_tables(aggregates, tables))
+
         # Load data
-        companies_df.to_csv(os.path.join(transformations_dir, "dim_companies.csv").replace("\\"
-                                                                                           "", "/"), index=False)
-        users_df[self.DWH_TABLES_INFO["dim_users"]].to_csv(
-            os.path.join(transformations_dir, "dim_users.csv").replace("\\", "/"), index=False)
-
-        hotels_df.to_csv(os.path.join(transformations_dir, "dim_hotels.csv").replace("\\", "/"), index=False)
-        meals_df.to_csv(os.path.join(transformations_dir, "dim_meals.csv").replace("\\", "/"), index=False)
-        dates_df.to_csv(os.path.join(transformations_dir, "dim_dates.csv").replace("\\", "/"), index=False)
-        fact_bookings_df.to_csv(os.path.join(transformations_dir, "fact_bookings.csv").replace("\\", "/"), index=False)
+        for table_name in self.DWH_TABLES_INFO.keys():
+            self.storage.write(tables[table_name], self.storage.path(transformations_dir, table_name))
         self.logger.info("All tables data stored properly in trnaform dir")
 
+    def __gather_statistics(self, hotel_bookings_df: pd.DataFrame, fingerprints: np.ndarray,
+                            statistics: BookingsStatistics, missing_agents: list):
+        """
+        Add source bookings to the statistics used by the imputations, setting aside the ones without agent.
+
+        Bookings without agent count for the modal countries once their agent is drawn, from the distribution of
+        every booking, see DataDrivenETL.__count_imputed_agents.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): Source bookings, with at least the 'agent' and 'country' columns.
+        - fingerprints (np.ndarray): uint64 fingerprint of every booking, see RowDeduplicator.fingerprint.
+        - statistics (BookingsStatistics): Statistics updated with the bookings with agent.
+        - missing_agents (list): List the fingerprints and countries of the bookings without agent are appended to.
+        """
+        statistics_df = hotel_bookings_df[['agent', 'country']].copy()
+        statistics_df['country'] = add_categories(statistics_df['country'], 'Unknown').fillna('Unknown')
+        statistics.update(statistics_df)
+        missing = statistics_df['agent'].isna().to_numpy()
+        if missing.any():
+            missing_agents.append((fingerprints[missing], statistics_df['country'].to_numpy(dtype=object)[missing]))
+
+    def __count_imputed_agents(self, statistics: BookingsStatistics, missing_agents: list, seed: int):
+        """
+        Draw the agents of the bookings set aside by DataDrivenETL.__gather_statistics and count their countries.
+
+        Agents are drawn from the fingerprints with the final distribution, the same agents the transform imputes,
+        so the modal countries are the ones of the bookings transformed at once, whatever the chunks.
+
+        Parameters:
+        - statistics (BookingsStatistics): Statistics of every booking with agent.
+        - missing_agents (list): Fingerprints and countries of the bookings without agent.
+        - seed (int): Seed of the imputed agents.
+        """
+        if not missing_agents:
+            return
+        fingerprints, countries = (np.concatenate(arrays) for arrays in zip(*missing_agents))
+        agents = statistics.agent_distribution().sample_by_fingerprint(fingerprints, seed)
+        statistics.update_imputed(pd.DataFrame({'agent': agents, 'country': countries}))
+
+    def __transform_bookings_in_chunks(self, hotel_bookings_path: str, transformations_dir: str, chunk_size: int,
+                                       seed: int = None, partitioned_transform: PartitionedTransform = None,
+                                       aggregates: BookingsAggregates = None):
+        """
+        Transform hotel bookings chunk by chunk, appending the bookings related tables into intermediate files.
+
+        The file is read twice: first to hash every booking and gather the statistics used by the imputations, then
+        to transform the chunks, with the same agent distribution and modal countries as the whole file transformed
+        at once. The fingerprints of every chunk are kept on disk between both passes, so bookings are hashed once.
+        Surrogate keys, created dates and the fingerprints of the bookings already seen are shared between chunks.
+        Fingerprints are spilled to disk past the memory limit of RowDeduplicator, so peak memory depends on the
+        chunk size and the number of dimension rows, not on the file size.
+
+        Parameters:
+        - hotel_bookings_path (str): Path of the extracted hotel bookings file.
+        - transformations_dir (str): Directory path for storing transformations.
+        - chunk_size (int): Number of bookings per chunk.
+        - seed (int): Seed of the imputed agents. Default is None.
+        - partitioned_transform (PartitionedTransform): Process pool transforming ranges of every chunk. Default
+          is None.
+        - aggregates (BookingsAggregates): Summary of the bookings, updated with every chunk. Default is None.
+        """
+        dates_ids = set()
+        bookings_tables = ["dim_hotels", "dim_meals", "dim_dates", "fact_bookings"]
+        with ExitStack() as stack:
+            # Fingerprints of every chunk, and of the bookings already written past RowDeduplicator's memory limit
+            spill_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="dedup_"))
+            statistics = BookingsStatistics()
+            missing_agents = []
+            chunks = self.storage.read_chunks(hotel_bookings_path, chunk_size, dtype=BOOKINGS_SCHEMA)
+            for chunk_number, chunk_df in enumerate(chunks):
+                # Every booking is hashed once, for its imputed agent and its deduplication
+                fingerprints = RowDeduplicator.fingerprint(chunk_df)
+                np.save(os.path.join(spill_dir, self.CHUNK_FINGERPRINTS_FILE.format(chunk_number)), fingerprints)
+                self.__gather_statistics(chunk_df, fingerprints, statistics, missing_agents)
+            self.__count_imputed_agents(statistics, missing_agents, seed)
+            self.logger.info("Bookings statistics gathered for the imputations")
+
+            writers = {table_name: stack.enter_context(
+                self.storage.writer(self.storage.path(transformations_dir, table_name)))
+                for table_name in bookings_tables}
+            bookings_keys = self.__bookings_keys(spill_dir=spill_dir)
+            stack.enter_context(bookings_keys["booking_id"])
+            chunks = self.storage.read_chunks(hotel_bookings_path, chunk_size, dtype=BOOKINGS_SCHEMA)
+            for chunk_number, chunk_df in enumerate(chunks):
+                fingerprints = np.load(os.path.join(spill_dir, self.CHUNK_FINGERPRINTS_FILE.format(chunk_number)))
+                chunk_df = self.__bookings_transformations(hotel_bookings_df=chunk_df, statistics=statistics,
+                                                           seed=seed, partitioned_transform=partitioned_transform,
+                                                           fingerprints=fingerprints)
+                # Duplicates inside the chunk and with the previous chunks are dropped with the fact bookings
+                tables = self.__bookings_tables(chunk_df, bookings_keys, dates_ids, aggregates=aggregates,
+                                                fingerprints=fingerprints)
+                for table_name, table_df in tables.items():
+                    writers[table_name].write(table_df)
+                self.logger.info(f"Bookings chunk {chunk_number} transformed: "
+                                 f"{len(tables['fact_bookings'])} new bookings")
+
+    def __table_columns(self, table_name: str) -> list:
+        """
+        Get the columns of a transformed DWH table.
+
+        Parameters:
+        - table_name (str): Name of the table.
+
+        Returns:
+        - list: Columns of the table.
+        """
+        id_columns = {"dim_companies": ["company_id"], "fact_bookings": ["booking_id"]}
+        return id_columns.get(table_name, []) + self.DWH_TABLES_INFO[table_name]
+
+    def __find_new_bookings(self, hotel_bookings_path: str, chunk_size: int, state: IncrementalState,
+                            offset: int = 0, seed: int = None) -> tuple:
+        """
+        Find the bookings not transformed by previous incremental runs, and add them to the statistics of the state.
+
+        Source bookings are identified by the fingerprint of their raw row, the fingerprints seen are updated in the
+        state. The fingerprints of the new bookings are returned, so they are not hashed again when transformed.
+
+        Parameters:
+        - hotel_bookings_path (str): Path of the extracted hotel bookings file.
+        - chunk_size (int): Number of bookings read at once.
+        - state (IncrementalState): State of the incremental runs, with its bookings state loaded.
+        - offset (int): Byte offset of the rows appended since the previous run, see Storage.read_chunks. Default is
+          0, which reads every row.
+        - seed (int): Seed of the imputed agents, whose countries are counted for the modal countries. Default is
+          None, which only counts the bookings with agent.
+
+        Returns:
+        - tuple: Boolean mask of the new bookings of every chunk read, and the fingerprints of these bookings.
+        """
+        deduplicator = RowDeduplicator(self.logger, seen=state.seen_bookings)
+        new_bookings = []
+        new_fingerprints = []
+        missing_agents = []
+        for chunk_df in self.storage.read_chunks(hotel_bookings_path, chunk_size, dtype=BOOKINGS_SCHEMA,
+                                                 offset=offset):
+            fingerprints = RowDeduplicator.fingerprint(chunk_df)
+            is_new = deduplicator.first_seen(fingerprints, "source_bookings")
+            new_bookings.append(is_new)
+            new_fingerprints.append(fingerprints[is_new])
+            if is_new.any():
+                self.__gather_statistics(chunk_df.take(np.flatnonzero(is_new)), fingerprints[is_new], state.statistics,
+                                         missing_agents)
+        if seed is not None:
+            self.__count_imputed_agents(state.statistics, missing_agents, seed)
+        state.seen_bookings = deduplicator.fingerprints()
+        return new_bookings, new_fingerprints
+
+    def __transform_incremental(self, hotel_bookings_path: str, users_path: str, transformations_dir: str,
+                                state_dir: str, chunk_size: int, seed: int = None,
+                                partitioned_transform: PartitionedTransform = None):
+        """
+        Transform only the bookings not transformed by previous incremental runs, and the users if they changed.
+
+        Every DWH table is saved with its new or changed rows only, to be upserted by load(mode="upsert"), except
+        the summary tables, saved whole from the summary of every booking seen and replaced by the load. Surrogate
+        keys continue the numbering of previous runs and the imputations use the statistics of every booking seen.
+        Bookings are identified by the fingerprint of their source row, so a booking edited in the source is a new
+        booking: it is inserted as a new fact with a new booking_id, and its previous version is kept.
+        The new state is saved as pending and committed by the load once every table is upserted, so the bookings
+        of a run whose load failed are transformed again by the next one.
+
+        New bookings are read twice, chunk by chunk: first to find them and gather their statistics, then to
+        transform them, so memory depends on the chunk size and not on the number of new bookings. When lines were
+        only appended to the bookings file since the previous run, only the appended lines are read.
+
+        Parameters:
+        - hotel_bookings_path (str): Path of the extracted hotel bookings file.
+        - users_path (str): Path of the extracted users file.
+        - transformations_dir (str): Directory path for storing transformations.
+        - state_dir (str): Directory of the incremental state files.
+        - chunk_size (int): Number of bookings read at once.
+        - seed (int): Seed of the imputed agents. Default is None.
+        - partitioned_transform (PartitionedTransform): Process pool transforming ranges of the new bookings.
+          Default is None.
+        """
+        state = IncrementalState(state_dir)
+        key_generators = self.__bookings_keys()
+        key_generators["company_id"] = SurrogateKeyGenerator(self.DWH_TABLES_INFO["dim_companies"])
+        state.load_bookings_state(key_generators)
+        tables = {}
+
+        # Users are always transformed, the summary tables join every user
+        users_fingerprint = IncrementalState.file_fingerprint(users_path)
+        users_df = self.__users_transformations(users_df=self.storage.read(users_path, dtype=USERS_SCHEMA))
+        users_tables = self.__users_tables(users_df, company_keys=state.keys["company_id"])
+        if state.source_changed("transform:users", users_fingerprint):
+            tables.update(users_tables)
+            self.logger.info("Users transformations applied")
+        else:
+            self.logger.info("Users not changed since the last incremental run")
+
+        bookings_fingerprint, offset = state.appended_fingerprint("transform:hotel_bookings", hotel_bookings_path)
+        offset = offset if self.storage.APPENDABLE else 0
+        bookings_tables = ["dim_hotels", "dim_meals", "dim_dates", "fact_bookings"]
+        with ExitStack() as stack:
+            writers = {table_name: stack.enter_context(
+                self.storage.writer(self.storage.path(transformations_dir, table_name)))
+                for table_name in bookings_tables}
+            if state.source_changed("transform:hotel_bookings", bookings_fingerprint):
+                if offset:
+                    self.logger.info(f"Bookings appended since the last incremental run, read from byte {offset}")
+                new_bookings, new_fingerprints = self.__find_new_bookings(hotel_bookings_path, chunk_size, state,
+                                                                          offset=offset, seed=seed)
+                self.logger.info(f"{sum(int(is_new.sum()) for is_new in new_bookings)} new bookings since the last "
+                                 f"incremental run")
+                chunks = self.storage.read_chunks(hotel_bookings_path, chunk_size, dtype=BOOKINGS_SCHEMA,
+                                                  offset=offset)
+                for chunk_df, is_new, fingerprints in zip(chunks, new_bookings, new_fingerprints):
+                    if not is_new.any():
+                        continue
+                    delta_df = self.__bookings_transformations(hotel_bookings_df=chunk_df.take(np.flatnonzero(is_new)),
+                                                               statistics=state.statistics, seed=seed,
+                                                               partitioned_transform=partitioned_transform,
+                                                               fingerprints=fingerprints)
+                    for table_name, table_df in self.__bookings_tables(delta_df, state.keys, state.dates_ids,
+                                                                       aggregates=state.aggregates,
+                                                                       fingerprints=fingerprints).items():
+                        writers[table_name].write(table_df)
+                self.logger.info("Bookings transformations applied")
+            else:
+                self.logger.info("Bookings not changed since the last incremental run")
+            for table_name, writer in writers.items():
+                if not writer.rows:
+                    # Tables without new rows are written with their columns only
+                    writer.write(pd.DataFrame(columns=self.__table_columns(table_name)))
+
+        # Summary tables are rewritten whole, from the summary of every booking seen
+        tables.update(self.__aggregate_tables(state.aggregates, users_tables))
+        for table_name in self.DWH_TABLES_INFO.keys():
+            if table_name not in bookings_tables:
+                table_df = tables.get(table_name, pd.DataFrame(columns=self.__table_columns(table_name)))
+                self.storage.write(table_df, self.storage.path(transformations_dir, table_name))
+
+        state.update_source("transform:users", users_fingerprint)
+        state.update_source("transform:hotel_bookings", bookings_fingerprint,
+                            size=os.path.getsize(hotel_bookings_path))
+        state.save(pending=True)
+
+    @profile_step
     def transform(self, data, extractions_dir: str = ETL.DEFAULT_EXTRACTIONS_DIR,
-                  transformations_dir: str = ETL.DEFAULT_TRANSFORMATIONS_DIR):
+                  transformations_dir: str = ETL.DEFAULT_TRANSFORMATIONS_DIR, chunk_size: int = None,
+                  incremental: bool = False, state_dir: str = ETL.DEFAULT_STATE_DIR, seed: int = None,
+                  processes: int = 1):
         """
-        Transform extracted data and save it into CSV files.
+        Transform extracted data and save it into intermediate files.
 
         Parameters:
         - data (tuple): Tuple containing file names for hotel bookings and users.
         - extractions_dir (str): Directory path for extraction. Default is ETL.DEFAULT_EXTRACTIONS_DIR.
         - transformations_dir (str): Directory path for storing transformations. Default is ETL.DEFAULT_TRANSFORMATIONS_DIR.
+        - chunk_size (int): Number of hotel bookings transformed at once. Default is None, which transforms the whole
+          file in memory. When set, the imputations use the agent statistics of the whole file, but not the agents
+          imputed in it.
+        - incremental (bool): Transform only the changes since the previous incremental run, see
+          DataDrivenETL.__transform_incremental. Incremental transforms depend on their state and are not cached.
+          Default is False.
+        - state_dir (str): Directory of the incremental state files. Default is ETL.DEFAULT_STATE_DIR.
+        - seed (int): Seed of the agents imputation, making the transform reproducible. Default is None, which draws
+          a seed from the global numpy random state.
+        - processes (int): Number of processes transforming ranges of the bookings, see PartitionedTransform. The
+          output is the same as with a single process. Default is 1, which transforms them in the current process.
+          None uses every CPU.
         """
         hotel_bookings_file_name = data[0]
         users_file_name = data[1]
-
-        hotel_bookings_df = pd.read_csv(os.path.join(extractions_dir, hotel_bookings_file_name).replace("\\", "/"))
-        users_df = pd.read_csv(os.path.join(extractions_dir, users_file_name).replace("\\", "/"))
-
-        hotel_bookings_df = self.__bookings_transformations(hotel_bookings_df=hotel_bookings_df)
-        hotel_bookings_df.drop_duplicates(inplace=True)
-        self.logger.info("Bookings transformations applied")
-
+        hotel_bookings_path = self.storage.path(extractions_dir, hotel_bookings_file_name)
+        users_path = self.storage.path(extractions_dir, users_file_name)
+
+        # Imputed agents only depend on the seed and the bookings, whatever the chunks and processes
+        imputation_seed = seed if seed is not None else int(np.random.randint(0, 2 ** 63 - 1, dtype='int64'))
+        pool = PartitionedTransform(self.logger, processes=processes) if processes != 1 else nullcontext()
+
+        if incremental:
+            with pool as partitioned_transform:
+                self.__transform_incremental(hotel_bookings_path, users_path, transformations_dir, state_dir,
+                                             chunk_size or self.DEFAULT_INCREMENTAL_CHUNK_SIZE,
+                                             seed=imputation_seed, partitioned_transform=partitioned_transform)
+            self.logger.info("Tranform step finished properly")
+            return
+
+        cache_key = None
+        tables_paths = {table_name: self.storage.path(transformations_dir, table_name)
+                        for table_name in self.DWH_TABLES_INFO.keys()}
+        if self.cache is not None:
+            cache_key = self.__cache_key("transform", chunk_size=chunk_size, seed=seed, inputs={
+                hotel_bookings_file_name: self.cache.fingerprint(hotel_bookings_path),
+                users_file_name: self.cache.fingerprint(users_path)
+            })
+            if self.cache.restore(cache_key, tables_paths):
+                self.logger.info(f"Inputs not changed, tables restored from the cache into {transformations_dir}")
+                return
+
+        users_df = self.storage.read(users_path, dtype=USERS_SCHEMA)
         users_df = self.__users_transformations(users_df=users_df)
         self.logger.info("Users transformations applied")
 
-        self.__save_transformations_data(hotel_bookings_df, users_df, transformations_dir)
+        with pool as partitioned_transform:
+            if chunk_size:
+                users_tables = self.__users_tables(users_df)
+                for table_name, table_df in users_tables.items():
+                    self.storage.write(table_df, self.storage.path(transformations_dir, table_name))
+                aggregates = BookingsAggregates()
+                self.__transform_bookings_in_chunks(hotel_bookings_path, transformations_dir, chunk_size,
+                                                    seed=imputation_seed,
+                                                    partitioned_transform=partitioned_transform,
+                                                    aggregates=aggregates)
+                for table_name, table_df in self.__aggregate_tables(aggregates, users_tables).items():
+                    self.storage.write(table_df, self.storage.path(transformations_dir, table_name))
+            else:
+                hotel_bookings_df = self.storage.read(hotel_bookings_path, dtype=BOOKINGS_SCHEMA)
+                self.logger.info(f"Bookings read: {memory_usage(hotel_bookings_df)}")
+                # Every booking is hashed once, for its imputed agent and its deduplication
+                fingerprints = RowDeduplicator.fingerprint(hotel_bookings_df)
+                hotel_bookings_df = self.__bookings_transformations(hotel_bookings_df=hotel_bookings_df,
+                                                                    seed=imputation_seed,
+                                                                    partitioned_transform=partitioned_transform,
+                                                                    fingerprints=fingerprints)
+                self.logger.info(f"Bookings transformations applied: {memory_usage(hotel_bookings_df)}")
+                self.__save_transformations_data(hotel_bookings_df, users_df, transformations_dir,
+                                                 fingerprints=fingerprints)
+
+        if cache_key is not None:
+            self.cache.store(cache_key, tables_paths)
         self.logger.info("Tranform step finished properly")
 
+    def __load_table(self, table_name: str, transformations_dir: str, storage: Storage, engine,
+                     bulk_loader: BulkLoader, mode: str) -> bool:
+        """
+        Load a transformed table into the data-driven storage.
+
+        Parameters:
+        - table_name (str): Name of the table.
+        - transformations_dir (str): Directory path for storing transformations.
+        - storage (Storage): Storage format of the transformed data files.
+        - engine (sqlalchemy.engine.Engine): Engine of the DWH database.
+        - bulk_loader (BulkLoader): Loader used in "bulk" mode.
+        - mode (str): Load mode, see DataDrivenETL.LOAD_MODES.
+
+        Returns:
+        - bool: True if the table was loaded, False otherwise.
+        """
+        df = storage.read(storage.path(transformations_dir, table_name), dtype=get_schema(table_name))
+        self.logger.info(f"Data read properly in load function for: {table_name} ({memory_usage(df)})")
+        try:
+            if mode in ("bulk", "upsert"):
+                df = df.rename(columns=self.DWH_COLUMNS_RENAME.get(table_name, {}))
+                for column, (parent_table_name, parent_column) in self.NULLABLE_FOREIGN_KEYS.get(table_name,
+                                                                                                  {}).items():
+                    df = bulk_loader.null_missing_references(df, column, parent_table_name, parent_column)
+            if mode == "bulk":
+                bulk_loader.load(df, table_name, primary_key=self.DWH_PRIMARY_KEYS[table_name])
+            elif mode == "upsert" and table_name in BookingsAggregates.PRIMARY_KEYS:
+                # Summary tables are transformed whole, so the groups left without bookings are deleted
+                bulk_loader.replace(df, table_name, primary_key=self.DWH_PRIMARY_KEYS[table_name])
+            elif mode == "upsert":
+                bulk_loader.upsert(df, table_name, primary_key=self.DWH_PRIMARY_KEYS[table_name])
+            else:
+                df.to_sql(name=table_name, con=engine, if_exists='replace', index=False,
+                          schema=bulk_loader.schema_name)
+            record_io(rows_written=len(df))
+            self.logger.info(f"Data loaded sucesfully into: {table_name}.")
+            return True
+        except Exception as e:
+            self.logger.error(f"Load data into table: {table_name} produced error: {e}.")
+            return False
+
+    def __commit_state(self, state_dir: str):
+        """
+        Commit the state saved as pending by the incremental transform whose tables were upserted.
+
+        Parameters:
+        - state_dir (str): Directory of the incremental state files.
+        """
+        if os.path.isdir(state_dir) and IncrementalState(state_dir).commit():
+            self.logger.info(f"Incremental state committed into {state_dir}")
+
+    @profile_step
     def load(self, transformations_dir: str = ETL.DEFAULT_TRANSFORMATIONS_DIR,
-             file_extension: str = ".csv", schema_name: str = "dbo"):
+             file_extension: str = None, schema_name: str = "dbo", mode: str = "replace",
+             batch_size: int = BulkLoader.DEFAULT_BATCH_SIZE, max_workers: int = 1,
+             state_dir: str = ETL.DEFAULT_STATE_DIR, skip_unchanged: bool = False) -> dict:
         """
         Load transformed data into a data-driven storage.
 
+        Tables are loaded once all the tables they reference through foreign keys in sql/create/create_dwh.sql
+        are loaded, so independent dimensions can be loaded concurrently.
+
         Parameters:
         - transformations_dir (str): Directory path for storing transformations. Default is ETL.DEFAULT_TRANSFORMATIONS_DIR.
-        - file_extension (str): File extension for the transformed data files. Default is ".csv".
+        - file_extension (str): File extension for the transformed data files, e.g. ".csv" or ".parquet". Default is
+          None, which uses the storage format of the instance.
         - schema_name (str): Schema name for the database. Default is "dbo".
+        - mode (str): "replace" drops and recreates every table with pandas, "bulk" empties the tables created by
+          sql/create/create_dwh.sql and inserts the rows in batches, "upsert" merges the rows into those tables by
+          primary key, replaces the summary tables and deletes the companies left without users, to load the output
+          of incremental transforms, whose pending state is committed once every table is loaded. Both keep the foreign keys of the tables, so booking agents without user are loaded as
+          NULL (see DataDrivenETL.NULLABLE_FOREIGN_KEYS). Default is "replace".
+        - batch_size (int): Number of rows per batch in "bulk" and "upsert" modes. Default is BulkLoader.DEFAULT_BATCH_SIZE.
+        - max_workers (int): Number of tables loaded concurrently, each one with its own pooled connection.
+          Default is 1.
+        - state_dir (str): Directory of the incremental state files, see transform(incremental=True). Default is
+          ETL.DEFAULT_STATE_DIR.
+        - skip_unchanged (bool): Skip the load if the cache of the instance recorded a load of the same tables into
+          the same database. The database itself is not checked, so tables changed or emptied since that load are
+          not loaded again. Default is False, which always loads.
+
+        Returns:
+        - dict: Dictionary mapping loaded table names to their load time in seconds. Empty if the load was skipped.
         """
+        if mode not in self.LOAD_MODES:
+            raise ValueError(f"Unknown load mode: {mode}. Available modes: {self.LOAD_MODES}")
         self.logger.info("Loading data into a data-driven storage...")
-        engine = create_connection()
-        for table_name in self.DWH_TABLES_INFO.keys():
-            df = pd.read_csv(os.path.join(transformations_dir, table_name+file_extension).replace("\\", "/"))
-            self.logger.info(f"Data read properly in load function for: {table_name}")
-            try:
-                df.to_sql(name=table_name, con=engine, if_exists='replace', index=False, schema=schema_name)
-                self.logger.info(f"Data loaded sucesfully into: {table_name}.")
-            except Exception as e:
-                self.logger.error(f"Load data into table: {table_name} produced error: {e}.")
+        storage = get_storage(file_extension) if file_extension else self.storage
+        table_names = list(self.DWH_TABLES_INFO.keys())
+        cache_key = None
+        if self.cache is not None:
+            # Credentials are only part of the hashed key
+            database = self.connection_url or self.cache.fingerprint(CONFIG_FILE)
+            cache_key = self.__cache_key("load", database=database, schema_name=schema_name, mode=mode, tables={
+                table_name: self.cache.fingerprint(storage.path(transformations_dir, table_name))
+                for table_name in table_names
+            })
+            if skip_unchanged and self.cache.restore(cache_key, {}):
+                self.logger.info("Tables not changed since they were loaded, load skipped")
+                if mode == "upsert":
+                    self.__commit_state(state_dir)
+                return {}
+
+        engine = create_connection(self.connection_url, pool_size=max(max_workers, 1))
+        bulk_loader = BulkLoader(engine, self.logger, schema_name=schema_name, batch_size=batch_size)
+        if mode == "bulk":
+            bulk_loader.truncate(table_names)
+
+        parent_stage = current_stage()
+
+        def load_table(table_name: str) -> bool:
+            with stage(table_name, parent=parent_stage):
+                return self.__load_table(table_name, transformations_dir, storage, engine, bulk_loader, mode)
+
+        scheduler = LoadScheduler(tables_dependencies(table_names), self.logger, max_workers=max_workers)
+        timings = scheduler.run(load_table)
+        if len(timings) == len(table_names):
+            if mode == "upsert":
+                for table_name, (column, child_table_name, child_column) in self.REFERENCED_KEYS.items():
+                    bulk_loader.delete_unreferenced(table_name, column, child_table_name, child_column)
+            if cache_key is not None:
+                self.cache.store(cache_key, {})
+            if mode == "upsert":
+                self.__commit_state(state_dir)
+        elif mode == "upsert":
+            self.logger.warning("Incremental state not committed, the next incremental transform transforms the same "
+                                "bookings again")
+        return timings
@@ -2,6 +2,10 @@ class ETL:
     DEFAULT_SEPARATOR = ";"
     DEFAULT_EXTRACTIONS_DIR = "data/extract"
     DEFAULT_TRANSFORMATIONS_DIR = "data/transform"
+    DEFAULT_STORAGE_FORMAT = "csv"
+    DEFAULT_STATE_DIR = "data/state"
+    DEFAULT_METRICS_DIR = "data/metrics"
+    DEFAULT_CACHE_DIR = "data/cache"
 
     def __init__(self):
         self.data = None
@@ -1,10 +1,11 @@
 import json
 import logging
 from logging import FileHandler
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 
 LOGS_DIR = "logs/"
 DEFAULT_LOG_FILE = 'logfile.log'
+CONFIG_FILE = 'utils/config.json'
 
 
 def get_logger(log_file: str = DEFAULT_LOG_FILE) -> logging.Logger:
@@ -38,17 +39,30 @@ def get_logger(log_file: str = DEFAULT_LOG_FILE) -> logging.Logger:
     return logger
 
 
-def create_connection():
+def create_connection(connection_url: str = None, **engine_kwargs):
     """
     Create a SQLAlchemy engine for a database connection.
 
-    Reads database configuration from 'utils/config.json'.
+    Reads database configuration from 'utils/config.json' unless a connection URL is given.
+
+    Parameters:
+    - connection_url (str): SQLAlchemy URL of the database, e.g. "sqlite:///data/dwh.db" for a local stand-in of
+      the SQL Server DWH. Default is None.
+    - engine_kwargs: Extra arguments for sqlalchemy.create_engine, e.g. pool_size.
 
     Returns:
     - engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance.
     """
+    if connection_url is not None:
+        engine = create_engine(connection_url, **engine_kwargs)
+        if engine.dialect.name == "sqlite":
+            # SQLite only enforces foreign keys when asked to, on every connection
+            event.listen(engine, "connect", lambda dbapi_connection, _: dbapi_connection.execute(
+                "PRAGMA foreign_keys = ON"))
+        return engine
+
     # Read configuration from JSON file
-    with open('utils/config.json') as f:
+    with open(CONFIG_FILE) as f:
         config = json.load(f)
 
     # Extract database connection details
@@ -61,8 +75,8 @@ def create_connection():
     if not db_config['trusted_connection']:
         conn_str += f"&Trusted_Connection=No"
 
-    # Construct the SQLAlchemy engine
-    engine = create_engine(conn_str)
+    # Construct the SQLAlchemy engine, sending executemany batches in a single round trip
+    engine = create_engine(conn_str, fast_executemany=True, **engine_kwargs)
 
     # Create a connection
     # conn = engine.connect()
@@ -0,0 +1,210 @@
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+from utils.bookings_aggregates import BookingsAggregates
+from utils.bookings_statistics import BookingsStatistics
+from utils.sequential_keys import SequentialKeyGenerator
+from utils.surrogate_keys import SurrogateKeyGenerator
+
+
+class IncrementalState:
+    """
+    State kept between incremental pipeline runs.
+
+    It stores a content fingerprint of every source, the fingerprints of the source bookings already transformed,
+    the imputation statistics, the created dates, the surrogate key generators and the summary of the bookings, so a
+    run only transforms the new bookings and allocates new keys without renumbering the existing ones.
+
+    The state of a transform is saved as pending and committed once its outputs are loaded, so the bookings of a
+    transform whose load failed are transformed again by the next run instead of being taken as loaded.
+    """
+    PENDING_DIR = "pending"
+    MANIFEST_FILE = "manifest.json"
+    STATISTICS_FILE = "bookings_statistics.json"
+    SEEN_BOOKINGS_FILE = "seen_bookings.npy"
+    DATES_IDS_FILE = "dates_ids.npy"
+    KEYS_FILE = "keys_{}"
+    AGGREGATES_FILE = "bookings_aggregates.csv"
+
+    def __init__(self, state_dir: str):
+        """
+        Constructor for IncrementalState.
+
+        Parameters:
+        - state_dir (str): Directory of the state files, created if it does not exist.
+        """
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        manifest_path = self.__path(self.MANIFEST_FILE)
+        self.manifest = {"sources": {}, "sizes": {}}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest.update(json.load(f))
+        self.updated_sources = {"sources": {}, "sizes": {}}
+        self.statistics = None
+        self.seen_bookings = None
+        self.dates_ids = None
+        self.keys = None
+        self.aggregates = None
+
+    def __path(self, file_name: str, pending: bool = False) -> str:
+        directory = os.path.join(self.state_dir, self.PENDING_DIR) if pending else self.state_dir
+        return os.path.join(directory, file_name).replace("\\", "/")
+
+    @staticmethod
+    def file_fingerprint(path: str, block_size: int = 1 << 20) -> str:
+        """
+        Get the SHA-256 of a file content.
+
+        Parameters:
+        - path (str): Path of the file.
+        - block_size (int): Bytes read at once. Default is 1 MiB.
+
+        Returns:
+        - str: Hexadecimal digest.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def appended_fingerprint(self, source_name: str, path: str, block_size: int = 1 << 20) -> tuple:
+        """
+        Get the SHA-256 of a source file, and where the lines appended since its recorded fingerprint start.
+
+        The file is read once: the bytes of the size recorded with the fingerprint are hashed first, and the file only
+        had lines appended if their digest is the recorded fingerprint and they end with a line break.
+
+        Parameters:
+        - source_name (str): Name of the source.
+        - path (str): Path of the file.
+        - block_size (int): Bytes read at once. Default is 1 MiB.
+
+        Returns:
+        - tuple: Hexadecimal digest of the file, and the byte offset of the lines appended to the recorded version,
+          0 if the file changed otherwise or no size was recorded.
+        """
+        recorded_size = self.manifest["sizes"].get(source_name) or 0
+        digest = hashlib.sha256()
+        offset = 0
+        with open(path, "rb") as f:
+            if 0 < recorded_size <= os.path.getsize(path):
+                remaining, block = recorded_size, b""
+                while remaining:
+                    block = f.read(min(block_size, remaining))
+                    digest.update(block)
+                    remaining -= len(block)
+                if digest.hexdigest() == self.manifest["sources"].get(source_name) and block.endswith(b"\n"):
+                    offset = recorded_size
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest(), offset
+
+    def source_changed(self, source_name: str, fingerprint: str) -> bool:
+        """
+        Check if a source changed since its last recorded fingerprint.
+
+        Parameters:
+        - source_name (str): Name of the source.
+        - fingerprint (str): Current fingerprint of the source.
+
+        Returns:
+        - bool: True if the source is new or its fingerprint changed.
+        """
+        return self.manifest["sources"].get(source_name) != fingerprint
+
+    def update_source(self, source_name: str, fingerprint: str, size: int = None):
+        """
+        Record the fingerprint of a source. It is persisted by IncrementalState.save.
+
+        Parameters:
+        - source_name (str): Name of the source.
+        - fingerprint (str): Current fingerprint of the source.
+        - size (int): Size of the source file, to find the lines appended to it later (see
+          IncrementalState.appended_fingerprint). Default is None.
+        """
+        self.manifest["sources"][source_name] = fingerprint
+        self.updated_sources["sources"][source_name] = fingerprint
+        if size is not None:
+            self.manifest["sizes"][source_name] = size
+            self.updated_sources["sizes"][source_name] = size
+
+    def load_bookings_state(self, key_generators: dict):
+        """
+        Load the bookings state: statistics, seen bookings, created dates, surrogate keys and summary.
+
+        Parameters:
+        - key_generators (dict): Dictionary mapping key names to a new SurrogateKeyGenerator or
+          SequentialKeyGenerator, replaced by the saved generator when there is one.
+        """
+        statistics_path = self.__path(self.STATISTICS_FILE)
+        seen_bookings_path = self.__path(self.SEEN_BOOKINGS_FILE)
+        dates_ids_path = self.__path(self.DATES_IDS_FILE)
+        aggregates_path = self.__path(self.AGGREGATES_FILE)
+        self.statistics = BookingsStatistics.load(statistics_path) if os.path.exists(statistics_path) \
+            else BookingsStatistics()
+        self.seen_bookings = np.load(seen_bookings_path) if os.path.exists(seen_bookings_path) \
+            else np.empty(0, dtype='uint64')
+        self.dates_ids = set(np.load(dates_ids_path).tolist()) if os.path.exists(dates_ids_path) else set()
+        self.aggregates = BookingsAggregates.load(aggregates_path) if os.path.exists(aggregates_path) \
+            else BookingsAggregates()
+
+        self.keys = {}
+        for key_name, generator in key_generators.items():
+            keys_path = self.__path(self.KEYS_FILE.format(key_name) + generator.EXTENSION)
+            if not os.path.exists(keys_path):
+                self.keys[key_name] = generator
+            elif isinstance(generator, SequentialKeyGenerator):
+                self.keys[key_name] = SequentialKeyGenerator.load(keys_path, generator.columns, generator.logger)
+            else:
+                self.keys[key_name] = SurrogateKeyGenerator.load(keys_path, generator.columns)
+
+    def save(self, pending: bool = False):
+        """
+        Persist the manifest and, if it was loaded, the bookings state.
+
+        Parameters:
+        - pending (bool): Save them into the pending directory instead, replacing a previous pending state, to be
+          committed by IncrementalState.commit once the outputs of the run are loaded. Only the sources updated since
+          the state was created are recorded. Default is False.
+        """
+        if pending:
+            shutil.rmtree(self.__path("", pending=True), ignore_errors=True)
+            os.makedirs(self.__path("", pending=True))
+        if self.keys is not None:
+            self.statistics.save(self.__path(self.STATISTICS_FILE, pending))
+            np.save(self.__path(self.SEEN_BOOKINGS_FILE, pending), self.seen_bookings)
+            np.save(self.__path(self.DATES_IDS_FILE, pending), np.array(sorted(self.dates_ids), dtype='int64'))
+            self.aggregates.save(self.__path(self.AGGREGATES_FILE, pending))
+            for key_name, generator in self.keys.items():
+                generator.save(self.__path(self.KEYS_FILE.format(key_name) + generator.EXTENSION, pending))
+        with open(self.__path(self.MANIFEST_FILE, pending), "w") as f:
+            json.dump(self.updated_sources if pending else self.manifest, f, indent=2)
+
+    def commit(self) -> bool:
+        """
+        Make the pending state the state of the next runs, once the outputs of its run are loaded.
+
+        Returns:
+        - bool: True if there was a pending state, False otherwise.
+        """
+        pending_dir = self.__path("", pending=True)
+        if not os.path.isdir(pending_dir):
+            return False
+        with open(self.__path(self.MANIFEST_FILE, pending=True)) as f:
+            pending_manifest = json.load(f)
+        for file_name in os.listdir(pending_dir):
+            if file_name != self.MANIFEST_FILE:
+                os.replace(self.__path(file_name, pending=True), self.__path(file_name))
+        # Sources updated by other steps since the pending state was saved are kept
+        self.manifest["sources"].update(pending_manifest["sources"])
+        self.manifest["sizes"].update(pending_manifest["sizes"])
+        with open(self.__path(self.MANIFEST_FILE), "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        shutil.rmtree(pending_dir)
+        return True
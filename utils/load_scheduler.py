@@ -0,0 +1,108 @@
+import os
+import re
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DWH_DDL_FILE = "sql/create/create_dwh.sql"
+FOREIGN_KEY_PATTERN = re.compile(
+    r"ALTER\s+TABLE\s+(?:\[\w+\]\.)?\[(\w+)\]\s+WITH\s+CHECK\s+ADD\s+(?:CONSTRAINT\s+\[\w+\]\s+)?"
+    r"FOREIGN\s+KEY\s*\(\[\w+\]\)\s*REFERENCES\s+(?:\[\w+\]\.)?\[(\w+)\]", re.IGNORECASE)
+
+
+def tables_dependencies(table_names: list, ddl_file: str = DWH_DDL_FILE) -> dict:
+    """
+    Get the parent tables of every table from the foreign keys declared in the DWH DDL.
+
+    If the DDL file does not exist, every table depends on the previous one, so they are loaded in order.
+
+    Parameters:
+    - table_names (list): Names of the tables, parents first.
+    - ddl_file (str): Path of the DDL file. Default is DWH_DDL_FILE.
+
+    Returns:
+    - dict: Dictionary mapping table names to the set of tables they reference.
+    """
+    if not os.path.exists(ddl_file):
+        return {table_name: set(table_names[:position]) for position, table_name in enumerate(table_names)}
+
+    with open(ddl_file) as f:
+        ddl = f.read()
+    dependencies = {table_name: set() for table_name in table_names}
+    for child_table, parent_table in FOREIGN_KEY_PATTERN.findall(ddl):
+        if child_table in dependencies and parent_table in dependencies and child_table != parent_table:
+            dependencies[child_table].add(parent_table)
+    return dependencies
+
+
+class LoadScheduler:
+    """
+    Run table loads in a thread pool, starting every table as soon as all the tables it references are loaded.
+    """
+
+    def __init__(self, dependencies: dict, logger: logging.Logger, max_workers: int = 1):
+        """
+        Constructor for LoadScheduler.
+
+        Parameters:
+        - dependencies (dict): Dictionary mapping table names to the set of tables they reference. Tables are
+          started in the order of its keys when several are ready.
+        - logger (logging.Logger): Logger instance for logging messages.
+        - max_workers (int): Number of tables loaded concurrently. Default is 1.
+        """
+        self.dependencies = dependencies
+        self.logger = logger
+        self.max_workers = max_workers
+
+    def run(self, load_table) -> dict:
+        """
+        Load every table.
+
+        Parameters:
+        - load_table (callable): Function receiving a table name that loads it and returns True on success.
+          Tables referencing a table whose load failed are skipped.
+
+        Returns:
+        - dict: Dictionary mapping loaded table names to their load time in seconds.
+        """
+        pending = list(self.dependencies.keys())
+        loaded, failed = set(), set()
+        timings = {}
+        start = time.perf_counter()
+
+        def timed_load(table_name: str):
+            table_start = time.perf_counter()
+            success = load_table(table_name)
+            return success, time.perf_counter() - table_start
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while pending or running:
+                for table_name in list(pending):
+                    parents = self.dependencies[table_name]
+                    if parents & failed:
+                        pending.remove(table_name)
+                        failed.add(table_name)
+                        self.logger.error(f"Load of table {table_name} skipped, parent tables failed: "
+                                          f"{sorted(parents & failed)}")
+                    elif parents <= loaded:
+                        pending.remove(table_name)
+                        running[executor.submit(timed_load, table_name)] = table_name
+                if not running:
+                    self.logger.error(f"Tables with circular dependencies not loaded: {pending}")
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    table_name = running.pop(future)
+                    success, elapsed = future.result()
+                    if success:
+                        loaded.add(table_name)
+                        timings[table_name] = elapsed
+                        self.logger.info(f"Table {table_name} loaded in {elapsed:.2f}s")
+                    else:
+                        failed.add(table_name)
+
+        self.logger.info(f"{len(loaded)} tables loaded in {time.perf_counter() - start:.2f}s "
+                         f"with {self.max_workers} workers")
+        return timings
@@ -0,0 +1,124 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.agent_distribution import AgentDistribution
+from utils.pipeline_transformations import PipelineTransformations
+from utils.row_deduplicator import RowDeduplicator
+from utils.schemas import add_categories
+
+
+def _transform_partition(partition_df: pd.DataFrame, fingerprints: np.ndarray, agent_distribution: AgentDistribution,
+                         modal_countries: pd.Series, seed: int) -> tuple:
+    """
+    Standardize dates, cleanse and impute a partition of hotel bookings, in a worker process.
+
+    Parameters:
+    - partition_df (pd.DataFrame): Partition of the hotel bookings.
+    - fingerprints (np.ndarray): uint64 fingerprint of every booking of the partition.
+    - agent_distribution (AgentDistribution): Distribution of the agents of the whole bookings.
+    - modal_countries (pd.Series): Most common 'country' of every agent of the whole bookings, or None if it depends
+      on the agents imputed in every partition. The countries are then imputed by the main process.
+    - seed (int): Seed of the agents imputed, drawn from the fingerprint of every booking.
+
+    Returns:
+    - tuple: Transformed partition, and its bookings counted by ('agent', 'country') if modal_countries is None.
+    """
+    partition_df = PipelineTransformations.bookings_cleansing(hotel_bookings_df=partition_df)
+    partition_df = PipelineTransformations.agents_imputation(hotel_bookings_df=partition_df,
+                                                             agent_distribution=agent_distribution, seed=seed,
+                                                             fingerprints=fingerprints)
+    if modal_countries is None:
+        return partition_df, PipelineTransformations.agent_country_counts(partition_df)
+    partition_df = PipelineTransformations.countries_imputation(hotel_bookings_df=partition_df,
+                                                                modal_countries=modal_countries)
+    return partition_df, None
+
+
+class PartitionedTransform:
+    """
+    Transform hotel bookings partition by partition in a pool of processes.
+
+    Bookings are split into ranges of rows, several per process so the slower ranges do not leave processes idle,
+    and every range is cleansed and imputed by a worker process. Agents are drawn from the fingerprint of every
+    booking with a seed, so they do not depend on the range a booking falls in. Only the state shared by the ranges is
+    handled by the main process: the distribution of the agents and, when they depend on the imputed agents, the
+    modal countries, summed from the counts of every range. The ranges are concatenated in their order, so the output
+    and the surrogate keys assigned afterwards are the ones of the serial transform.
+
+    Steps run in the worker processes are not measured by the profiler of the main process.
+    """
+    PARTITIONS_PER_PROCESS = 4
+
+    def __init__(self, logger: logging.Logger, processes: int = None,
+                 partitions_per_process: int = PARTITIONS_PER_PROCESS):
+        """
+        Constructor for PartitionedTransform.
+
+        Parameters:
+        - logger (logging.Logger): Logger instance for logging messages.
+        - processes (int): Number of worker processes. Default is None, which uses the number of CPUs.
+        - partitions_per_process (int): Ranges of rows per process. Default is
+          PartitionedTransform.PARTITIONS_PER_PROCESS.
+        """
+        self.logger = logger
+        self.processes = processes or os.cpu_count()
+        self.partitions_per_process = partitions_per_process
+        self.executor = None
+
+    def __enter__(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.processes)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.executor.shutdown()
+        self.executor = None
+
+    def run(self, hotel_bookings_df: pd.DataFrame, agent_distribution: AgentDistribution = None,
+            modal_countries: pd.Series = None, seed: int = None, fingerprints: np.ndarray = None) -> pd.DataFrame:
+        """
+        Apply the bookings cleansing and imputations of PipelineTransformations.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+        - agent_distribution (AgentDistribution): Distribution of the agents. Default is None, which computes it
+          from hotel_bookings_df.
+        - modal_countries (pd.Series): Most common 'country' indexed by 'agent'. Default is None, which computes it
+          from hotel_bookings_df once its agents are imputed.
+        - seed (int): Seed of the agents imputed, see PipelineTransformations.agents_imputation. Default is None,
+          which draws one from the global numpy random state.
+        - fingerprints (np.ndarray): uint64 fingerprint of every booking, in the order of hotel_bookings_df. Default
+          is None, which hashes the bookings (see RowDeduplicator.fingerprint).
+
+        Returns:
+        - pd.DataFrame: Transformed DataFrame, in the row order of hotel_bookings_df.
+        """
+        if seed is None:
+            seed = int(np.random.randint(0, 2 ** 63 - 1, dtype='int64'))
+        if agent_distribution is None:
+            agent_distribution = AgentDistribution.from_agents(hotel_bookings_df['agent'])
+        if fingerprints is None:
+            fingerprints = RowDeduplicator.fingerprint(hotel_bookings_df)
+        # Ranges share the categories of the cleansed and imputed countries, so they are concatenated as categoricals
+        new_countries = ['Unknown'] + (list(modal_countries.unique()) if modal_countries is not None else [])
+        hotel_bookings_df['country'] = add_categories(hotel_bookings_df['country'], new_countries)
+
+        num_partitions = max(min(len(hotel_bookings_df), self.processes * self.partitions_per_process), 1)
+        bounds = np.linspace(0, len(hotel_bookings_df), num_partitions + 1).astype(int)
+        futures = [self.executor.submit(_transform_partition, hotel_bookings_df.iloc[start:end],
+                                        fingerprints[start:end], agent_distribution, modal_countries, seed)
+                   for start, end in zip(bounds[:-1], bounds[1:])]
+        results = [future.result() for future in futures]
+        transformed_df = pd.concat([partition_df for partition_df, _ in results])
+        self.logger.info(f"{num_partitions} ranges of bookings transformed in {self.processes} processes")
+
+        if modal_countries is None:
+            agent_country_counts = pd.concat([counts for _, counts in results])
+            agent_country_counts = agent_country_counts.groupby(level=['agent', 'country'], sort=False).sum()
+            transformed_df = PipelineTransformations.countries_imputation(
+                hotel_bookings_df=transformed_df,
+                modal_countries=PipelineTransformations.modal_countries(agent_country_counts))
+        return transformed_df
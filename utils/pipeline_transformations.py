@@ -4,10 +4,22 @@ import ast
 import pandas as pd
 import numpy as np
 
+from utils.agent_distribution import AgentDistribution
+from utils.profiling import profile_step
+from utils.row_deduplicator import RowDeduplicator
+from utils.schemas import add_categories
+
 
 class PipelineTransformations:
+    # Patterns of the string cleansing, compiled once and shared by the scalar functions and the column kernels. The
+    # kernels replace with the pattern's source: pandas replaces a compiled pattern with a Python call per element
+    NON_DIGIT_PATTERN = re.compile(r'\D')
+    EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+    SPECIAL_CHARACTERS_PATTERN = re.compile(r'[^a-zA-Z0-9\s]')
+    WEBSITE_SCHEMES = ('http://', 'https://')
 
     @staticmethod
+    @profile_step
     def dates_standardize(hotel_bookings_df) -> pd.DataFrame:
         """
         Standardize date columns and drop redundant columns.
@@ -19,7 +31,7 @@ class PipelineTransformations:
         - pd.DataFrame: Transformed DataFrame.
         """
         hotel_bookings_df['arrival_date'] = pd.to_datetime(hotel_bookings_df['arrival_date_year'].astype(str) + '-' +
-                                                           hotel_bookings_df['arrival_date_month'] + '-' +
+                                                           hotel_bookings_df['arrival_date_month'].astype(str) + '-' +
                                                            hotel_bookings_df['arrival_date_day_of_month'].astype(str),
                                                            errors='coerce')
         columns_to_drop = ['arrival_date_year', 'arrival_date_month', 'arrival_date_day_of_month']
@@ -30,52 +42,184 @@ class PipelineTransformations:
         return hotel_bookings_df
 
     @staticmethod
-    def agents_imputation(hotel_bookings_df) -> pd.DataFrame:
+    def bookings_cleansing(hotel_bookings_df) -> pd.DataFrame:
+        """
+        Standardize dates and cleanse the meal and country values of hotel bookings data.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+
+        Returns:
+        - pd.DataFrame: Transformed DataFrame.
+        """
+        # Dates standarize
+        hotel_bookings_df = PipelineTransformations.dates_standardize(hotel_bookings_df=hotel_bookings_df)
+        # Data Cleansing
+        hotel_bookings_df['meal'] = add_categories(hotel_bookings_df['meal'], 'SC').replace({'Undefined': 'SC'})
+        hotel_bookings_df['country'] = add_categories(hotel_bookings_df['country'], 'Unknown').fillna('Unknown')
+        return hotel_bookings_df
+
+    @staticmethod
+    @profile_step
+    def agents_imputation(hotel_bookings_df, agent_distribution: AgentDistribution = None,
+                          random_state: np.random.Generator = None, seed: int = None,
+                          fingerprints: np.ndarray = None) -> pd.DataFrame:
         """
         Impute missing 'agent' values with random samples based on the distribution.
 
         Parameters:
         - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+        - agent_distribution (AgentDistribution): Distribution of the agents, e.g. the one of the whole file or of
+          previous runs. Default is None, which computes it from hotel_bookings_df.
+        - random_state (np.random.Generator): Generator of the samples. Default is None, which uses the global numpy
+          random state.
+        - seed (int): Seed of samples drawn from the fingerprint of every booking instead of random_state, so a
+          booking is imputed the same agent whatever the chunk or partition it is transformed in (see
+          AgentDistribution.sample_by_fingerprint). Default is None.
+        - fingerprints (np.ndarray): uint64 fingerprint of every booking, in the order of hotel_bookings_df, used with
+          seed. Default is None, which hashes the bookings (see RowDeduplicator.fingerprint).
 
         Returns:
         - pd.DataFrame: Transformed DataFrame.
         """
         # Calculate the distribution of the 'agent' values (excluding NaN)
-        agent_distribution = hotel_bookings_df['agent'].value_counts(normalize=True)
+        if agent_distribution is None:
+            agent_distribution = AgentDistribution.from_agents(hotel_bookings_df['agent'])
 
         # Generate random samples based on the distribution
         missing_indices = hotel_bookings_df['agent'].isnull()
         num_missing = missing_indices.sum()
 
-        random_agents = np.random.choice(agent_distribution.index, size=num_missing, p=agent_distribution.values)
+        if seed is not None:
+            if fingerprints is None:
+                fingerprints = RowDeduplicator.fingerprint(hotel_bookings_df)
+            missing_fingerprints = np.asarray(fingerprints)[missing_indices.to_numpy()]
+            random_agents = agent_distribution.sample_by_fingerprint(missing_fingerprints, seed)
+        else:
+            random_agents = agent_distribution.sample(num_missing, random_state=random_state)
 
         # Fill in missing 'agent' values with the randomly sampled values
         hotel_bookings_df.loc[missing_indices, 'agent'] = random_agents
         return hotel_bookings_df
 
     @staticmethod
-    def countries_imputation(hotel_bookings_df) -> pd.DataFrame:
+    @profile_step
+    def agent_country_counts(hotel_bookings_df) -> pd.Series:
+        """
+        Count the bookings of every ('agent', 'country') pair, ignoring bookings without agent.
+
+        Parameters:
+        - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+
+        Returns:
+        - pd.Series: Number of bookings indexed by ('agent', 'country').
+        """
+        counts = hotel_bookings_df.groupby(['agent', 'country'], sort=False, observed=True).size()
+        if isinstance(counts.index.levels[1], pd.CategoricalIndex):
+            # Index the counts by the countries, not by the categories of this DataFrame
+            counts.index = counts.index.set_levels(counts.index.levels[1].astype(str), level='country')
+        return counts
+
+    @staticmethod
+    @profile_step
+    def modal_countries(agent_country_counts) -> pd.Series:
+        """
+        Get the most common 'country' for each 'agent'.
+
+        Ties are broken by taking the smallest country, the same order returned by pd.Series.mode().
+
+        Parameters:
+        - agent_country_counts (pd.Series): Number of bookings indexed by ('agent', 'country').
+
+        Returns:
+        - pd.Series: Most common 'country' indexed by 'agent'.
+        """
+        counts = agent_country_counts[agent_country_counts > 0].rename('count').reset_index()
+        counts = counts.sort_values(['agent', 'count', 'country'], ascending=[True, False, True], kind='stable')
+        counts = counts.drop_duplicates(subset='agent', keep='first')
+        return pd.Series(counts['country'].to_numpy(), index=counts['agent'].to_numpy())
+
+    @staticmethod
+    @profile_step
+    def countries_imputation(hotel_bookings_df, modal_countries: pd.Series = None) -> pd.DataFrame:
         """
         Impute missing 'country' values based on the most common 'country' for the corresponding 'agent'.
 
         Parameters:
         - hotel_bookings_df (pd.DataFrame): DataFrame containing hotel bookings data.
+        - modal_countries (pd.Series): Most common 'country' indexed by 'agent'. Default is None, which computes it
+          from hotel_bookings_df.
 
         Returns:
         - pd.DataFrame: Transformed DataFrame.
         """
-        missing_country_rows = hotel_bookings_df[
-            (hotel_bookings_df['country'] == 'Unknown') & (~hotel_bookings_df['agent'].isnull())]
-        # For each such row, fill in 'country' based on the most common 'country' for that 'agent'
-        for index, row in missing_country_rows.iterrows():
-            agent = row['agent']
-            possible_countries = hotel_bookings_df[hotel_bookings_df['agent'] == agent]['country']
-            if not possible_countries.empty:
-                most_common_country = possible_countries.mode().iloc[0]
-                hotel_bookings_df.at[index, 'country'] = most_common_country
+        missing_country = (hotel_bookings_df['country'] == 'Unknown') & (~hotel_bookings_df['agent'].isnull())
+        if not missing_country.any():
+            return hotel_bookings_df
+        if modal_countries is None:
+            # Only the agents with missing countries need their mode
+            missing_agents = hotel_bookings_df.loc[missing_country, 'agent'].unique()
+            agents_bookings_df = hotel_bookings_df[hotel_bookings_df['agent'].isin(missing_agents)]
+            modal_countries = PipelineTransformations.modal_countries(
+                PipelineTransformations.agent_country_counts(agents_bookings_df))
+        imputed_countries = hotel_bookings_df.loc[missing_country, 'agent'].map(modal_countries)
+        has_mode = imputed_countries.notnull().to_numpy()
+        # Positional assignment, the index of the bookings is not guaranteed to be unique
+        rows = np.flatnonzero(missing_country.to_numpy())[has_mode]
+        countries = imputed_countries.to_numpy()[has_mode]
+        # Modal countries computed from other bookings may not be categories of this DataFrame
+        hotel_bookings_df['country'] = add_categories(hotel_bookings_df['country'], countries)
+        hotel_bookings_df.iloc[rows, hotel_bookings_df.columns.get_loc('country')] = countries
         return hotel_bookings_df
 
     @staticmethod
+    @profile_step
+    def flatten_columns(users_df, columns_spec: dict, drop_nested: bool = True) -> pd.DataFrame:
+        """
+        Extract nested fields into columns, in a single pass over every nested column.
+
+        Nested fields may already be flattened (for example by pd.json_normalize at extraction) into columns named by
+        their dotted path, or be stored in a column of dicts, or of their repr when read from CSV files written by
+        older extractions. Missing fields are set to NaN.
+
+        Parameters:
+        - users_df (pd.DataFrame): DataFrame containing nested data.
+        - columns_spec (dict): Dictionary mapping output columns to the dotted path of their field, e.g.
+          {'geo_lat': 'address.geo.lat'}.
+        - drop_nested (bool): Drop the nested and dotted path columns consumed. Default is True.
+
+        Returns:
+        - pd.DataFrame: Transformed DataFrame.
+        """
+        # Normalize every nested column once, whatever the number of fields extracted from it
+        nested_paths = {}
+        for column, path in columns_spec.items():
+            if path not in users_df.columns:
+                root, _, field = path.partition('.')
+                nested_paths.setdefault(root, {})[column] = field
+
+        new_columns = {column: users_df[path] for column, path in columns_spec.items() if path in users_df.columns}
+        for root, fields in nested_paths.items():
+            if root not in users_df.columns:
+                raise KeyError(f"Nested column '{root}' not found")
+            values = users_df[root]
+            # Parse every distinct repr once instead of once per row
+            reprs = pd.unique(values[values.map(type) == str])
+            parsed = {value: ast.literal_eval(value) for value in reprs}
+            records = [parsed.get(value, value) if isinstance(value, str) else value for value in values]
+            nested_df = pd.json_normalize([record if isinstance(record, dict) else {} for record in records])
+            nested_df = nested_df.reindex(columns=list(fields.values()))
+            nested_df.index = users_df.index
+            new_columns.update({column: nested_df[field] for column, field in fields.items()})
+
+        if drop_nested:
+            consumed_columns = set(nested_paths) | {path for path in columns_spec.values() if path in users_df.columns}
+            users_df = users_df.drop(columns=[column for column in users_df.columns
+                                              if column in consumed_columns and column not in columns_spec])
+        return users_df.assign(**new_columns)
+
+    @staticmethod
+    @profile_step
     def get_address_subfields(users_df) -> pd.DataFrame:
         """
         Extract subfields from the 'address' column in the users DataFrame.
@@ -87,16 +231,17 @@ class PipelineTransformations:
         - pd.DataFrame: Transformed DataFrame.
         """
         # Address subfields
-        users_df['address'] = users_df['address'].apply(ast.literal_eval)
-        users_df['street'] = users_df['address'].apply(lambda x: x['street'])
-        users_df['suite'] = users_df['address'].apply(lambda x: x['suite'])
-        users_df['city'] = users_df['address'].apply(lambda x: x['city'])
-        users_df['zipcode'] = users_df['address'].apply(lambda x: x['zipcode'])
-        users_df['geo_lat'] = users_df['address'].apply(lambda x: x['geo']['lat'])
-        users_df['geo_lng'] = users_df['address'].apply(lambda x: x['geo']['lng'])
-        return users_df
+        return PipelineTransformations.flatten_columns(users_df, {
+            'street': 'address.street',
+            'suite': 'address.suite',
+            'city': 'address.city',
+            'zipcode': 'address.zipcode',
+            'geo_lat': 'address.geo.lat',
+            'geo_lng': 'address.geo.lng'
+        }, drop_nested=False)
 
     @staticmethod
+    @profile_step
     def get_company_subfields(users_df) -> pd.DataFrame:
         """
         Extract subfields from the 'company' column in the users DataFrame.
@@ -107,11 +252,11 @@ class PipelineTransformations:
         Returns:
         - pd.DataFrame: Transformed DataFrame.
         """
-        users_df['company'] = users_df['company'].apply(ast.literal_eval)
-        users_df['company_name'] = users_df['company'].apply(lambda x: x['name'])
-        users_df['company_catchPhrase'] = users_df['company'].apply(lambda x: x['catchPhrase'])
-        users_df['company_bs'] = users_df['company'].apply(lambda x: x['bs'])
-        return users_df
+        return PipelineTransformations.flatten_columns(users_df, {
+            'company_name': 'company.name',
+            'company_catchPhrase': 'company.catchPhrase',
+            'company_bs': 'company.bs'
+        }, drop_nested=False)
 
     @staticmethod
     def standardize_phone(phone) -> str:
@@ -125,7 +270,7 @@ class PipelineTransformations:
         - str: Standardized phone number.
         """
         # Remove non-numeric characters
-        phone = re.sub(r'\D', '', str(phone))
+        phone = PipelineTransformations.NON_DIGIT_PATTERN.sub('', str(phone))
 
         # Remove common prefixes
         phone = re.sub(r'^\+1', '', phone)  # Remove '+1' prefix
@@ -150,5 +295,67 @@ class PipelineTransformations:
         Returns:
         - bool: True if the email is valid, False otherwise.
         """
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return bool(PipelineTransformations.EMAIL_PATTERN.match(email))
+
+    @staticmethod
+    @profile_step
+    def standardize_phones(phones: pd.Series) -> pd.Series:
+        """
+        Standardize a column of phone numbers, with the same result as PipelineTransformations.standardize_phone.
+
+        Only the digits of every phone are kept, prefixed with the US country code. Missing phones become '+1'.
+
+        Parameters:
+        - phones (pd.Series): Phone numbers.
+
+        Returns:
+        - pd.Series: Standardized phone numbers.
+        """
+        digits = phones.astype(str).str.replace(PipelineTransformations.NON_DIGIT_PATTERN.pattern, '', regex=True)
+        return '+1' + digits.fillna('')
+
+    @staticmethod
+    @profile_step
+    def validate_emails(emails: pd.Series) -> pd.Series:
+        """
+        Check a column of email addresses, with the same result as PipelineTransformations.is_valid_email.
+
+        Parameters:
+        - emails (pd.Series): Email addresses.
+
+        Returns:
+        - pd.Series: True where the email is valid, False otherwise (missing emails included).
+        """
+        # re.match lets '$' match before a trailing newline, while pyarrow strings only match it at the end: dropping
+        # one trailing newline and matching the whole email gives the same result with every string dtype
+        emails = emails.str.removesuffix('\n')
+        return emails.str.fullmatch(PipelineTransformations.EMAIL_PATTERN, na=False).astype(bool)
+
+    @staticmethod
+    @profile_step
+    def standardize_websites(websites: pd.Series) -> pd.Series:
+        """
+        Prefix the websites without scheme with 'http://'.
+
+        Parameters:
+        - websites (pd.Series): Websites.
+
+        Returns:
+        - pd.Series: Websites with scheme. Missing websites are kept missing.
+        """
+        has_scheme = websites.str.startswith(PipelineTransformations.WEBSITE_SCHEMES, na=True).astype(bool)
+        return websites.where(has_scheme, 'http://' + websites)
+
+    @staticmethod
+    @profile_step
+    def remove_special_characters(values: pd.Series) -> pd.Series:
+        """
+        Remove the characters that are not letters, digits or whitespaces.
+
+        Parameters:
+        - values (pd.Series): Strings to clean.
+
+        Returns:
+        - pd.Series: Cleaned strings.
+        """
+        return values.str.replace(PipelineTransformations.SPECIAL_CHARACTERS_PATTERN.pattern, '', regex=True)
@@ -0,0 +1,426 @@
+import os
+import sys
+import json
+import time
+import logging
+import cProfile
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.etl import ETL
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+_active_profiler = None
+
+
+def current_rss() -> float:
+    """
+    Get the current resident set size of the process.
+
+    Returns:
+    - float: RSS in MiB, or None if it is not available on the platform (neither /proc nor psutil).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            # Sizes in pages: total program size, then resident set size
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 2 ** 20
+
+
+def peak_rss() -> float:
+    """
+    Get the peak resident set size of the process since it started.
+
+    Returns:
+    - float: Peak RSS in MiB, or None if it is not available on the platform.
+    """
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, KiB on Linux
+        return max_rss / 2 ** 20 if sys.platform == "darwin" else max_rss / 2 ** 10
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory_info = psutil.Process().memory_info()
+    return getattr(memory_info, "peak_wset", memory_info.rss) / 2 ** 20
+
+
+class StageMetrics:
+    """
+    Metrics of a pipeline stage: times, rows and bytes read and written, duplicated rows removed and peak memory.
+
+    The peak RSS of a stage is the highest RSS of the process sampled while the stage runs (see PipelineProfiler), and
+    its increase is that peak minus the RSS when the stage started, the memory the stage needed over what was already
+    held. Runs of the same stage keep the highest of both.
+    """
+
+    def __init__(self, name: str, parent=None):
+        """
+        Constructor for StageMetrics.
+
+        Parameters:
+        - name (str): Name of the stage, prefixed by the names of its parents, e.g. "transform/dates_standardize".
+        - parent (StageMetrics): Stage running this one, which also receives its reads and writes. Default is None.
+        """
+        self.name = name
+        self.parent = parent
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.duplicates_removed = 0
+        self.peak_rss = None
+        self.peak_rss_increase = None
+
+    def add(self, metrics):
+        """
+        Aggregate another run of the same stage.
+
+        Parameters:
+        - metrics (StageMetrics): Metrics of the other run.
+        """
+        self.calls += metrics.calls
+        self.wall_time += metrics.wall_time
+        self.cpu_time += metrics.cpu_time
+        self.rows_in += metrics.rows_in
+        self.rows_out += metrics.rows_out
+        self.bytes_read += metrics.bytes_read
+        self.bytes_written += metrics.bytes_written
+        self.duplicates_removed += metrics.duplicates_removed
+        if metrics.peak_rss is not None:
+            self.peak_rss = max(self.peak_rss or 0.0, metrics.peak_rss)
+            self.peak_rss_increase = max(self.peak_rss_increase or 0.0, metrics.peak_rss_increase)
+
+    def to_dict(self) -> dict:
+        """
+        Get the metrics as a JSON serializable dictionary.
+
+        Returns:
+        - dict: Metrics of the stage.
+        """
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "wall_time_s": round(self.wall_time, 6),
+            "cpu_time_s": round(self.cpu_time, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "duplicates_removed": self.duplicates_removed,
+            "peak_rss_mib": None if self.peak_rss is None else round(self.peak_rss, 1),
+            "peak_rss_increase_mib": None if self.peak_rss_increase is None else round(self.peak_rss_increase, 1),
+        }
+
+
+class PipelineProfiler:
+    """
+    Record the metrics of the pipeline stages run while the profiler is active.
+
+    Stages are opened with stage() and the PipelineTransformations steps decorated with profile_step. Runs of the
+    same stage are aggregated. When the profiler is closed, the metrics are logged and written into a JSON file per
+    run, along with a cProfile dump if requested.
+
+    CPU times are the ones of the whole process, so they include the threads running concurrently with a stage. The
+    same holds for memory: a thread samples the RSS of the process every sample_interval seconds and raises the peak
+    of every running stage, so stages shorter than the interval only see the RSS at their start and end.
+    """
+    METRICS_FILE = "run_{}.json"
+    CPROFILE_FILE = "run_{}.prof"
+    DEFAULT_SAMPLE_INTERVAL = 0.01
+
+    def __init__(self, logger: logging.Logger, metrics_dir: str = ETL.DEFAULT_METRICS_DIR, cprofile: bool = False,
+                 sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Constructor for PipelineProfiler.
+
+        Parameters:
+        - logger (logging.Logger): Logger instance for logging messages.
+        - metrics_dir (str): Directory of the metrics files, created if it does not exist. Default is
+          ETL.DEFAULT_METRICS_DIR.
+        - cprofile (bool): Also profile the main thread with cProfile, dumping its stats next to the metrics.
+          Default is False.
+        - sample_interval (float): Seconds between two samples of the RSS. Default is
+          PipelineProfiler.DEFAULT_SAMPLE_INTERVAL.
+        """
+        self.logger = logger
+        self.metrics_dir = metrics_dir
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.run_id = None
+        self.started_at = None
+        self.start = None
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.sample_interval = sample_interval
+        self.running = set()
+        self.stop_sampling = threading.Event()
+        self.sampler = None
+
+    def __enter__(self):
+        global _active_profiler
+        started_at = datetime.now()
+        self.run_id = started_at.strftime("%Y%m%d_%H%M%S_%f")
+        self.started_at = started_at.isoformat(timespec="seconds")
+        self.start = time.perf_counter()
+        self.stages = {}
+        _active_profiler = self
+        if current_rss() is not None:
+            self.stop_sampling.clear()
+            self.sampler = threading.Thread(target=self.__sample_rss, name="rss-sampler", daemon=True)
+            self.sampler.start()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active_profiler
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        _active_profiler = None
+        if self.sampler is not None:
+            self.stop_sampling.set()
+            self.sampler.join()
+            self.sampler = None
+        self.save(time.perf_counter() - self.start)
+
+    def __update_peaks(self, rss: float):
+        """
+        Raise the peak RSS of the running stages to a sampled RSS.
+
+        Parameters:
+        - rss (float): RSS in MiB.
+        """
+        with self.lock:
+            for metrics in self.running:
+                metrics.peak_rss = max(metrics.peak_rss, rss)
+
+    def __sample_rss(self):
+        """
+        Sample the RSS of the process until the profiler is closed, in its own thread.
+        """
+        while not self.stop_sampling.wait(self.sample_interval):
+            if self.running:
+                self.__update_peaks(current_rss())
+
+    def current_stage(self) -> StageMetrics:
+        """
+        Get the innermost stage running in the current thread.
+
+        Returns:
+        - StageMetrics: Metrics of the stage, or None if no stage is running in the thread.
+        """
+        stack = getattr(self.local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def stage(self, name: str, parent: StageMetrics = None):
+        """
+        Measure a stage.
+
+        Parameters:
+        - name (str): Name of the stage.
+        - parent (StageMetrics): Stage running this one. Default is None, which uses the innermost stage running in
+          the current thread. Needed for stages run in other threads.
+
+        Yields:
+        - StageMetrics: Metrics of the stage, rows can be added to them.
+        """
+        parent = parent or self.current_stage()
+        metrics = StageMetrics(f"{parent.name}/{name}" if parent is not None else name, parent=parent)
+        metrics.calls = 1
+        with self.lock:
+            # Stages are listed in the order they are first started
+            if metrics.name not in self.stages:
+                self.stages[metrics.name] = StageMetrics(metrics.name)
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        self.local.stack.append(metrics)
+        start_rss = current_rss()
+        if start_rss is not None:
+            metrics.peak_rss = start_rss
+            with self.lock:
+                self.running.add(metrics)
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield metrics
+        finally:
+            metrics.wall_time = time.perf_counter() - start_wall
+            metrics.cpu_time = time.process_time() - start_cpu
+            if start_rss is not None:
+                self.__update_peaks(current_rss())
+                with self.lock:
+                    self.running.discard(metrics)
+                metrics.peak_rss_increase = metrics.peak_rss - start_rss
+            self.local.stack.pop()
+            with self.lock:
+                self.stages[metrics.name].add(metrics)
+
+    def record_io(self, rows_read: int = 0, bytes_read: int = 0, rows_written: int = 0, bytes_written: int = 0):
+        """
+        Add rows and bytes read or written to the stage running in the current thread and to its parents.
+
+        Parameters:
+        - rows_read (int): Rows read. Default is 0.
+        - bytes_read (int): Bytes read. Default is 0.
+        - rows_written (int): Rows written. Default is 0.
+        - bytes_written (int): Bytes written. Default is 0.
+        """
+        metrics = self.current_stage()
+        with self.lock:
+            while metrics is not None:
+                metrics.rows_in += rows_read
+                metrics.bytes_read += bytes_read
+                metrics.rows_out += rows_written
+                metrics.bytes_written += bytes_written
+                metrics = metrics.parent
+
+    def record_duplicates(self, duplicates: int):
+        """
+        Add duplicated rows removed to the stage running in the current thread and to its parents.
+
+        Parameters:
+        - duplicates (int): Duplicated rows removed.
+        """
+        metrics = self.current_stage()
+        with self.lock:
+            while metrics is not None:
+                metrics.duplicates_removed += duplicates
+                metrics = metrics.parent
+
+    def save(self, wall_time: float):
+        """
+        Log the metrics of the run and write them into the metrics directory.
+
+        Parameters:
+        - wall_time (float): Seconds of the whole run.
+        """
+        run_peak_rss = peak_rss()
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        metrics_path = os.path.join(self.metrics_dir, self.METRICS_FILE.format(self.run_id)).replace("\\", "/")
+        with open(metrics_path, "w") as f:
+            json.dump({
+                "run_id": self.run_id,
+                "started_at": self.started_at,
+                "wall_time_s": round(wall_time, 6),
+                "peak_rss_mib": None if run_peak_rss is None else round(run_peak_rss, 1),
+                "stages": [metrics.to_dict() for metrics in self.stages.values()]
+            }, f, indent=2)
+
+        for metrics in self.stages.values():
+            peak = f"{metrics.peak_rss:.1f} MiB" if metrics.peak_rss is not None else "not available"
+            self.logger.info(f"Stage {metrics.name}: {metrics.calls} calls, {metrics.wall_time:.3f}s wall, "
+                             f"{metrics.cpu_time:.3f}s CPU, {metrics.rows_in} rows in, {metrics.rows_out} rows out, "
+                             f"{metrics.bytes_read} bytes read, {metrics.bytes_written} bytes written, "
+                             f"{metrics.duplicates_removed} duplicates removed, peak RSS {peak}")
+        self.logger.info(f"Run metrics saved into {metrics_path}")
+        if self.cprofile is not None:
+            cprofile_path = os.path.join(self.metrics_dir, self.CPROFILE_FILE.format(self.run_id)).replace("\\", "/")
+            self.cprofile.dump_stats(cprofile_path)
+            self.logger.info(f"cProfile stats saved into {cprofile_path}")
+
+
+@contextmanager
+def stage(name: str, parent: StageMetrics = None):
+    """
+    Measure a stage with the active profiler, if there is one.
+
+    Parameters:
+    - name (str): Name of the stage.
+    - parent (StageMetrics): Stage running this one, see PipelineProfiler.stage. Default is None.
+
+    Yields:
+    - StageMetrics: Metrics of the stage, or None if no profiler is active.
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        yield None
+        return
+    with profiler.stage(name, parent=parent) as metrics:
+        yield metrics
+
+
+def current_stage() -> StageMetrics:
+    """
+    Get the innermost stage running in the current thread with the active profiler.
+
+    Returns:
+    - StageMetrics: Metrics of the stage, or None if there is no stage running or no profiler is active.
+    """
+    profiler = _active_profiler
+    return profiler.current_stage() if profiler is not None else None
+
+
+def record_io(rows_read: int = 0, bytes_read: int = 0, rows_written: int = 0, bytes_written: int = 0):
+    """
+    Add rows and bytes read or written to the running stage of the active profiler, if there is one.
+
+    Parameters:
+    - rows_read (int): Rows read. Default is 0.
+    - bytes_read (int): Bytes read. Default is 0.
+    - rows_written (int): Rows written. Default is 0.
+    - bytes_written (int): Bytes written. Default is 0.
+    """
+    profiler = _active_profiler
+    if profiler is not None:
+        profiler.record_io(rows_read, bytes_read, rows_written, bytes_written)
+
+
+def record_duplicates(duplicates: int):
+    """
+    Add duplicated rows removed to the running stage of the active profiler, if there is one.
+
+    Parameters:
+    - duplicates (int): Duplicated rows removed.
+    """
+    profiler = _active_profiler
+    if profiler is not None:
+        profiler.record_duplicates(duplicates)
+
+
+def profile_step(function):
+    """
+    Decorator measuring every call of a transformation step as a stage of the active profiler.
+
+    The rows of the first DataFrame or Series argument are counted as input rows and the rows of the result, or of
+    the DataFrames of a resulting dictionary, as output rows. Without an active profiler the step runs unchanged.
+
+    Parameters:
+    - function (callable): Transformation step.
+
+    Returns:
+    - callable: Measured step.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _active_profiler is None:
+            return function(*args, **kwargs)
+        with _active_profiler.stage(function.__name__.lstrip("_")) as metrics:
+            data = next((value for value in list(args) + list(kwargs.values()) if hasattr(value, "shape")), None)
+            if data is not None:
+                metrics.rows_in += len(data)
+            result = function(*args, **kwargs)
+            if hasattr(result, "shape"):
+                metrics.rows_out += len(result)
+            elif isinstance(result, dict):
+                # Tables by name
+                metrics.rows_out += sum(len(value) for value in result.values() if hasattr(value, "shape"))
+            return result
+    return wrapper
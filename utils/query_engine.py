@@ -0,0 +1,292 @@
+import os
+import logging
+
+import pandas as pd
+
+from utils.bookings_aggregates import BookingsAggregates
+from utils.data_driven_etl import DataDrivenETL
+from utils.etl import ETL
+from utils.schemas import get_schema
+from utils.storage import get_storage
+
+# Season of the reservation status month, as in sql/analyze/analyisis.sql
+SEASON_SQL = """CASE
+            WHEN MONTH(fb.reservation_status_date) IN (12, 1, 2) THEN 'Invierno'
+            WHEN MONTH(fb.reservation_status_date) IN (3, 4, 5) THEN 'Primavera'
+            WHEN MONTH(fb.reservation_status_date) IN (6, 7, 8) THEN 'Verano'
+            WHEN MONTH(fb.reservation_status_date) IN (9, 10, 11) THEN 'Otoño'
+            ELSE 'Otro'
+        END"""
+
+# Queries of sql/analyze/analyisis.sql over the transformed tables, with exact averages
+ANALYSIS_QUERIES = {
+    "bookings_by_agent": """
+        SELECT du.username AS agent_name, COUNT(fb.booking_id) AS num_bookings
+        FROM dim_users du
+        LEFT JOIN fact_bookings fb ON du.id = fb.agent_id
+        GROUP BY du.username
+        ORDER BY agent_name""",
+    "bookings_by_company": """
+        SELECT dc.company_name, COUNT(fb.booking_id) AS num_bookings
+        FROM dim_companies dc
+        LEFT JOIN dim_users du ON dc.company_id = du.company_id
+        LEFT JOIN fact_bookings fb ON du.id = fb.agent_id
+        GROUP BY dc.company_name
+        ORDER BY dc.company_name""",
+    "meal_preferences": """
+        SELECT
+            dm.meal,
+            CASE
+                WHEN dm.meal IN ('Undefined', 'SC') THEN 'No meal package'
+                WHEN dm.meal = 'BB' THEN 'Bed & Breakfast'
+                WHEN dm.meal = 'HB' THEN 'Half board'
+                WHEN dm.meal = 'FB' THEN 'Full board'
+                ELSE 'Other'
+            END AS meal_package,
+            COUNT(fb.booking_id) AS num_bookings
+        FROM dim_meals dm
+        LEFT JOIN fact_bookings fb ON dm.meal_id = fb.meal_id
+        GROUP BY dm.meal
+        ORDER BY dm.meal""",
+    "cancellations_by_country": """
+        SELECT fb.country, COUNT(fb.booking_id) AS num_cancelations
+        FROM fact_bookings fb
+        WHERE fb.is_canceled = 1
+        GROUP BY fb.country
+        ORDER BY fb.country""",
+    "avg_stay_by_agent": """
+        SELECT du.username, AVG(fb.stays_in_weekend_nights + fb.stays_in_week_nights) AS avg_stay
+        FROM dim_users du
+        LEFT JOIN fact_bookings fb ON du.id = fb.agent_id
+        GROUP BY du.username
+        ORDER BY du.username""",
+    "bookings_by_season": f"""
+        SELECT
+            {SEASON_SQL} AS season,
+            COUNT(fb.booking_id) AS num_bookings,
+            COUNT(CASE WHEN fb.is_canceled = 1 THEN 1 END) AS num_cancelled_bookings,
+            ROUND(COUNT(CASE WHEN fb.is_canceled = 1 THEN 1 END) / NULLIF(COUNT(fb.booking_id), 0) * 100, 2)
+                AS cancelled_percentage,
+            CAST(COALESCE(SUM(fb.stays_in_weekend_nights + fb.stays_in_week_nights), 0) AS BIGINT)
+                AS total_stay_in_days,
+            AVG(fb.stays_in_week_nights) AS avg_stay_in_week,
+            AVG(fb.stays_in_week_nights + fb.stays_in_weekend_nights) AS avg_stay_total,
+            COUNT(CASE WHEN dm.meal = 'Undefined' THEN 1 END) AS num_undefined_meal,
+            COUNT(CASE WHEN dm.meal = 'BB' THEN 1 END) AS num_bed_breakfast,
+            COUNT(CASE WHEN dm.meal = 'HB' THEN 1 END) AS num_half_board,
+            COUNT(CASE WHEN dm.meal = 'FB' THEN 1 END) AS num_full_board
+        FROM dim_users du
+        LEFT JOIN fact_bookings fb ON du.id = fb.agent_id
+        LEFT JOIN dim_meals dm ON fb.meal_id = dm.meal_id
+        GROUP BY season
+        ORDER BY season"""
+}
+
+# Comparison operators of the table filters, as in the filters of pyarrow.parquet.read_table
+FILTER_OPERATORS = {
+    "=": lambda column, value: column == value,
+    "==": lambda column, value: column == value,
+    "!=": lambda column, value: column != value,
+    "<": lambda column, value: column < value,
+    "<=": lambda column, value: column <= value,
+    ">": lambda column, value: column > value,
+    ">=": lambda column, value: column >= value,
+    "in": lambda column, value: column.isin(value),
+    "not in": lambda column, value: ~column.isin(value),
+}
+
+
+class QueryEngine:
+    """
+    In-process analytical queries over the transformed DWH tables, without a database.
+
+    The DuckDB engine runs SQL over the intermediate files, reading only the columns and row groups a query needs.
+    Without DuckDB installed, the analysis queries are computed with pandas: the fact bookings are read in chunks,
+    only with the columns the queries use, and summed into a BookingsAggregates cube shared by every query.
+
+    The tables of an incremental transform only hold the rows changed by the last run, except the summary tables
+    (agg_*), which always summarize every booking.
+    """
+    ENGINES = ("duckdb", "pandas")
+    DEFAULT_CHUNK_SIZE = 1_000_000
+    # Fact bookings columns read by the analysis queries
+    FACT_COLUMNS = ['agent_id', 'meal_id', 'country', 'is_canceled', 'stays_in_week_nights',
+                    'stays_in_weekend_nights', 'reservation_status_date']
+
+    def __init__(self, logger: logging.Logger, transformations_dir: str = ETL.DEFAULT_TRANSFORMATIONS_DIR,
+                 storage_format: str = ETL.DEFAULT_STORAGE_FORMAT, engine: str = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Constructor for QueryEngine.
+
+        Parameters:
+        - logger (logging.Logger): Logger instance for logging messages.
+        - transformations_dir (str): Directory of the transformed tables. Default is ETL.DEFAULT_TRANSFORMATIONS_DIR.
+        - storage_format (str): Format of the transformed tables, "csv" or "parquet". Default is
+          ETL.DEFAULT_STORAGE_FORMAT.
+        - engine (str): Query engine, one of QueryEngine.ENGINES. Default is None, which uses DuckDB if it is
+          installed and pandas otherwise.
+        - chunk_size (int): Fact bookings read at once by the pandas engine. Default is
+          QueryEngine.DEFAULT_CHUNK_SIZE.
+        """
+        if engine is None:
+            try:
+                import duckdb  # noqa: F401
+                engine = "duckdb"
+            except ImportError:
+                engine = "pandas"
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown query engine: {engine}. Available engines: {self.ENGINES}")
+        self.logger = logger
+        self.transformations_dir = transformations_dir
+        self.storage = get_storage(storage_format)
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.connection = None
+        self.summary_tables = None
+
+    def __path(self, table_name: str) -> str:
+        path = self.storage.path(self.transformations_dir, table_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Table {table_name} not found in {self.transformations_dir}, run the "
+                                    f"transform step first")
+        return path
+
+    def __duckdb(self):
+        """
+        Get the DuckDB connection, with a view over the file of every transformed table.
+
+        Returns:
+        - duckdb.DuckDBPyConnection: In-memory DuckDB connection.
+        """
+        if self.connection is None:
+            import duckdb
+
+            self.connection = duckdb.connect()
+            reader = "read_parquet" if self.storage.EXTENSION == ".parquet" else "read_csv_auto"
+            for table_name in DataDrivenETL.DWH_TABLES_INFO:
+                path = self.storage.path(self.transformations_dir, table_name)
+                if os.path.exists(path):
+                    self.connection.execute(f"CREATE VIEW {table_name} AS "
+                                            f"SELECT * FROM {reader}('{path.replace(chr(39), chr(39) * 2)}')")
+        return self.connection
+
+    def sql(self, query: str) -> pd.DataFrame:
+        """
+        Run a SQL query over the transformed tables, which are named as the DWH tables.
+
+        Parameters:
+        - query (str): DuckDB SQL query.
+
+        Returns:
+        - pd.DataFrame: Query result.
+        """
+        if self.engine != "duckdb":
+            raise ValueError("SQL queries require the duckdb engine (pip install duckdb)")
+        return self.__duckdb().execute(query).df()
+
+    def table(self, table_name: str, columns: list = None, filters: list = None) -> pd.DataFrame:
+        """
+        Read a transformed table, only with some of its columns and rows.
+
+        Parameters:
+        - table_name (str): Name of the table, e.g. "agg_bookings_by_country".
+        - columns (list): Columns to read. Default is None, which reads all the columns.
+        - filters (list): Conditions the rows must meet, (column, operator, value) tuples with the operators of
+          FILTER_OPERATORS, e.g. [("num_cancellations", ">", 100)]. Default is None, which reads all the rows.
+
+        Returns:
+        - pd.DataFrame: Table data.
+        """
+        filters = filters or []
+        for column, operator, value in filters:
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator: {operator}. Available operators: "
+                                 f"{list(FILTER_OPERATORS)}")
+
+        if self.engine == "duckdb":
+            self.__path(table_name)
+            conditions, parameters = [], []
+            for column, operator, value in filters:
+                if operator in ("in", "not in"):
+                    conditions.append(f'"{column}" {operator.upper()} ({", ".join("?" for _ in value)})')
+                    parameters.extend(value)
+                else:
+                    conditions.append(f'"{column}" {"=" if operator == "==" else operator} ?')
+                    parameters.append(value)
+            projection = ", ".join(f'"{column}"' for column in columns) if columns else "*"
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            return self.__duckdb().execute(f"SELECT {projection} FROM {table_name}{where}", parameters).df()
+
+        path = self.__path(table_name)
+        filter_columns = [column for column, _, _ in filters]
+        read_columns = list(dict.fromkeys(columns + filter_columns)) if columns else None
+        if self.storage.EXTENSION == ".parquet":
+            # Row groups not meeting the filters are skipped by pyarrow
+            df = pd.read_parquet(path, columns=read_columns, filters=[tuple(f) for f in filters] or None)
+        else:
+            df = self.storage.read(path, columns=read_columns, dtype=get_schema(table_name))
+            for column, operator, value in filters:
+                df = df[FILTER_OPERATORS[operator](df[column], value)]
+        return df[columns].reset_index(drop=True) if columns else df.reset_index(drop=True)
+
+    def __summary_tables(self) -> dict:
+        """
+        Compute the summary tables of the analysis queries with pandas, scanning the fact bookings once.
+
+        Returns:
+        - dict: Dictionary mapping table names to their DataFrames, see BookingsAggregates.tables.
+        """
+        if self.summary_tables is None:
+            meals = self.table("dim_meals", columns=["meal_id", "meal"]).set_index("meal_id")["meal"]
+            aggregates = BookingsAggregates()
+            fact_path = self.__path("fact_bookings")
+            for chunk_df in self.storage.read_chunks(fact_path, self.chunk_size, columns=self.FACT_COLUMNS,
+                                                     dtype=get_schema("fact_bookings")):
+                chunk_df['meal'] = chunk_df['meal_id'].map(meals)
+                chunk_df['reservation_status_date'] = pd.to_datetime(chunk_df['reservation_status_date'])
+                aggregates.update(chunk_df)
+            self.summary_tables = aggregates.tables(
+                self.table("dim_users", columns=["id", "username", "company_id"]),
+                self.table("dim_companies", columns=["company_id", "company_name"]))
+            self.logger.info(f"Fact bookings summarized into {len(aggregates.cube)} cube rows")
+        return self.summary_tables
+
+    def __pandas_query(self, query_name: str) -> pd.DataFrame:
+        tables = self.__summary_tables()
+        if query_name == "bookings_by_agent":
+            return tables["agg_bookings_by_agent"][["agent_name", "num_bookings"]]
+        if query_name == "bookings_by_company":
+            return tables["agg_bookings_by_company"][["company_name", "num_bookings"]]
+        if query_name == "meal_preferences":
+            return tables["agg_bookings_by_meal"][["meal", "meal_package", "num_bookings"]]
+        if query_name == "cancellations_by_country":
+            countries_df = tables["agg_bookings_by_country"]
+            countries_df = countries_df[countries_df["num_cancellations"] > 0]
+            return countries_df[["country", "num_cancellations"]].rename(
+                columns={"num_cancellations": "num_cancelations"}).reset_index(drop=True)
+        if query_name == "avg_stay_by_agent":
+            return tables["agg_bookings_by_agent"][["agent_name", "avg_stay"]].rename(
+                columns={"agent_name": "username"})
+        return tables["agg_bookings_by_season"][
+            ["season", "num_bookings", "num_cancelled_bookings", "cancelled_percentage", "total_stay_in_days",
+             "avg_stay_in_week", "avg_stay_total", "num_undefined_meal", "num_bed_breakfast", "num_half_board",
+             "num_full_board"]]
+
+    def query(self, query_name: str) -> pd.DataFrame:
+        """
+        Run an analysis query of sql/analyze/analyisis.sql.
+
+        Parameters:
+        - query_name (str): Name of the query, one of ANALYSIS_QUERIES.
+
+        Returns:
+        - pd.DataFrame: Query result, with the same columns and rows whatever the engine.
+        """
+        if query_name not in ANALYSIS_QUERIES:
+            raise ValueError(f"Unknown query: {query_name}. Available queries: {list(ANALYSIS_QUERIES)}")
+        if self.engine == "duckdb":
+            for table_name in ("dim_users", "dim_companies", "dim_meals", "fact_bookings"):
+                self.__path(table_name)
+            return self.__duckdb().execute(ANALYSIS_QUERIES[query_name]).df()
+        return self.__pandas_query(query_name)
@@ -0,0 +1,198 @@
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.profiling import record_duplicates, stage
+
+
+class RowDeduplicator:
+    """
+    Drop duplicated rows by their 64-bit fingerprint, against the rows of the same call and of the previous calls.
+
+    Every row is hashed once into a uint64 fingerprint (see RowDeduplicator.fingerprint), which callers may compute
+    beforehand and reuse for other passes, e.g. the agents imputation. The fingerprints seen are kept sorted, so
+    membership is a binary search instead of a comparison of whole rows. New fingerprints are buffered as a sorted
+    array, merged by a sorted concatenation with the buffered arrays no larger than MERGE_FACTOR times its size, so
+    the arrays kept have geometrically decreasing sizes: adding N fingerprints copies each of them a logarithmic
+    number of times instead of inserting every call into one growing array. With a spill directory, once
+    max_fingerprints are kept in memory they are written into a sorted file, memory-mapped and searched from disk, so
+    the memory is bounded whatever the number of rows streamed through the deduplicator.
+
+    Rows with different content but the same fingerprint are considered duplicates. With 64-bit fingerprints, this
+    happens with a probability below 1e-4 for 50M distinct rows.
+    """
+    DEFAULT_MAX_FINGERPRINTS = 8_000_000
+    MERGE_FACTOR = 4
+    SPILL_FILE = "fingerprints_{}.npy"
+
+    def __init__(self, logger: logging.Logger, seen: np.ndarray = None, spill_dir: str = None,
+                 max_fingerprints: int = DEFAULT_MAX_FINGERPRINTS):
+        """
+        Constructor for RowDeduplicator.
+
+        Parameters:
+        - logger (logging.Logger): Logger instance for logging messages.
+        - seen (np.ndarray): Fingerprints of the rows seen before, e.g. by a previous incremental run. Default is
+          None.
+        - spill_dir (str): Existing directory the fingerprints are spilled into. Default is None, which keeps them
+          in memory.
+        - max_fingerprints (int): Fingerprints kept in memory before they are spilled. Default is
+          RowDeduplicator.DEFAULT_MAX_FINGERPRINTS (64 MiB).
+        """
+        self.logger = logger
+        seen = np.unique(np.asarray(seen, dtype='uint64')) if seen is not None else np.empty(0, dtype='uint64')
+        # Sorted arrays of the fingerprints kept in memory, from the largest to the smallest
+        self.buffers = [seen] if len(seen) else []
+        self.spill_dir = spill_dir
+        self.max_fingerprints = max_fingerprints
+        self.runs = []
+        self.run_paths = []
+        self.duplicates = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame, columns: list = None) -> np.ndarray:
+        """
+        Hash every row of a DataFrame into a 64-bit fingerprint.
+
+        Parameters:
+        - df (pd.DataFrame): DataFrame to hash.
+        - columns (list): Columns to hash. Default is None, which hashes all the columns.
+
+        Returns:
+        - np.ndarray: uint64 fingerprint of every row, in the order of df.
+        """
+        if columns is not None:
+            df = df[columns]
+        return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+    @staticmethod
+    def __in_sorted(sorted_fingerprints: np.ndarray, fingerprints: np.ndarray) -> np.ndarray:
+        if not len(sorted_fingerprints):
+            return np.zeros(len(fingerprints), dtype=bool)
+        positions = np.searchsorted(sorted_fingerprints, fingerprints)
+        positions[positions == len(sorted_fingerprints)] = 0
+        return sorted_fingerprints[positions] == fingerprints
+
+    @staticmethod
+    def __merge(buffers: list) -> np.ndarray:
+        # Timsort merges the sorted arrays concatenated instead of sorting them again
+        return np.sort(np.concatenate(buffers), kind='stable')
+
+    def __buffer(self, new_fingerprints: np.ndarray):
+        """
+        Add sorted fingerprints not seen before, merged with the smaller buffers.
+        """
+        self.buffers.append(new_fingerprints)
+        while len(self.buffers) > 1 and len(self.buffers[-2]) <= self.MERGE_FACTOR * len(self.buffers[-1]):
+            self.buffers[-2:] = [self.__merge(self.buffers[-2:])]
+
+    def __spill(self):
+        """
+        Write the fingerprints kept in memory into a sorted file, searched memory-mapped from then on.
+        """
+        path = os.path.join(self.spill_dir, self.SPILL_FILE.format(len(self.runs))).replace("\\", "/")
+        fingerprints = self.__merge(self.buffers)
+        np.save(path, fingerprints)
+        self.runs.append(np.load(path, mmap_mode='r'))
+        self.run_paths.append(path)
+        self.logger.info(f"{len(fingerprints)} row fingerprints spilled into {path}")
+        self.buffers = []
+
+    def first_seen(self, fingerprints, stage_name: str) -> np.ndarray:
+        """
+        Find the rows seen for the first time, and remember them.
+
+        Every pass is measured as a "deduplicate_<stage_name>" stage of the active profiler, with its duplicates.
+
+        Parameters:
+        - fingerprints (array-like): uint64 fingerprint of every row.
+        - stage_name (str): Name of the deduplication pass, under which the duplicates are counted.
+
+        Returns:
+        - np.ndarray: Boolean mask of the rows whose fingerprint is not in a previous row or call.
+        """
+        with stage(f"deduplicate_{stage_name}") as metrics:
+            is_new = self.__first_seen(np.asarray(fingerprints, dtype='uint64'))
+            duplicates = len(is_new) - int(is_new.sum())
+            if metrics is not None:
+                metrics.rows_in += len(is_new)
+                metrics.rows_out += len(is_new) - duplicates
+            self.record(stage_name, duplicates)
+        return is_new
+
+    def __first_seen(self, fingerprints: np.ndarray) -> np.ndarray:
+        # Sorted unique fingerprints, searched much faster than unsorted ones
+        candidates, first_positions = np.unique(fingerprints, return_index=True)
+        seen = np.zeros(len(candidates), dtype=bool)
+        for sorted_fingerprints in self.buffers + self.runs:
+            seen |= self.__in_sorted(sorted_fingerprints, candidates)
+        is_new = np.zeros(len(fingerprints), dtype=bool)
+        is_new[first_positions[~seen]] = True
+
+        new_fingerprints = candidates[~seen]
+        if len(new_fingerprints):
+            self.__buffer(new_fingerprints)
+            if self.spill_dir is not None and sum(map(len, self.buffers)) >= self.max_fingerprints:
+                self.__spill()
+        return is_new
+
+    def drop_duplicates(self, df: pd.DataFrame, stage_name: str, fingerprints=None) -> pd.DataFrame:
+        """
+        Drop the rows of a DataFrame seen in the same DataFrame or in previous calls.
+
+        Parameters:
+        - df (pd.DataFrame): Rows to deduplicate.
+        - stage_name (str): Name of the deduplication pass, under which the duplicates are counted.
+        - fingerprints (array-like): Precomputed fingerprint of every row. Default is None, which hashes all the
+          columns of df.
+
+        Returns:
+        - pd.DataFrame: Rows of df seen for the first time, df itself if there are none to drop.
+        """
+        if fingerprints is None:
+            fingerprints = self.fingerprint(df)
+        is_new = self.first_seen(fingerprints, stage_name)
+        # Taken rows are a new DataFrame, so callers can add columns to it
+        return df if is_new.all() else df.take(np.flatnonzero(is_new))
+
+    def record(self, stage_name: str, duplicates: int):
+        """
+        Count duplicates removed by a deduplication pass, also in the running stage of the active profiler.
+
+        Parameters:
+        - stage_name (str): Name of the deduplication pass.
+        - duplicates (int): Number of duplicated rows removed.
+        """
+        self.duplicates[stage_name] = self.duplicates.get(stage_name, 0) + duplicates
+        record_duplicates(duplicates)
+        if duplicates:
+            self.logger.info(f"{duplicates} duplicated rows removed by {stage_name}")
+
+    def fingerprints(self) -> np.ndarray:
+        """
+        Get every fingerprint seen, e.g. to save them for the next incremental run.
+
+        Returns:
+        - np.ndarray: Sorted uint64 fingerprints.
+        """
+        if not self.buffers and not self.runs:
+            return np.empty(0, dtype='uint64')
+        return self.__merge(self.buffers + [np.asarray(run) for run in self.runs])
+
+    def close(self):
+        """
+        Remove the spilled fingerprint files.
+        """
+        self.runs = []
+        for path in self.run_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.run_paths = []
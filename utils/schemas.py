@@ -0,0 +1,187 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columns of the extracted hotel bookings (reservasHotel.csv). Integer widths leave room over the values of the source,
+# columns with nulls use nullable types and low-cardinality strings are categoricals. Integers are parsed as 64-bit
+# (see read_dtypes) and narrowed by apply_schema, which raises on values out of range instead of wrapping them as
+# read_csv and astype do. Columns not declared keep the dtype inferred by pandas
+BOOKINGS_SCHEMA = {
+    'hotel': 'category',
+    'is_canceled': 'int8',
+    'lead_time': 'int16',
+    'arrival_date_year': 'int16',
+    'arrival_date_month': 'category',
+    'arrival_date_day_of_month': 'int8',
+    'stays_in_weekend_nights': 'int16',
+    'stays_in_week_nights': 'int16',
+    'adults': 'int16',
+    'children': 'Int16',
+    'meal': 'category',
+    'country': 'category',
+    'is_repeated_guest': 'int8',
+    'previous_cancellations': 'int16',
+    'previous_bookings_not_canceled': 'int16',
+    'reserved_room_type': 'category',
+    'assigned_room_type': 'category',
+    'agent': 'Int16',
+    'reservation_status': 'category',
+}
+
+# Columns of the extracted users, nested fields flattened by pd.json_normalize
+USERS_SCHEMA = {
+    'id': 'int32',
+    'address.city': 'category',
+    'company.name': 'category',
+    'company.catchPhrase': 'category',
+    'company.bs': 'category',
+}
+
+# Columns of the transformed DWH tables, with the integer types of sql/create/create_dwh.sql
+DWH_TABLES_SCHEMAS = {
+    "dim_companies": {'company_id': 'int32'},
+    "dim_hotels": {'hotel_id': 'int32', 'hotel': 'category'},
+    "dim_meals": {'meal_id': 'int32', 'meal': 'category'},
+    "dim_dates": {'arrival_date_id': 'int32'},
+    "dim_users": {'id': 'int32', 'geo_lat': 'float64', 'geo_lng': 'float64', 'company_id': 'int32'},
+    "fact_bookings": {
+        'booking_id': 'int32',
+        'hotel_id': 'int32',
+        'agent_id': 'Int16',
+        'meal_id': 'int32',
+        'is_canceled': 'int8',
+        'lead_time': 'int16',
+        'stays_in_weekend_nights': 'int16',
+        'stays_in_week_nights': 'int16',
+        'adults': 'int16',
+        'children': 'Int16',
+        'country': 'category',
+        'is_repeated_guest': 'int8',
+        'previous_cancellations': 'int16',
+        'previous_bookings_not_canceled': 'int16',
+        'reserved_room_type': 'category',
+        'assigned_room_type': 'category',
+        'reservation_status': 'category',
+        'arrival_date_id': 'int32',
+    },
+    "agg_bookings_by_agent": {'num_bookings': 'int32', 'num_cancellations': 'int32', 'total_stay': 'int32'},
+    "agg_bookings_by_company": {'num_bookings': 'int32', 'num_cancellations': 'int32', 'total_stay': 'int32'},
+    "agg_bookings_by_country": {'num_bookings': 'int32', 'num_cancellations': 'int32', 'total_stay': 'int32'},
+    "agg_bookings_by_meal": {'meal': 'category', 'meal_package': 'category', 'num_bookings': 'int32',
+                             'num_cancellations': 'int32', 'total_stay': 'int32'},
+    "agg_bookings_by_season": {'season': 'category', 'num_bookings': 'int32', 'num_cancelled_bookings': 'int32',
+                               'total_stay_in_days': 'int32', 'num_undefined_meal': 'int32',
+                               'num_bed_breakfast': 'int32', 'num_half_board': 'int32', 'num_full_board': 'int32'},
+}
+
+SCHEMAS = {"hotel_bookings": BOOKINGS_SCHEMA, "users": USERS_SCHEMA, **DWH_TABLES_SCHEMAS}
+
+
+def get_schema(file_name: str) -> dict:
+    """
+    Get the schema of a dataset from the name of its file.
+
+    Parameters:
+    - file_name (str): Name or path of the file, e.g. "data/extract/hotel_bookings.csv".
+
+    Returns:
+    - dict: Dictionary mapping columns to their dtype. Empty if the dataset has no schema.
+    """
+    return SCHEMAS.get(os.path.splitext(os.path.basename(file_name))[0], {})
+
+
+def read_dtypes(schema: dict) -> dict:
+    """
+    Get the dtypes a file is parsed with before apply_schema narrows it to a schema.
+
+    Integer columns are parsed as 64-bit, nullable ones as Int64, so values out of the range of the schema are not
+    wrapped by the parser and apply_schema can report them.
+
+    Parameters:
+    - schema (dict): Dictionary mapping columns to their dtype.
+
+    Returns:
+    - dict: Dictionary mapping columns to their dtype when parsing.
+    """
+    dtypes = {}
+    for column, dtype in schema.items():
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if pd.api.types.is_integer_dtype(dtype):
+            dtype = pd.Int64Dtype() if isinstance(dtype, pd.api.extensions.ExtensionDtype) else np.dtype('int64')
+        dtypes[column] = dtype
+    return dtypes
+
+
+def check_range(series: pd.Series, dtype) -> None:
+    """
+    Check that the values of a numeric Series fit in an integer dtype.
+
+    Parameters:
+    - series (pd.Series): Values to check, named by their column.
+    - dtype (str or dtype): Integer dtype the values are cast to, e.g. 'int8' or 'Int16'.
+
+    Raises:
+    - ValueError: If a value is out of the range of dtype.
+    """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    limits = np.iinfo(getattr(dtype, 'numpy_dtype', dtype))
+    if series.empty or not pd.api.types.is_numeric_dtype(series.dtype) or series.isna().all():
+        return
+    minimum, maximum = series.min(), series.max()
+    if minimum < limits.min or maximum > limits.max:
+        raise ValueError(f"Column '{series.name}' has values from {minimum} to {maximum}, out of the range of {dtype} "
+                         f"({limits.min} to {limits.max})")
+
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Cast the columns of a DataFrame to the dtypes of a schema. Columns not in the DataFrame are ignored.
+
+    Parameters:
+    - df (pd.DataFrame): DataFrame to cast.
+    - schema (dict): Dictionary mapping columns to their dtype.
+
+    Returns:
+    - pd.DataFrame: DataFrame with the dtypes of the schema.
+
+    Raises:
+    - ValueError: If a column has values out of the range of its integer dtype.
+    """
+    dtypes = {column: dtype for column, dtype in schema.items()
+              if column in df.columns and df[column].dtype != dtype}
+    for column, dtype in dtypes.items():
+        if pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(dtype)):
+            check_range(df[column], dtype)
+    return df.astype(dtypes) if dtypes else df
+
+
+def add_categories(series: pd.Series, values) -> pd.Series:
+    """
+    Add values to the categories of a categorical Series, so they can be assigned to it.
+
+    Parameters:
+    - series (pd.Series): Series to extend, returned as it is if it is not categorical.
+    - values (list-like or scalar): Values to add, the ones already in the categories are ignored.
+
+    Returns:
+    - pd.Series: Series with the values in its categories.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    new_categories = pd.Index(pd.unique(pd.Series(values, dtype=object).dropna())).difference(
+        series.cat.categories)
+    return series.cat.add_categories(new_categories) if len(new_categories) else series
+
+
+def memory_usage(df: pd.DataFrame) -> str:
+    """
+    Describe the size and memory footprint of a DataFrame, counting the content of object columns.
+
+    Parameters:
+    - df (pd.DataFrame): DataFrame to describe.
+
+    Returns:
+    - str: Rows and MiB used by the DataFrame.
+    """
+    return f"{len(df)} rows, {df.memory_usage(deep=True).sum() / 2 ** 20:.1f} MiB"
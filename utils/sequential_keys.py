@@ -0,0 +1,99 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.row_deduplicator import RowDeduplicator
+
+
+class SequentialKeyGenerator:
+    """
+    Number the distinct rows of a stream with consecutive surrogate keys, without keeping the rows or their keys.
+
+    Rows are deduplicated by the fingerprint of their key columns, or by a fingerprint computed by the caller, with a
+    RowDeduplicator, and only the rows seen for the first time get a key, the next one of a running counter. Rows
+    seen before are dropped instead of looked up, which fits the tables whose rows are not referenced again by later
+    chunks or runs, like fact tables. The memory is the one of the deduplicator: 8 bytes per distinct row, bounded
+    when it spills to disk.
+    """
+    EXTENSION = ".npz"
+
+    def __init__(self, columns: list, logger: logging.Logger, start: int = 1, spill_dir: str = None,
+                 seen: np.ndarray = None):
+        """
+        Constructor for SequentialKeyGenerator.
+
+        Parameters:
+        - columns (list): Columns whose unique combinations identify a key.
+        - logger (logging.Logger): Logger instance for logging messages.
+        - start (int): First key to assign. Default is 1.
+        - spill_dir (str): Existing directory the fingerprints of the rows seen are spilled into, see RowDeduplicator.
+          Default is None, which keeps them in memory.
+        - seen (np.ndarray): Fingerprints of the rows numbered before, e.g. by a previous incremental run. Default is
+          None.
+        """
+        self.columns = list(columns)
+        self.logger = logger
+        self.next_key = start
+        self.deduplicator = RowDeduplicator(logger, seen=seen, spill_dir=spill_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def new_rows(self, df: pd.DataFrame, key_name: str, stage_name: str,
+                 fingerprints: np.ndarray = None) -> pd.DataFrame:
+        """
+        Get the rows not numbered before, with their new key.
+
+        Parameters:
+        - df (pd.DataFrame): DataFrame containing the key columns.
+        - key_name (str): Column the keys are assigned to.
+        - stage_name (str): Name of the deduplication pass, under which the rows dropped are counted.
+        - fingerprints (np.ndarray): uint64 fingerprint identifying every row of df, e.g. the one of its source row.
+          Default is None, which hashes the key columns (see RowDeduplicator.fingerprint).
+
+        Returns:
+        - pd.DataFrame: Rows of df seen for the first time, in their order, with their key in key_name.
+        """
+        if fingerprints is None:
+            fingerprints = RowDeduplicator.fingerprint(df, self.columns)
+        is_new = self.deduplicator.first_seen(fingerprints, stage_name)
+        # Taken rows are a new DataFrame, so the key column is not added to df
+        new_df = df.take(np.flatnonzero(is_new))
+        new_df[key_name] = np.arange(self.next_key, self.next_key + len(new_df), dtype='int64')
+        self.next_key += len(new_df)
+        return new_df
+
+    def save(self, path: str):
+        """
+        Save the fingerprints of the rows numbered and the next key, so later runs continue the numbering.
+
+        Parameters:
+        - path (str): Path of the .npz file.
+        """
+        np.savez(path, fingerprints=self.deduplicator.fingerprints(), next_key=np.array([self.next_key]))
+
+    @classmethod
+    def load(cls, path: str, columns: list, logger: logging.Logger):
+        """
+        Load a generator saved with SequentialKeyGenerator.save.
+
+        Parameters:
+        - path (str): Path of the .npz file.
+        - columns (list): Columns whose unique combinations identify a key.
+        - logger (logging.Logger): Logger instance for logging messages.
+
+        Returns:
+        - SequentialKeyGenerator: Generator continuing the saved numbering.
+        """
+        with np.load(path) as saved:
+            return cls(columns, logger, start=int(saved['next_key'][0]), seen=saved['fingerprints'])
+
+    def close(self):
+        """
+        Remove the spilled fingerprint files.
+        """
+        self.deduplicator.close()
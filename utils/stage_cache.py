@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import importlib
+import threading
+
+from utils.etl import ETL
+
+
+class StageCache:
+    """
+    Content-addressed cache of the outputs of the pipeline stages.
+
+    An entry is keyed by the SHA-256 of everything its outputs depend on: fingerprints of the input files, ETags of
+    the API responses, the version of the code producing them and the stage parameters. A stage whose key is cached
+    restores its output files instead of running. The least recently used entries are evicted once the entries take
+    more than max_size bytes.
+
+    File fingerprints are memoized by path, size and modification time, so unchanged files are not hashed again.
+    """
+    ENTRIES_DIR = "entries"
+    ENTRY_FILE = "entry.json"
+    FINGERPRINTS_FILE = "fingerprints.json"
+    ETAGS_FILE = "etags.json"
+    DEFAULT_MAX_SIZE = 2 * 2 ** 30
+
+    def __init__(self, logger: logging.Logger, cache_dir: str = ETL.DEFAULT_CACHE_DIR,
+                 max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Constructor for StageCache.
+
+        Parameters:
+        - logger (logging.Logger): Logger instance for logging messages.
+        - cache_dir (str): Directory of the cache, created if it does not exist. Default is ETL.DEFAULT_CACHE_DIR.
+        - max_size (int): Bytes the cached files may take before the least recently used entries are evicted.
+          Default is StageCache.DEFAULT_MAX_SIZE (2 GiB).
+        """
+        self.logger = logger
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        os.makedirs(self.__path(self.ENTRIES_DIR), exist_ok=True)
+        self.fingerprints = self.__read_json(self.FINGERPRINTS_FILE)
+        self.etags = self.__read_json(self.ETAGS_FILE)
+        self.code_versions = {}
+
+    def __path(self, *names) -> str:
+        return os.path.join(self.cache_dir, *names).replace("\\", "/")
+
+    def __read_json(self, file_name: str) -> dict:
+        path = self.__path(file_name)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def __write_json(self, file_name: str, data: dict):
+        # Written aside and renamed, so a crashed run does not leave a truncated file
+        path = self.__path(file_name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def __hash_file(path: str, block_size: int = 1 << 20) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def fingerprint(self, path: str) -> str:
+        """
+        Get the SHA-256 of a file content, hashing it only if its size or modification time changed.
+
+        Parameters:
+        - path (str): Path of the file.
+
+        Returns:
+        - str: Hexadecimal digest.
+        """
+        stat = os.stat(path)
+        file_key = os.path.abspath(path)
+        with self.lock:
+            memo = self.fingerprints.get(file_key)
+        if memo is not None and memo["size"] == stat.st_size and memo["mtime_ns"] == stat.st_mtime_ns:
+            return memo["sha256"]
+        sha256 = self.__hash_file(path)
+        self.__remember(file_key, stat, sha256)
+        return sha256
+
+    def __remember(self, file_key: str, stat: os.stat_result, sha256: str):
+        with self.lock:
+            self.fingerprints[file_key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+            self.__write_json(self.FINGERPRINTS_FILE, self.fingerprints)
+
+    def code_version(self, modules: list) -> str:
+        """
+        Get the version of the code of a stage, the SHA-256 of the source files of its modules.
+
+        Parameters:
+        - modules (list): Names of the modules the stage outputs depend on, e.g. "utils.pipeline_transformations".
+
+        Returns:
+        - str: Hexadecimal digest.
+        """
+        paths = sorted(os.path.abspath(importlib.import_module(module).__file__) for module in modules)
+        version_key = "\n".join(paths)
+        if version_key not in self.code_versions:
+            digest = hashlib.sha256()
+            for path in paths:
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+            self.code_versions[version_key] = digest.hexdigest()
+        return self.code_versions[version_key]
+
+    @staticmethod
+    def key(stage_name: str, **inputs) -> str:
+        """
+        Get the key of a stage run.
+
+        Parameters:
+        - stage_name (str): Name of the stage, e.g. "transform".
+        - inputs: JSON serializable values the stage outputs depend on: fingerprints, ETags, code version and
+          parameters.
+
+        Returns:
+        - str: Hexadecimal SHA-256 of the stage name and its inputs.
+        """
+        payload = json.dumps({"stage": stage_name, **inputs}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def etag(self, url: str) -> str:
+        """
+        Get the ETag of the last cached response of an URL.
+
+        Parameters:
+        - url (str): URL of the request.
+
+        Returns:
+        - str: ETag, or None if there is none.
+        """
+        with self.lock:
+            return self.etags.get(url)
+
+    def set_etag(self, url: str, etag: str):
+        """
+        Record the ETag of a cached response.
+
+        Parameters:
+        - url (str): URL of the request.
+        - etag (str): ETag of the response.
+        """
+        with self.lock:
+            self.etags[url] = etag
+            self.__write_json(self.ETAGS_FILE, self.etags)
+
+    def restore(self, key: str, files: dict) -> bool:
+        """
+        Restore the output files of a cached stage run. Files already holding the cached content are not copied.
+
+        Parameters:
+        - key (str): Key of the stage run, see StageCache.key.
+        - files (dict): Dictionary mapping output names to the paths they are restored into.
+
+        Returns:
+        - bool: True if the entry is cached and every file was restored, False otherwise.
+        """
+        entry_dir = self.__path(self.ENTRIES_DIR, key)
+        entry_path = os.path.join(entry_dir, self.ENTRY_FILE)
+        if not os.path.exists(entry_path):
+            return False
+        with open(entry_path) as f:
+            entry = json.load(f)
+        if set(files) - set(entry["files"]):
+            return False
+
+        for name, path in files.items():
+            sha256 = entry["files"][name]
+            if os.path.exists(path) and self.fingerprint(path) == sha256:
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            shutil.copy2(os.path.join(entry_dir, name), path)
+            self.__remember(os.path.abspath(path), os.stat(path), sha256)
+
+        entry["last_used"] = time.time()
+        with open(entry_path, "w") as f:
+            json.dump(entry, f, indent=2)
+        return True
+
+    def store(self, key: str, files: dict):
+        """
+        Cache the output files of a stage run, then evict the least recently used entries over the size limit.
+
+        Parameters:
+        - key (str): Key of the stage run, see StageCache.key.
+        - files (dict): Dictionary mapping output names to their paths. Empty for stages without outputs, e.g. load.
+        """
+        entry_dir = self.__path(self.ENTRIES_DIR, key)
+        tmp_dir = entry_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        # Copied, not linked, as the pipeline overwrites its intermediate files in place
+        for name, path in files.items():
+            shutil.copy2(path, os.path.join(tmp_dir, name))
+        now = time.time()
+        entry = {
+            "files": {name: self.fingerprint(path) for name, path in files.items()},
+            "size": sum(os.path.getsize(path) for path in files.values()),
+            "created": now,
+            "last_used": now
+        }
+        with open(os.path.join(tmp_dir, self.ENTRY_FILE), "w") as f:
+            json.dump(entry, f, indent=2)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cached files take at most max_size bytes.
+        """
+        entries_dir = self.__path(self.ENTRIES_DIR)
+        entries = []
+        for key in os.listdir(entries_dir):
+            entry_path = os.path.join(entries_dir, key, self.ENTRY_FILE)
+            if not os.path.exists(entry_path):
+                continue
+            with open(entry_path) as f:
+                entry = json.load(f)
+            entries.append((entry["last_used"], entry["size"], key))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(os.path.join(entries_dir, key), ignore_errors=True)
+            total_size -= size
+            self.logger.info(f"Cache entry {key} evicted ({size} bytes)")
@@ -0,0 +1,267 @@
+import os
+
+import pandas as pd
+
+from utils.profiling import record_io
+from utils.schemas import apply_schema, read_dtypes
+
+
+class StorageWriter:
+    """
+    Writer that appends DataFrames to a single intermediate file.
+    """
+
+    def __init__(self, storage, path: str):
+        """
+        Constructor for StorageWriter.
+
+        Parameters:
+        - storage (Storage): Storage format of the file.
+        - path (str): Path of the file.
+        """
+        self.storage = storage
+        self.path = path
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if os.path.exists(self.path):
+            record_io(rows_written=self.rows, bytes_written=os.path.getsize(self.path))
+
+    def write(self, df: pd.DataFrame):
+        """
+        Append a DataFrame to the file.
+
+        Parameters:
+        - df (pd.DataFrame): Data to append.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Flush and close the file.
+        """
+
+
+class Storage:
+    """
+    Format of the intermediate files written by the extract and transform steps.
+    """
+    EXTENSION = None
+    # Files with rows appended can be read from the end of their previous version, see Storage.read_chunks
+    APPENDABLE = False
+
+    def path(self, directory: str, file_name: str) -> str:
+        """
+        Get the path of an intermediate file, replacing the extension of file_name by the one of the format.
+
+        Parameters:
+        - directory (str): Directory of the file.
+        - file_name (str): Name of the file, with or without extension.
+
+        Returns:
+        - str: Path of the file.
+        """
+        return os.path.join(directory, os.path.splitext(file_name)[0] + self.EXTENSION).replace("\\", "/")
+
+    def read(self, path: str, columns: list = None, dtype: dict = None) -> pd.DataFrame:
+        """
+        Read an intermediate file.
+
+        Parameters:
+        - path (str): Path of the file.
+        - columns (list): Columns to read. Default is None, which reads all the columns.
+        - dtype (dict): Dtypes of the columns (see utils/schemas.py). Default is None, which keeps the dtypes stored
+          or inferred.
+
+        Returns:
+        - pd.DataFrame: File data.
+        """
+        raise NotImplementedError
+
+    def read_chunks(self, path: str, chunk_size: int, columns: list = None, dtype: dict = None, offset: int = 0):
+        """
+        Read an intermediate file in chunks.
+
+        Parameters:
+        - path (str): Path of the file.
+        - chunk_size (int): Number of rows per chunk.
+        - columns (list): Columns to read. Default is None, which reads all the columns.
+        - dtype (dict): Dtypes of the columns (see utils/schemas.py). Default is None, which keeps the dtypes stored
+          or inferred.
+        - offset (int): Byte offset of the first row to read, the end of a previous version of the file rows were
+          appended to. Only supported by the formats with Storage.APPENDABLE. Default is 0, which reads every row.
+
+        Returns:
+        - Iterator[pd.DataFrame]: Chunks of the file.
+        """
+        raise NotImplementedError
+
+    def write(self, df: pd.DataFrame, path: str):
+        """
+        Write a DataFrame into an intermediate file, overwriting it.
+
+        Parameters:
+        - df (pd.DataFrame): Data to write.
+        - path (str): Path of the file.
+        """
+        with self.writer(path) as writer:
+            writer.write(df)
+
+    def writer(self, path: str) -> StorageWriter:
+        """
+        Open a writer that appends DataFrames into an intermediate file, overwriting it.
+
+        Parameters:
+        - path (str): Path of the file.
+
+        Returns:
+        - StorageWriter: Writer of the file.
+        """
+        raise NotImplementedError
+
+
+class CsvWriter(StorageWriter):
+    """
+    Writer of CSV files, the header is only written with the first DataFrame.
+    """
+
+    def __init__(self, storage, path: str):
+        super().__init__(storage, path)
+        self.header_written = False
+
+    def write(self, df: pd.DataFrame):
+        df.to_csv(self.path, index=False, mode="a" if self.header_written else "w", header=not self.header_written)
+        self.header_written = True
+        self.rows += len(df)
+
+
+class CsvStorage(Storage):
+    """
+    CSV intermediate files. Dtypes are not stored, so they are inferred again when files are read, or parsed wide
+    and narrowed to the dtypes given.
+    """
+    EXTENSION = ".csv"
+    APPENDABLE = True
+
+    def read(self, path: str, columns: list = None, dtype: dict = None) -> pd.DataFrame:
+        df = pd.read_csv(path, usecols=columns, dtype=read_dtypes(dtype or {}))
+        record_io(rows_read=len(df), bytes_read=os.path.getsize(path))
+        return apply_schema(df, dtype or {})
+
+    def read_chunks(self, path: str, chunk_size: int, columns: list = None, dtype: dict = None, offset: int = 0):
+        if dtype is not None and columns is not None:
+            dtype = {column: column_dtype for column, column_dtype in dtype.items() if column in columns}
+        # Rows read from an offset have no header line
+        names = pd.read_csv(path, nrows=0).columns if offset else None
+        record_io(bytes_read=os.path.getsize(path) - offset)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            with pd.read_csv(f, header=None if offset else "infer", names=names, usecols=columns,
+                             dtype=read_dtypes(dtype or {}), chunksize=chunk_size) as reader:
+                for chunk_df in reader:
+                    record_io(rows_read=len(chunk_df))
+                    yield apply_schema(chunk_df, dtype or {})
+
+    def writer(self, path: str) -> StorageWriter:
+        return CsvWriter(self, path)
+
+
+class ParquetWriter(StorageWriter):
+    """
+    Writer of Parquet files, every DataFrame is written as a row group with the schema of the first one.
+    """
+
+    def __init__(self, storage, path: str):
+        super().__init__(storage, path)
+        self.parquet_writer = None
+        self.empty_df = None
+
+    def write(self, df: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.parquet_writer is None:
+            if df.empty:
+                # Keep the columns to write an empty file if no rows are ever written
+                self.empty_df = df
+                return
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            # Categoricals of later DataFrames may have more categories than fit in the indices of the first one
+            for position, field in enumerate(schema):
+                if pa.types.is_dictionary(field.type):
+                    schema = schema.set(position, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+            table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            self.parquet_writer = pq.ParquetWriter(self.path, table.schema, compression=self.storage.compression)
+        elif df.empty:
+            return
+        else:
+            table = pa.Table.from_pandas(df, schema=self.parquet_writer.schema, preserve_index=False)
+        self.parquet_writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        elif self.empty_df is not None:
+            self.empty_df.to_parquet(self.path, index=False, compression=self.storage.compression)
+
+
+class ParquetStorage(Storage):
+    """
+    Parquet intermediate files. They keep dtypes, are compressed and allow reading only some columns.
+    """
+    EXTENSION = ".parquet"
+    DEFAULT_COMPRESSION = "snappy"
+
+    def __init__(self, compression: str = DEFAULT_COMPRESSION):
+        """
+        Constructor for ParquetStorage.
+
+        Parameters:
+        - compression (str): Parquet compression codec. Default is ParquetStorage.DEFAULT_COMPRESSION.
+        """
+        self.compression = compression
+
+    def read(self, path: str, columns: list = None, dtype: dict = None) -> pd.DataFrame:
+        df = pd.read_parquet(path, columns=columns)
+        record_io(rows_read=len(df), bytes_read=os.path.getsize(path))
+        # Files written before a schema change are cast on read
+        return apply_schema(df, dtype or {})
+
+    def read_chunks(self, path: str, chunk_size: int, columns: list = None, dtype: dict = None, offset: int = 0):
+        import pyarrow.parquet as pq
+
+        if offset:
+            raise ValueError("Parquet files cannot be read from a byte offset")
+
+        record_io(bytes_read=os.path.getsize(path))
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            record_io(rows_read=batch.num_rows)
+            yield apply_schema(batch.to_pandas(), dtype or {})
+
+    def writer(self, path: str) -> StorageWriter:
+        return ParquetWriter(self, path)
+
+
+STORAGE_FORMATS = {"csv": CsvStorage, "parquet": ParquetStorage}
+
+
+def get_storage(storage_format: str) -> Storage:
+    """
+    Get the storage of an intermediate files format.
+
+    Parameters:
+    - storage_format (str): Name of the format (see STORAGE_FORMATS) or file extension, e.g. "parquet" or ".parquet".
+
+    Returns:
+    - Storage: Storage instance of the format.
+    """
+    storage_format = storage_format.lower().lstrip(".")
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(f"Unknown storage format: {storage_format}. Available formats: {list(STORAGE_FORMATS)}")
+    return STORAGE_FORMATS[storage_format]()
@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+class SurrogateKeyGenerator:
+    """
+    Assign dense integer surrogate keys to the unique combinations of a set of columns.
+
+    Rows are factorized by the values of the key columns with a groupby, so keys are assigned in first-seen order
+    without calling Python code per row, and distinct combinations never share a key. The generator keeps the
+    combinations already seen with their key, therefore successive calls (chunks, incremental runs) reuse the
+    existing keys and only allocate new ones for unseen combinations. It suits dimensions, whose combinations are
+    few; rows of fact tables are numbered by SequentialKeyGenerator.
+    """
+    EXTENSION = ".json"
+
+    def __init__(self, columns: list, start: int = 1):
+        """
+        Constructor for SurrogateKeyGenerator.
+
+        Parameters:
+        - columns (list): Columns whose unique combinations identify a key.
+        - start (int): First key to assign. Default is 1.
+        """
+        self.columns = list(columns)
+        self.next_key = start
+        self.keys = pd.Series(dtype='int64', index=pd.MultiIndex.from_arrays([[]] * len(self.columns),
+                                                                             names=self.columns))
+
+    @staticmethod
+    def __combinations(values_df: pd.DataFrame) -> pd.MultiIndex:
+        # Plain objects, so combinations compare equal whatever the categories of the DataFrame they come from
+        values_df = values_df.astype(object)
+        return pd.MultiIndex.from_frame(values_df.where(values_df.notna(), None))
+
+    def assign(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Get the surrogate key of every row, allocating new keys for the unseen combinations.
+
+        Parameters:
+        - df (pd.DataFrame): DataFrame containing the key columns.
+
+        Returns:
+        - pd.Series: Surrogate key of every row, with the index of df.
+        """
+        values_df = df[self.columns]
+        codes = values_df.groupby(self.columns, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+        _, first_positions = np.unique(codes, return_index=True)
+        combinations = self.__combinations(values_df.take(first_positions))
+        unique_keys = self.keys.reindex(combinations).to_numpy(dtype='float64', copy=True)
+
+        is_new = np.isnan(unique_keys)
+        if is_new.any():
+            new_keys = pd.Series(np.arange(self.next_key, self.next_key + int(is_new.sum()), dtype='int64'),
+                                 index=combinations[is_new])
+            self.keys = pd.concat([self.keys, new_keys]) if len(self.keys) else new_keys
+            self.next_key += len(new_keys)
+            unique_keys[is_new] = new_keys.to_numpy()
+        return pd.Series(unique_keys[codes], index=df.index, dtype='int64')
+
+    def save(self, path: str):
+        """
+        Save the combinations already seen and their keys, so later runs do not renumber them.
+
+        Parameters:
+        - path (str): Path of the .json file.
+        """
+        keys_df = self.keys.rename('key').reset_index().astype(object)
+        with open(path, "w") as f:
+            json.dump({"columns": self.columns, "next_key": self.next_key,
+                       "keys": keys_df.where(keys_df.notna(), None).to_numpy().tolist()}, f)
+
+    @classmethod
+    def load(cls, path: str, columns: list):
+        """
+        Load a generator saved with SurrogateKeyGenerator.save.
+
+        Parameters:
+        - path (str): Path of the .json file.
+        - columns (list): Columns whose unique combinations identify a key.
+
+        Returns:
+        - SurrogateKeyGenerator: Generator with the saved keys.
+        """
+        with open(path) as f:
+            saved = json.load(f)
+        generator = cls(columns, start=saved["next_key"])
+        if saved["keys"]:
+            keys_df = pd.DataFrame(saved["keys"], columns=saved["columns"] + ['key'], dtype=object)
+            generator.keys = pd.Series(keys_df['key'].to_numpy(dtype='int64'),
+                                       index=cls.__combinations(keys_df[columns]))
+        return generator